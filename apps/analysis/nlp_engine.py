@@ -547,46 +547,49 @@ class NLPEngine:
 
     def build_stats(self, parsed):
         """Construit des statistiques agregees."""
-        qs = self.build_queryset(parsed)
-        return qs.values(
-            'nomenclature__code',
-            'nomenclature__libelle_fr',
-            'nomenclature__couleur_hex',
-        ).annotate(
-            total_superficie_ha=Sum('superficie_ha'),
-            total_carbone=Sum('stock_carbone_calcule'),
-            nombre_polygones=Count('id'),
-        ).order_by('nomenclature__ordre_affichage')
+        if 'threshold' in parsed:
+            # Seuil par polygone : le cube ne suffit pas
+            qs = self.build_queryset(parsed)
+            return qs.values(
+                'nomenclature__code',
+                'nomenclature__libelle_fr',
+                'nomenclature__couleur_hex',
+            ).annotate(
+                total_superficie_ha=Sum('superficie_ha'),
+                total_carbone=Sum('stock_carbone_calcule'),
+                nombre_polygones=Count('id'),
+            ).order_by('nomenclature__ordre_affichage')
+
+        from apps.carbone import cube
+
+        stats_cube = cube.get()
+        return stats_cube.by_class(stats_cube.select(
+            years=parsed['years'] or None,
+            forets=parsed['forests'] or None,
+            types=parsed['cover_types'] or None,
+        ))
 
     def build_comparison(self, parsed):
         """Construit une comparaison entre deux annees."""
         if len(parsed['years']) < 2:
             return None
 
-        annee1, annee2 = parsed['years'][0], parsed['years'][-1]
-        base_filter = {}
-        if parsed['forests']:
-            base_filter['foret__code__in'] = parsed['forests']
-        if parsed['cover_types']:
-            base_filter['nomenclature__code__in'] = parsed['cover_types']
+        from apps.carbone import cube
 
-        from apps.carbone.models import OccupationSol
+        annee1, annee2 = parsed['years'][0], parsed['years'][-1]
+        stats_cube = cube.get()
+        fields = {'superficie_ha': 'superficie', 'carbone': 'carbone'}
 
         def stats_for_year(annee):
-            return OccupationSol.objects.filter(
-                annee=annee, **base_filter,
-            ).values(
-                'nomenclature__code',
-                'nomenclature__libelle_fr',
-                'nomenclature__couleur_hex',
-            ).annotate(
-                superficie_ha=Sum('superficie_ha'),
-                carbone=Sum('stock_carbone_calcule'),
-            ).order_by('nomenclature__ordre_affichage')
+            return stats_cube.by_class(stats_cube.select(
+                years=[annee],
+                forets=parsed['forests'] or None,
+                types=parsed['cover_types'] or None,
+            ), fields=fields)
 
         return {
-            'annee1': {'annee': annee1, 'data': list(stats_for_year(annee1))},
-            'annee2': {'annee': annee2, 'data': list(stats_for_year(annee2))},
+            'annee1': {'annee': annee1, 'data': stats_for_year(annee1)},
+            'annee2': {'annee': annee2, 'data': stats_for_year(annee2)},
         }
 
     def build_deforestation(self, parsed):
@@ -594,34 +597,22 @@ class NLPEngine:
         if len(parsed['years']) < 2:
             return None
 
-        annee1, annee2 = parsed['years'][0], parsed['years'][-1]
-        base_filter = {}
-        if parsed['forests']:
-            base_filter['foret__code__in'] = parsed['forests']
-
-        from apps.carbone.models import OccupationSol
+        from apps.carbone import cube
 
+        annee1, annee2 = parsed['years'][0], parsed['years'][-1]
         forest_codes = ['FORET_DENSE', 'FORET_CLAIRE', 'FORET_DEGRADEE']
+        stats_cube = cube.get()
+
+        def selection(annee):
+            return stats_cube.select(
+                years=[annee], forets=parsed['forests'] or None, types=forest_codes,
+            )
 
         def forest_area(annee):
-            return OccupationSol.objects.filter(
-                annee=annee,
-                nomenclature__code__in=forest_codes,
-                **base_filter,
-            ).aggregate(total=Sum('superficie_ha'))['total'] or 0
+            return stats_cube.totals(selection(annee))['superficie']
 
         def detail_for_year(annee):
-            return list(OccupationSol.objects.filter(
-                annee=annee,
-                nomenclature__code__in=forest_codes,
-                **base_filter,
-            ).values(
-                'nomenclature__code',
-                'nomenclature__libelle_fr',
-                'nomenclature__couleur_hex',
-            ).annotate(
-                superficie_ha=Sum('superficie_ha'),
-            ).order_by('nomenclature__ordre_affichage'))
+            return stats_cube.by_class(selection(annee), fields={'superficie_ha': 'superficie'})
 
         area1 = forest_area(annee1)
         area2 = forest_area(annee2)
@@ -637,77 +628,75 @@ class NLPEngine:
             'perte_pct': round(float(pct), 1),
             'detail_1': detail_for_year(annee1),
             'detail_2': detail_for_year(annee2),
+            'devenir_foret': self.build_forest_fate(parsed, annee1, annee2, forest_codes),
         }
 
+    def build_forest_fate(self, parsed, annee1, annee2, forest_codes):
+        """
+        Ce que sont devenues les surfaces forestieres de annee1 en annee2
+        (matrice de transition, commande build_transitions) : conversions
+        vers un autre type, par superficie decroissante. None si non calculee.
+        """
+        from apps.carbone.models import TransitionOccupation
+
+        cells = TransitionOccupation.objects.filter(
+            annee_debut=annee1,
+            annee_fin=annee2,
+            classe_debut__code__in=forest_codes,
+        )
+        if parsed['forests']:
+            cells = cells.filter(foret__code__in=parsed['forests'])
+        if not cells.exists():
+            return None
+        return list(cells.exclude(
+            classe_fin=F('classe_debut'),
+        ).values(
+            'classe_debut__code', 'classe_debut__libelle_fr',
+            'classe_fin__code', 'classe_fin__libelle_fr', 'classe_fin__couleur_hex',
+        ).annotate(
+            total_superficie_ha=Sum('superficie_ha'),
+        ).order_by('-total_superficie_ha'))
+
     def build_ranking(self, parsed):
         """Classement des forets par superficie OU carbone selon le contexte."""
-        from apps.carbone.models import OccupationSol
+        from apps.carbone import cube
 
         annee = parsed['years'][-1] if parsed['years'] else 2023
-        cover_filter = {}
-        if parsed['cover_types']:
-            cover_filter['nomenclature__code__in'] = parsed['cover_types']
-        else:
-            cover_filter['nomenclature__code__in'] = [
-                'FORET_DENSE', 'FORET_CLAIRE', 'FORET_DEGRADEE',
-            ]
+        cover_types = parsed['cover_types'] or [
+            'FORET_DENSE', 'FORET_CLAIRE', 'FORET_DEGRADEE',
+        ]
 
-        sort_field = '-total_carbone' if parsed.get('ranking_by') == 'carbone' else '-total_superficie_ha'
+        sort_field = 'total_carbone' if parsed.get('ranking_by') == 'carbone' else 'total_superficie_ha'
 
-        return list(OccupationSol.objects.filter(
-            annee=annee, **cover_filter,
-        ).values(
-            'foret__code', 'foret__nom',
-        ).annotate(
-            total_superficie_ha=Sum('superficie_ha'),
-            total_carbone=Sum('stock_carbone_calcule'),
-            nombre_polygones=Count('id'),
-        ).order_by(sort_field))
+        stats_cube = cube.get()
+        return stats_cube.by_forest(
+            stats_cube.select(years=[annee], types=cover_types), order=sort_field,
+        )
 
     def build_resume(self, parsed):
         """Vue d'ensemble / synthese globale pour une annee."""
-        from apps.carbone.models import OccupationSol, ForetClassee
+        from apps.carbone import cube
 
         annee = parsed['years'][-1] if parsed['years'] else 2023
-        base_filter = {'annee': annee}
-        if parsed['forests']:
-            base_filter['foret__code__in'] = parsed['forests']
-
-        by_type = list(OccupationSol.objects.filter(**base_filter).values(
-            'nomenclature__code',
-            'nomenclature__libelle_fr',
-            'nomenclature__couleur_hex',
-        ).annotate(
-            total_superficie_ha=Sum('superficie_ha'),
-            total_carbone=Sum('stock_carbone_calcule'),
-            nombre_polygones=Count('id'),
-        ).order_by('nomenclature__ordre_affichage'))
-
-        totaux = OccupationSol.objects.filter(**base_filter).aggregate(
-            superficie=Sum('superficie_ha'),
-            carbone=Sum('stock_carbone_calcule'),
-            polygones=Count('id'),
-        )
-
-        by_forest = list(OccupationSol.objects.filter(**base_filter).values(
-            'foret__code', 'foret__nom',
-        ).annotate(
-            total_superficie_ha=Sum('superficie_ha'),
-            total_carbone=Sum('stock_carbone_calcule'),
-        ).order_by('-total_superficie_ha'))
+        stats_cube = cube.get()
+        selection = stats_cube.select(years=[annee], forets=parsed['forests'] or None)
 
-        nb_forets = ForetClassee.objects.count()
+        totaux = stats_cube.totals(selection)
 
         return {
             'annee': annee,
-            'nb_forets': nb_forets,
+            'nb_forets': len(stats_cube.foret_codes),
             'totaux': {
-                'superficie_ha': round(float(totaux['superficie'] or 0), 1),
-                'carbone_tco2': round(float(totaux['carbone'] or 0), 1),
-                'nb_polygones': totaux['polygones'] or 0,
+                'superficie_ha': round(float(totaux['superficie']), 1),
+                'carbone_tco2': round(float(totaux['carbone']), 1),
+                'nb_polygones': totaux['polygones'],
             },
-            'par_type': by_type,
-            'par_foret': by_forest,
+            'par_type': stats_cube.by_class(selection),
+            'par_foret': stats_cube.by_forest(
+                selection,
+                fields={'total_superficie_ha': 'superficie', 'total_carbone': 'carbone'},
+                order='total_superficie_ha',
+            ),
         }
 
     # ------------------------------------------------------------------
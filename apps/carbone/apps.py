@@ -6,3 +6,6 @@ class CarboneConfig(AppConfig):
     name = "apps.carbone"
     label = "carbone"
     verbose_name = "Carbone forestier"
+
+    def ready(self):
+        from . import signals  # noqa: F401
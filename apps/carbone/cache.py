@@ -0,0 +1,174 @@
+"""
+Response cache of the dynamic SQL tier.
+
+Requests with bbox / type / foret filters cannot use the static geocache and
+used to hit PostGIS every time, even with identical parameters. Their
+responses are now kept, gzip-compressed, under a key made of:
+    endpoint + normalised parameters + data version
+
+  L1 — per-process LRU (this module), bounded in entries and bytes.
+  L2 — settings.CACHES['geo'], shared by every worker (Redis or files).
+
+The data version is a token stored in the shared cache and replaced by
+bump_data_version() whenever occupation data changes (signals.py,
+import / simplification commands): every previous key becomes unreachable
+at once, no scan or delete needed.
+"""
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+
+from . import geocache
+
+CACHE_ALIAS = 'geo'
+
+VERSION_KEY = 'carbone:data_version'
+
+# L1 bounds (per worker process)
+L1_MAX_ENTRIES = 64
+L1_MAX_BYTES = 64 * 1024 * 1024
+
+# Larger responses (compressed) are not cached at all; with the MAX_ENTRIES
+# of the file-based 'geo' cache this bounds its disk use (settings.CACHES)
+MAX_CACHED_BYTES = 2 * 1024 * 1024
+
+_lru = OrderedDict()
+_lru_bytes = 0
+_lock = threading.Lock()
+
+
+def _shared():
+    return caches[CACHE_ALIAS]
+
+
+# ----------------------------------------------------------------------
+# Data version
+# ----------------------------------------------------------------------
+def data_version():
+    """Current data version token (created on first use)."""
+    version = _shared().get(VERSION_KEY)
+    if version is None:
+        version = str(time.time_ns())
+        # add(): a concurrent first request may have set it already
+        if not _shared().add(VERSION_KEY, version, timeout=None):
+            version = _shared().get(VERSION_KEY, version)
+    return version
+
+
+def request_version(request):
+    """data_version() read once per request (kept on the request)."""
+    version = getattr(request, '_carbone_data_version', None)
+    if version is None:
+        version = request._carbone_data_version = data_version()
+    return version
+
+
+def bump_data_version():
+    """Invalidate every cached response (data changed)."""
+    _shared().set(VERSION_KEY, str(time.time_ns()), timeout=None)
+
+
+# ----------------------------------------------------------------------
+# Keys and storage
+# ----------------------------------------------------------------------
+def cache_key(endpoint, params, version=None):
+    """
+    Key of a response: endpoint + normalised params + data version (pass
+    `version`, e.g. request_version(), to save the shared-cache round trip).
+    """
+    payload = json.dumps(
+        [endpoint, sorted(params.items()), version or data_version()],
+        sort_keys=True, default=str,
+    )
+    return 'carbone:resp:' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _lru_get(key):
+    with _lock:
+        value = _lru.get(key)
+        if value is not None:
+            _lru.move_to_end(key)
+        return value
+
+
+def _lru_set(key, value):
+    global _lru_bytes
+    with _lock:
+        if key in _lru:
+            _lru_bytes -= len(_lru.pop(key)[0])
+        _lru[key] = value
+        _lru_bytes += len(value[0])
+        while _lru and (len(_lru) > L1_MAX_ENTRIES or _lru_bytes > L1_MAX_BYTES):
+            _, (old, _) = _lru.popitem(last=False)
+            _lru_bytes -= len(old)
+
+
+def get(key):
+    """(gzip bytes, content type) of a cached response, or None."""
+    value = _lru_get(key)
+    if value is None:
+        value = _shared().get(key)
+        if value is not None:
+            _lru_set(key, value)
+    return value
+
+
+def put(key, gzipped, content_type):
+    value = (gzipped, content_type)
+    _lru_set(key, value)
+    _shared().set(key, value)
+
+
+# ----------------------------------------------------------------------
+# Responses
+# ----------------------------------------------------------------------
+def cached_response(request, key):
+    """HttpResponse for a cached key (gzip as-is when accepted), or None."""
+    value = get(key)
+    if value is None:
+        return None
+    gzipped, content_type = value
+    if 'gzip' in geocache.accepted_encodings(request):
+        response = HttpResponse(gzipped, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(zlib.decompress(gzipped, 31), content_type=content_type)
+    response['Vary'] = 'Accept-Encoding'
+    response['X-GeoCache'] = 'SQL-HIT'
+    return response
+
+
+def caching_stream(key, chunks, content_type='application/json'):
+    """
+    StreamingHttpResponse sending `chunks` as they come, while compressing
+    them on the side: once the stream is complete the gzip bytes are stored
+    under `key` (unless larger than MAX_CACHED_BYTES or interrupted).
+    """
+    def stream():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        parts, size = [], 0
+        # Closed with the response: the source cursor is released at once
+        with closing(chunks):
+            for chunk in chunks:
+                yield chunk
+                if parts is not None:
+                    part = compressor.compress(chunk)
+                    size += len(part)
+                    if size > MAX_CACHED_BYTES:
+                        parts = None
+                    else:
+                        parts.append(part)
+        if parts is not None:
+            parts.append(compressor.flush())
+            put(key, b''.join(parts), content_type)
+
+    response = StreamingHttpResponse(stream(), content_type=content_type)
+    response['X-GeoCache'] = 'SQL'
+    return response
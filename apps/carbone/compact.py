@@ -0,0 +1,104 @@
+"""
+Dictionary-encoded occupation payloads (compact=1).
+
+Every occupation feature used to repeat foret_code, foret_nom, type_couvert,
+libelle, couleur and source_donnee as strings, although they are fully
+determined by the forest / nomenclature foreign keys and a handful of
+distinct sources. In compact mode these strings are sent ONCE, in lookup
+tables at the collection level:
+
+    {"type": "FeatureCollection",
+     "encoding": "dictionary-v1",
+     "dictionaries": {
+         "forets":   {"<id>": {"foret_code": ..., "foret_nom": ...}},
+         "couverts": {"<id>": {"type_couvert": ..., "libelle": ..., "couleur": ...}},
+         "sources":  ["...", ...]},
+     "features": [... "properties": {"id", "foret", "couvert", "source",
+                                     "annee", "superficie_ha",
+                                     "stock_carbone_calcule"} ...]}
+
+and each feature only carries the small integer keys (`source` is an index
+into `sources`). Merging the dictionary entries back into the properties
+gives the full payload: nothing is lost (see API._expandCompact).
+
+Dictionaries cover the whole tables (a few forests, ~10 covers): keys are
+the same in every response, so the per-cell caches of snap=1 can be merged.
+The SQL tier reads them through cached_dictionaries(): the sources list is a
+scan of the occupations, done once per data version and worker.
+"""
+import json
+
+from django.core.cache import caches
+from django.db import connection
+
+ENCODING = 'dictionary-v1'
+
+# property → SQL, per feature (`%s` = the sources list, see properties_sql)
+PROPERTIES = {
+    'id': 'o.id',
+    'foret': 'o.foret_id',
+    'couvert': 'o.nomenclature_id',
+    'source': 'array_position(%s::text[], o.source_donnee) - 1',
+    'annee': 'o.annee',
+    'superficie_ha': 'ROUND(o.superficie_ha::numeric, 2)',
+    'stock_carbone_calcule': 'ROUND(o.stock_carbone_calcule::numeric, 2)',
+}
+
+
+def dictionaries():
+    """Lookup tables of the compact encoding (forests, covers, sources)."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT json_build_object(
+                'forets', (
+                    SELECT COALESCE(json_object_agg(
+                        id, json_build_object('foret_code', code, 'foret_nom', nom)
+                        ORDER BY id
+                    ), '{}'::json)
+                    FROM carbone_foretclassee
+                ),
+                'couverts', (
+                    SELECT COALESCE(json_object_agg(
+                        id, json_build_object(
+                            'type_couvert', code,
+                            'libelle', libelle_fr,
+                            'couleur', couleur_hex
+                        )
+                        ORDER BY id
+                    ), '{}'::json)
+                    FROM carbone_nomenclaturecouvert
+                ),
+                'sources', (
+                    SELECT COALESCE(json_agg(source_donnee ORDER BY source_donnee), '[]'::json)
+                    FROM (SELECT DISTINCT source_donnee FROM carbone_occupationsol) s
+                )
+            )::text;
+        """)
+        return json.loads(cursor.fetchone()[0])
+
+
+def cached_dictionaries(version):
+    """
+    dictionaries() for the data version `version` (cache.data_version()),
+    kept in the per-process cache: any data change bumps the version.
+    """
+    key = f'carbone:compact:{version}'
+    tables = caches['default'].get(key)
+    if tables is None:
+        tables = dictionaries()
+        caches['default'].set(key, tables, timeout=24 * 3600)
+    return tables
+
+
+def properties_sql(tables):
+    """
+    (json_build_object arguments, params) of the compact properties, for the
+    `tables` returned by dictionaries().
+    """
+    sql = ",\n                ".join(f"'{name}', {expr}" for name, expr in PROPERTIES.items())
+    return sql, [tables['sources']]
+
+
+def members(tables):
+    """Collection-level members of a compact FeatureCollection."""
+    return {'encoding': ENCODING, 'dictionaries': tables}
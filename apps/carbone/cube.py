@@ -0,0 +1,219 @@
+"""
+In-memory statistics cube (NumPy).
+
+The aggregate questions of the API and of the chat — stats, evolution,
+ranking, resume, deforestation — are all sums over a tiny space:
+    years × forests × cover classes   (3 × 6 × 9 today)
+Each of them used to cost a database round-trip plus ORM overhead. The
+summary table (statistics.py) is loaded here into dense arrays
+    superficie[y, f, c]   carbone[y, f, c]   polygones[y, f, c]
+and every question becomes a vectorised slice + sum, including matrices
+(year × class, forest × year...) the ORM endpoints could not produce.
+
+Life cycle:
+  - build() writes media/cube/statistics.npz, tagged with the data version
+    (cache.data_version()) read before the query.
+  - get() keeps the loaded cube per worker process and reloads it when the
+    data version changed: from the file if another process already rebuilt
+    it, else by rebuilding it (54 summary rows: milliseconds).
+"""
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from . import cache as response_cache
+
+CUBE_PATH = os.path.join(settings.MEDIA_ROOT, 'cube', 'statistics.npz')
+
+MEASURES = ('superficie', 'carbone', 'polygones')
+
+# Matrix axes: query value → cube dimension
+AXES = {'annee': 0, 'foret': 1, 'type': 2}
+
+# Output keys of by_class / by_forest → measure (shape of the ORM results)
+STATS_FIELDS = {
+    'total_superficie_ha': 'superficie',
+    'total_carbone': 'carbone',
+    'nombre_polygones': 'polygones',
+}
+
+_loaded = None
+_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------
+# Build / load
+# ----------------------------------------------------------------------
+def build(path=CUBE_PATH):
+    """Write the cube file from the summary table. Returns the Cube."""
+    from .constants import ANNEE_CHOICES
+    from .models import ForetClassee, NomenclatureCouvert, StatistiqueOccupation
+
+    version = response_cache.data_version()
+    rows = list(StatistiqueOccupation.objects.values_list(
+        'annee', 'foret_id', 'nomenclature_id',
+        'superficie_ha', 'stock_carbone', 'nombre_polygones',
+    ))
+    forets = list(ForetClassee.objects.order_by('code').values_list('id', 'code', 'nom'))
+    classes = list(NomenclatureCouvert.objects.order_by('ordre_affichage', 'code').values_list(
+        'id', 'code', 'libelle_fr', 'couleur_hex',
+    ))
+    years = sorted({annee for annee, _ in ANNEE_CHOICES} | {row[0] for row in rows})
+
+    year_index = {annee: i for i, annee in enumerate(years)}
+    foret_index = {pk: i for i, (pk, _, _) in enumerate(forets)}
+    class_index = {pk: i for i, (pk, _, _, _) in enumerate(classes)}
+
+    shape = (len(years), len(forets), len(classes))
+    superficie = np.zeros(shape)
+    carbone = np.zeros(shape)
+    polygones = np.zeros(shape, dtype=np.int64)
+    for annee, foret_id, nomenclature_id, area, carbon, count in rows:
+        at = (year_index[annee], foret_index[foret_id], class_index[nomenclature_id])
+        superficie[at] = area or 0
+        carbone[at] = carbon or 0
+        polygones[at] = count
+
+    arrays = {
+        'version': np.array(version),
+        'years': np.array(years, dtype=np.int16),
+        'foret_codes': np.array([code for _, code, _ in forets], dtype=str),
+        'foret_noms': np.array([nom for _, _, nom in forets], dtype=str),
+        'type_codes': np.array([code for _, code, _, _ in classes], dtype=str),
+        'type_libelles': np.array([libelle for _, _, libelle, _ in classes], dtype=str),
+        'type_couleurs': np.array([couleur for _, _, _, couleur in classes], dtype=str),
+        'superficie': superficie,
+        'carbone': carbone,
+        'polygones': polygones,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return Cube(arrays)
+
+
+def load(path=CUBE_PATH):
+    """Cube of the file, or None when missing / unreadable."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return Cube({name: data[name] for name in data.files})
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def get():
+    """Cube of the current data version (loaded once per worker)."""
+    global _loaded
+    version = response_cache.data_version()
+    cube = _loaded
+    if cube is not None and cube.version == version:
+        return cube
+    with _lock:
+        if _loaded is not None and _loaded.version == version:
+            return _loaded
+        cube = load()
+        if cube is None or cube.version != version:
+            cube = build()
+        _loaded = cube
+        return cube
+
+
+# ----------------------------------------------------------------------
+# Queries
+# ----------------------------------------------------------------------
+class Cube:
+    """Dense arrays [annee, foret, type] and their labels."""
+
+    def __init__(self, arrays):
+        self.version = str(arrays['version'])
+        self.years = arrays['years'].tolist()
+        self.foret_codes = arrays['foret_codes'].tolist()
+        self.foret_noms = arrays['foret_noms'].tolist()
+        self.type_codes = arrays['type_codes'].tolist()
+        self.type_libelles = arrays['type_libelles'].tolist()
+        self.type_couleurs = arrays['type_couleurs'].tolist()
+        self.measures = {name: arrays[name] for name in MEASURES}
+        self._index = (
+            {annee: i for i, annee in enumerate(self.years)},
+            {code.upper(): i for i, code in enumerate(self.foret_codes)},
+            {code.upper(): i for i, code in enumerate(self.type_codes)},
+        )
+
+    def _positions(self, axis, wanted):
+        """Positions along `axis` of the wanted labels (None: all), in cube order."""
+        if wanted is None:
+            return np.arange(self.measures['polygones'].shape[axis])
+        index = self._index[axis]
+        keys = [int(v) if axis == 0 else str(v).upper() for v in wanted]
+        return np.array(sorted({index[k] for k in keys if k in index}), dtype=np.intp)
+
+    def select(self, years=None, forets=None, types=None):
+        """Positions (years, forests, classes) of a filter; None keeps a whole axis."""
+        return (
+            self._positions(0, years),
+            self._positions(1, forets),
+            self._positions(2, types),
+        )
+
+    def _sum(self, measure, selection, keep=()):
+        """Sum of `measure` over the selection, keeping the `keep` axes."""
+        block = self.measures[measure][np.ix_(*selection)]
+        return block.sum(axis=tuple(a for a in range(3) if a not in keep))
+
+    def labels(self, axis, positions):
+        if axis == 0:
+            return [self.years[i] for i in positions]
+        if axis == 1:
+            return [self.foret_codes[i] for i in positions]
+        return [self.type_codes[i] for i in positions]
+
+    def totals(self, selection):
+        """{'superficie', 'carbone', 'polygones'} of the selection."""
+        return {name: self._sum(name, selection).item() for name in MEASURES}
+
+    def by_class(self, selection, fields=STATS_FIELDS):
+        """Rows per cover class having polygons, in display order."""
+        sums = {name: self._sum(name, selection, keep=(2,)) for name in MEASURES}
+        rows = []
+        for n, i in enumerate(selection[2]):
+            if not sums['polygones'][n]:
+                continue
+            row = {
+                'nomenclature__code': self.type_codes[i],
+                'nomenclature__libelle_fr': self.type_libelles[i],
+                'nomenclature__couleur_hex': self.type_couleurs[i],
+            }
+            row.update({key: sums[name][n].item() for key, name in fields.items()})
+            rows.append(row)
+        return rows
+
+    def by_forest(self, selection, fields=STATS_FIELDS, order=None):
+        """Rows per forest having polygons, sorted by `order` (a key of fields) descending."""
+        sums = {name: self._sum(name, selection, keep=(1,)) for name in MEASURES}
+        rows = []
+        for n, i in enumerate(selection[1]):
+            if not sums['polygones'][n]:
+                continue
+            row = {'foret__code': self.foret_codes[i], 'foret__nom': self.foret_noms[i]}
+            row.update({key: sums[name][n].item() for key, name in fields.items()})
+            rows.append(row)
+        if order:
+            rows.sort(key=lambda row: row[order], reverse=True)
+        return rows
+
+    def matrix(self, measure, rows, cols, selection):
+        """Two-dimensional sums: `rows` × `cols` axes (names of AXES)."""
+        row_axis, col_axis = AXES[rows], AXES[cols]
+        values = self._sum(measure, selection, keep=(row_axis, col_axis))
+        if row_axis > col_axis:
+            values = values.T
+        return {
+            'measure': measure,
+            'rows': {'axis': rows, 'labels': self.labels(row_axis, selection[row_axis])},
+            'cols': {'axis': cols, 'labels': self.labels(col_axis, selection[col_axis])},
+            'values': values.tolist(),
+        }
@@ -0,0 +1,237 @@
+"""
+Bulk exports for analysts (GeoParquet).
+
+Pulling a whole year through /api/v1/occupations/ and converting the JSON in
+pandas costs more than the query itself. GET /api/v1/exports/<layer>.parquet
+returns the same rows (same filters as filters.py) as a GeoParquet file:
+typed columns, geometry as WKB, zstd-compressed row groups —
+`geopandas.read_parquet(url)` loads it directly.
+
+Files are built in a background thread, written row group by row group from
+a server-side iterator (bounded memory), and kept in media/exports/ under a
+name made of:
+    layer + normalised filters + data version (cache.data_version())
+A data change makes every previous export unreachable; stale files are
+removed after the next successful build.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import AsWKB
+from django.db import connection
+
+from . import cache as response_cache
+from .filters import InfrastructureFilter, OccupationSolFilter, PlacetteFilter
+from .models import Infrastructure, OccupationSol, Placette
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.path.join(settings.MEDIA_ROOT, 'exports')
+
+CONTENT_TYPE = 'application/vnd.apache.parquet'
+
+# Rows per Parquet row group (and per database fetch)
+BATCH_ROWS = 10000
+
+# Stale exports younger than this are kept (downloads in progress)
+STALE_GRACE_SECONDS = 3600
+
+# layer → model, FilterSet, (column, ORM path, Arrow type), GeoParquet geometry types
+LAYERS = {
+    'occupations': {
+        'model': OccupationSol,
+        'filterset': OccupationSolFilter,
+        'columns': [
+            ('id', 'id', 'int64'),
+            ('foret_id', 'foret_id', 'int64'),
+            ('foret_code', 'foret__code', 'string'),
+            ('annee', 'annee', 'int16'),
+            ('type_couvert', 'nomenclature__code', 'string'),
+            ('libelle', 'nomenclature__libelle_fr', 'string'),
+            ('superficie_ha', 'superficie_ha', 'float64'),
+            ('stock_carbone_calcule', 'stock_carbone_calcule', 'float64'),
+            ('fiabilite_pct', 'fiabilite_pct', 'float64'),
+            ('source_donnee', 'source_donnee', 'string'),
+            ('updated_at', 'updated_at', 'timestamp'),
+        ],
+        'geometry_types': ['MultiPolygon'],
+    },
+    'placettes': {
+        'model': Placette,
+        'filterset': PlacetteFilter,
+        'columns': [
+            ('id', 'id', 'int64'),
+            ('foret_id', 'foret_id', 'int64'),
+            ('foret_code', 'foret__code', 'string'),
+            ('code_placette', 'code_placette', 'string'),
+            ('annee_mesure', 'annee_mesure', 'int16'),
+            ('type_foret_observe', 'type_foret_observe', 'string'),
+            ('biomasse_tonne_ha', 'biomasse_tonne_ha', 'float64'),
+            ('stock_carbone_mesure', 'stock_carbone_mesure', 'float64'),
+            ('donnees', 'donnees', 'json'),
+            ('created_at', 'created_at', 'timestamp'),
+        ],
+        'geometry_types': ['Point'],
+    },
+    'infrastructures': {
+        'model': Infrastructure,
+        'filterset': InfrastructureFilter,
+        'columns': [
+            ('id', 'id', 'int64'),
+            ('type_infra', 'type_infra', 'string'),
+            ('nom', 'nom', 'string'),
+            ('categorie', 'categorie', 'string'),
+            ('donnees', 'donnees', 'json'),
+            ('created_at', 'created_at', 'timestamp'),
+        ],
+        'geometry_types': [],  # routes, rivers and localities mixed
+    },
+}
+
+_running = set()
+_lock = threading.Lock()
+
+
+def filterset(layer, params):
+    """Bound FilterSet of a layer (validate with .is_valid())."""
+    spec = LAYERS[layer]
+    return spec['filterset'](params, queryset=spec['model'].objects.all())
+
+
+def _normalised(layer, params):
+    """Filter parameters of the layer's FilterSet only, sorted, non-empty."""
+    names = LAYERS[layer]['filterset'].base_filters
+    return sorted((k, str(params[k])) for k in names if params.get(k) not in (None, ''))
+
+
+def export_path(layer, params, version=None):
+    """Path of the export of (layer, filters) for a data version."""
+    version = version or response_cache.data_version()
+    digest = hashlib.sha1(
+        json.dumps([layer, _normalised(layer, params)]).encode('utf-8')
+    ).hexdigest()[:16]
+    return os.path.join(EXPORT_DIR, f'{layer}-{version}-{digest}.parquet')
+
+
+def _arrow_type(pa, name):
+    if name == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    if name == 'json':
+        return pa.string()
+    return getattr(pa, name)()
+
+
+def _geo_metadata(layer):
+    """GeoParquet 1.0 file metadata (no crs member: OGC:CRS84, lon/lat)."""
+    return {
+        'version': '1.0.0',
+        'primary_column': 'geometry',
+        'columns': {
+            'geometry': {
+                'encoding': 'WKB',
+                'geometry_types': LAYERS[layer]['geometry_types'],
+            },
+        },
+    }
+
+
+def build(layer, params, path):
+    """Write the GeoParquet export of (layer, filters) to `path`. Returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    spec = LAYERS[layer]
+    columns = spec['columns']
+    schema = pa.schema(
+        [pa.field(name, _arrow_type(pa, kind)) for name, _, kind in columns]
+        + [pa.field('geometry', pa.binary())],
+        metadata={b'geo': json.dumps(_geo_metadata(layer)).encode('utf-8')},
+    )
+    queryset = (
+        filterset(layer, params).qs
+        .annotate(geometry_wkb=AsWKB('geom'))
+        .order_by('id')
+        .values_list(*[orm for _, orm, _ in columns], 'geometry_wkb')
+    )
+
+    def record_batch(rows):
+        arrays = []
+        for i, field in enumerate(schema):
+            values = [row[i] for row in rows]
+            if i < len(columns) and columns[i][2] == 'json':
+                values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+            elif field.name == 'geometry':
+                values = [None if v is None else bytes(v) for v in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.record_batch(arrays, schema=schema)
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    count = 0
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        rows = []
+        for row in queryset.iterator(chunk_size=BATCH_ROWS):
+            rows.append(row)
+            if len(rows) >= BATCH_ROWS:
+                writer.write_batch(record_batch(rows))
+                count += len(rows)
+                rows = []
+        if rows:
+            writer.write_batch(record_batch(rows))
+            count += len(rows)
+    os.replace(tmp_path, path)
+    return count
+
+
+def _purge_stale(version):
+    """Remove exports of older data versions (past the grace period)."""
+    now = time.time()
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if f'-{version}-' in name:
+            continue
+        try:
+            if now - os.path.getmtime(path) > STALE_GRACE_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _build_in_background(layer, params, path, version):
+    try:
+        t0 = time.time()
+        count = build(layer, params, path)
+        logger.info('Export %s: %d rows in %.1fs', os.path.basename(path), count, time.time() - t0)
+        _purge_stale(version)
+    except Exception:
+        logger.exception('Export %s failed', os.path.basename(path))
+    finally:
+        with _lock:
+            _running.discard(path)
+        # Thread-local connection opened by the build
+        connection.close()
+
+
+def request_export(layer, params):
+    """
+    ('ready', path) when the export of the current data version exists,
+    else ('pending', path) — its build is started if not already running.
+    """
+    version = response_cache.data_version()
+    path = export_path(layer, params, version)
+    if os.path.exists(path):
+        return 'ready', path
+    with _lock:
+        if path not in _running:
+            _running.add(path)
+            threading.Thread(
+                target=_build_in_background,
+                args=(layer, dict(_normalised(layer, params)), path, version),
+                daemon=True,
+            ).start()
+    return 'pending', path
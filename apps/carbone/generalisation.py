@@ -0,0 +1,132 @@
+"""
+Pre-generalised geometries (table carbone_geometriegeneralisee).
+
+For every occupation / forest / zone and every zoom band of
+simplification.ZOOM_BANDS, the geometry is simplified and validated ONCE,
+at write time, with the tolerance of the band. The SQL tier of the API then
+reads it through a LEFT JOIN instead of running ST_MakeValid +
+ST_SimplifyPreserveTopology on every row of every request; a missing row
+(not generalised yet) falls back to the on-the-fly expression.
+
+Kept up to date by:
+  - signals.py         → save / delete through the ORM (admin, API, imports)
+  - generalise_geometries command → raw SQL writes, first install, repairs
+"""
+from django.db import connection, transaction
+
+from .simplification import ZOOM_BANDS, band_tolerance, zoom_band
+
+GENERALISED_TABLE = 'carbone_geometriegeneralisee'
+
+# layer → source table
+LAYER_TABLES = {
+    'occupation': 'carbone_occupationsol',
+    'forets': 'carbone_foretclassee',
+    'zones': 'carbone_zoneetude',
+}
+
+
+def _generalised(column, tolerance):
+    """Simplified + validated MultiPolygon expression (same as the SQL tier)."""
+    return (
+        f"ST_Multi(ST_CollectionExtract(ST_MakeValid("
+        f"ST_SimplifyPreserveTopology(ST_MakeValid({column}), {float(tolerance)})"
+        f"), 3))"
+    )
+
+
+def refresh(layer, ids=None, stale_only=False):
+    """
+    (Re)build the generalised geometries of a layer: the rows `ids`, every
+    row whose source changed since it was generalised (`stale_only`), or all.
+    Rows of deleted objects are purged. Returns the number of objects done.
+    Rows carry the updated_at of their source (stale when it differs): NOW()
+    is the start of the transaction, earlier than an auto_now set inside it.
+    """
+    table = LAYER_TABLES[layer]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if ids is not None:
+            ids = [int(i) for i in ids]
+        elif stale_only:
+            cursor.execute(f"""
+                SELECT t.id FROM {table} t
+                WHERE (
+                    SELECT COUNT(*) FROM {GENERALISED_TABLE} g
+                    WHERE g.couche = %s AND g.objet_id = t.id
+                      AND g.updated_at = t.updated_at
+                ) < %s;
+            """, [layer, len(ZOOM_BANDS)])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f"""
+            DELETE FROM {GENERALISED_TABLE} g
+            WHERE g.couche = %s
+              AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = g.objet_id);
+        """, [layer])
+        if ids == []:
+            return 0
+
+        id_filter, params = '', []
+        if ids is not None:
+            id_filter = 'WHERE t.id = ANY(%s)'
+            params = [ids]
+            cursor.execute(
+                f"DELETE FROM {GENERALISED_TABLE} WHERE couche = %s AND objet_id = ANY(%s);",
+                [layer, ids],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {GENERALISED_TABLE} WHERE couche = %s;", [layer])
+
+        for band, _, _ in ZOOM_BANDS:
+            cursor.execute(f"""
+                INSERT INTO {GENERALISED_TABLE} (couche, objet_id, bande, geom, updated_at)
+                SELECT %s, t.id, %s, {_generalised('t.geom', band_tolerance(layer, band))},
+                       t.updated_at
+                FROM {table} t
+                {id_filter};
+            """, [layer, band] + params)
+            done = cursor.rowcount
+    return done
+
+
+def forget(layer, object_id):
+    """Drop the generalised geometries of a deleted object."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {GENERALISED_TABLE} WHERE couche = %s AND objet_id = %s;",
+            [layer, object_id],
+        )
+
+
+def envelope_sql(bbox):
+    """ST_MakeEnvelope literal of a (west, south, east, north) bbox of floats."""
+    west, south, east, north = (float(v) for v in bbox)
+    return f"ST_MakeEnvelope({west!r}, {south!r}, {east!r}, {north!r}, 4326)"
+
+
+def geometry_sql(layer, alias, zoom, tolerance, clip=None):
+    """
+    SQL pieces selecting the geometry of `alias` for the zoom band of `zoom`.
+    Returns (join_sql, geom_expr, join_params): the stored generalised
+    geometry when available, else the on-the-fly simplification at
+    `tolerance`. Without zoom, only the on-the-fly expression is used.
+    With `clip` (a bbox), the geometry is first cut to it (ST_ClipByBox2D),
+    so only the visible part is simplified and serialised.
+    """
+    source = f"{alias}.geom"
+    generalised = "gg.geom"
+    if clip:
+        envelope = envelope_sql(clip)
+        source = f"ST_ClipByBox2D({source}, {envelope})"
+        generalised = f"ST_ClipByBox2D({generalised}, {envelope})"
+    fallback = f"ST_SimplifyPreserveTopology(ST_MakeValid({source}), {tolerance})"
+    band = zoom_band(zoom) if zoom else None
+    if not band:
+        return '', fallback, []
+    join = (
+        f"LEFT JOIN {GENERALISED_TABLE} gg ON gg.couche = %s "
+        f"AND gg.objet_id = {alias}.id AND gg.bande = %s"
+    )
+    # CASE, not COALESCE: a clipped generalised geometry may be legitimately empty
+    geom = f"CASE WHEN gg.geom IS NOT NULL THEN {generalised} ELSE {fallback} END"
+    return join, geom, [layer, band]
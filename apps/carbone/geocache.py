@@ -0,0 +1,305 @@
+"""
+Static GeoJSON cache (media/geocache/) — shared by the API views and the
+commands that write it (prebuild_geojson, import_stock_carbone).
+
+Every cache file is written together with pre-compressed siblings:
+    occupations_2003.json
+    occupations_2003.json.br   → brotli, quality 11
+    occupations_2003.json.gz   → gzip, level 9
+Compression happens ONCE at build time at the maximum level, instead of
+GZipMiddleware re-compressing the same megabytes on every request.
+FlatGeobuf files (occupations_2003.fgb) have no siblings: they are read by
+byte ranges.
+
+manifest.json describes every file (content hash, size, feature count,
+available encodings). The API derives a strong ETag from it and answers
+If-None-Match with a 304 without touching the file itself; a rebuild that
+produces identical bytes keeps the same ETag, so client caches survive it.
+
+Generations: prebuild_geojson writes a complete new directory
+    media/geocache/v20260101T120000-1234/   (files + siblings + manifest.json)
+then switches media/geocache/CURRENT (one line: the generation name) with
+an atomic rename. The API always reads ONE coherent generation: no missing
+file (SQL fallback) and no old/new mix while a build is running. Without
+CURRENT, the flat media/geocache/ directory (committed files) is served.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # whitenoise[brotli] absent : gzip seul
+    brotli = None
+
+GEOCACHE_DIR = os.path.join(settings.MEDIA_ROOT, 'geocache')
+
+MANIFEST_NAME = 'manifest.json'
+
+# Pointer file naming the live generation, and generation directory names
+CURRENT_NAME = 'CURRENT'
+GENERATION_RE = re.compile(r'^v\d{8}T\d{6}-\d+$')
+
+# (Content-Encoding, file suffix), by order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Extensions of the cache files (.fgb: FlatGeobuf, served with byte ranges)
+CACHE_EXTENSIONS = ('.json', '.fgb')
+
+
+def cache_filename(stem, band=None, ext='json'):
+    """'occupations_2023' (+ zoom band 'z11') → 'occupations_2023.z11.json'."""
+    return f'{stem}.{band}.{ext}' if band else f'{stem}.{ext}'
+
+
+def write_bytes(path, data):
+    """
+    Write a file through a temporary name + rename: readers never see a
+    partial file, and a file hard-linked from another generation is
+    replaced instead of being overwritten in place.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_compressed(path):
+    """Write the .gz (and .br if available) siblings of a cache file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    # mtime=0 : same input → same bytes (no spurious cache busting)
+    write_bytes(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        write_bytes(path + '.br', brotli.compress(data, quality=11))
+    elif os.path.exists(path + '.br'):
+        # Never leave a stale sibling next to a rebuilt file
+        os.remove(path + '.br')
+
+
+def accepted_encodings(request):
+    """Content-codings accepted by the client (q=0 excluded)."""
+    accepted = set()
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def pick_encoding(request, path):
+    """
+    Return (encoding, sibling_path) for the best pre-compressed sibling of
+    `path` accepted by the client, or (None, path) to send the raw file.
+    A sibling older than its source file is ignored.
+    """
+    accepted = accepted_encodings(request)
+    if not accepted:
+        return None, path
+
+    mtime = os.path.getmtime(path)
+    for encoding, suffix in ENCODINGS:
+        if encoding not in accepted and '*' not in accepted:
+            continue
+        sibling = path + suffix
+        try:
+            if os.path.getmtime(sibling) >= mtime:
+                return encoding, sibling
+        except OSError:
+            continue
+    return None, path
+
+
+# ----------------------------------------------------------------------
+# Generations
+# ----------------------------------------------------------------------
+# Per-process copy of the CURRENT pointer, re-read when the file changes
+_current = {'mtime': None, 'dir': GEOCACHE_DIR}
+
+
+def current_dir():
+    """Directory of the live generation (flat GEOCACHE_DIR if none)."""
+    pointer = os.path.join(GEOCACHE_DIR, CURRENT_NAME)
+    try:
+        mtime = os.path.getmtime(pointer)
+    except OSError:
+        return GEOCACHE_DIR
+    if mtime != _current['mtime']:
+        try:
+            with open(pointer, encoding='utf-8') as f:
+                name = f.read().strip()
+        except OSError:
+            return GEOCACHE_DIR
+        path = os.path.join(GEOCACHE_DIR, name)
+        _current['dir'] = path if GENERATION_RE.match(name) and os.path.isdir(path) else GEOCACHE_DIR
+        _current['mtime'] = mtime
+    return _current['dir']
+
+
+def new_generation():
+    """Create and return an empty generation directory (not live yet)."""
+    name = f"v{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    path = os.path.join(GEOCACHE_DIR, name)
+    os.makedirs(path)
+    return path
+
+
+def carry_forward(source_dir, target_dir, filenames):
+    """
+    Hard-link (copy across filesystems) cache files and their compressed
+    siblings from one generation to another. Returns the names carried.
+    """
+    carried = []
+    for filename in filenames:
+        for name in [filename] + [filename + suffix for _, suffix in ENCODINGS]:
+            src = os.path.join(source_dir, name)
+            if not os.path.isfile(src):
+                continue
+            dst = os.path.join(target_dir, name)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+        if os.path.isfile(os.path.join(target_dir, filename)):
+            carried.append(filename)
+    return carried
+
+
+def publish(generation_dir):
+    """Make a generation live: atomic rewrite of the CURRENT pointer."""
+    pointer = os.path.join(GEOCACHE_DIR, CURRENT_NAME)
+    tmp_path = pointer + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(generation_dir) + '\n')
+    os.replace(tmp_path, pointer)
+
+
+def collect_garbage(keep=2):
+    """
+    Delete old generations, keeping the `keep` most recent ones older than
+    or equal to the live one (the previous generation stays for the requests
+    still reading it). Newer, unpublished builds are left alone.
+    Returns the names removed.
+    """
+    live = os.path.basename(current_dir())
+    names = sorted(
+        (n for n in os.listdir(GEOCACHE_DIR)
+         if GENERATION_RE.match(n) and os.path.isdir(os.path.join(GEOCACHE_DIR, n))),
+        reverse=True,
+    )
+    older = [n for n in names if n <= live] if GENERATION_RE.match(live) else names
+    removed = []
+    for name in older[max(1, keep):]:
+        shutil.rmtree(os.path.join(GEOCACHE_DIR, name), ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+# ----------------------------------------------------------------------
+# Manifest
+# ----------------------------------------------------------------------
+def finalize(path, features, compress=True):
+    """
+    Write the compressed siblings of a freshly written cache file and
+    return its manifest entry. Files served with byte ranges (FlatGeobuf)
+    are finalized with compress=False: ranges address the identity bytes.
+    """
+    if compress:
+        write_compressed(path)
+    else:
+        for _, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    entry = {
+        'sha256': digest,
+        'size': os.path.getsize(path),
+        'features': features,
+        'encodings': {},
+    }
+    for encoding, suffix in ENCODINGS:
+        if os.path.exists(path + suffix):
+            entry['encodings'][encoding] = os.path.getsize(path + suffix)
+    return entry
+
+
+def read_manifest(cache_dir=None):
+    """
+    Manifest dict {filename: entry} read from disk ({} if absent/corrupt).
+    `cache_dir` defaults to the live generation.
+    """
+    cache_dir = cache_dir or current_dir()
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def update_manifest(entries, remove=(), cache_dir=None):
+    """Merge `entries` into the manifest (dropping `remove`), atomically."""
+    cache_dir = cache_dir or current_dir()
+    files = read_manifest(cache_dir)
+    for name in remove:
+        files.pop(name, None)
+    files.update(entries)
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'files': files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Per-process copy of the manifest, reloaded when the file (or generation) changes
+_manifest = {'key': None, 'files': {}}
+
+
+def manifest_entry(filename, cache_dir=None):
+    """Manifest entry of a cache file, or None (one stat of manifest.json)."""
+    cache_dir = cache_dir or current_dir()
+    try:
+        mtime = os.path.getmtime(os.path.join(cache_dir, MANIFEST_NAME))
+    except OSError:
+        return None
+    if (cache_dir, mtime) != _manifest['key']:
+        _manifest['files'] = read_manifest(cache_dir)
+        _manifest['key'] = (cache_dir, mtime)
+    return _manifest['files'].get(filename)
+
+
+def entry_encoding(request, entry):
+    """Best encoding listed in a manifest entry and accepted by the client."""
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if encoding in entry.get('encodings', {}) and (
+            encoding in accepted or '*' in accepted
+        ):
+            return encoding, suffix
+    return None, ''
+
+
+def etag(entry, encoding=None):
+    """Strong ETag of one representation (each encoding has its own bytes)."""
+    tag = entry['sha256'][:32]
+    if encoding:
+        tag += f'-{encoding}'
+    return f'"{tag}"'
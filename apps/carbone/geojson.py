@@ -0,0 +1,99 @@
+"""
+Streaming GeoJSON straight from PostGIS.
+
+A `json_agg` query returns the whole FeatureCollection as ONE value: PostgreSQL
+builds it, psycopg2 materialises it, and nothing is sent before the last
+polygon is serialised. Here the query returns ONE feature per row instead
+(`json_build_object(...)::text AS feat`), read in batches through a named
+server-side cursor (connection.chunked_cursor) and written out as it comes:
+worker memory is bounded by the batch size and the first bytes leave
+immediately, whatever the size of the layer.
+
+Used by the SQL tier of the API (StreamingHttpResponse) and by
+prebuild_geojson (written directly to the cache file).
+"""
+import json
+import os
+
+from django.db import connection, transaction
+
+# Rows fetched per round-trip of the server-side cursor
+FETCH_SIZE = 200
+
+# Bytes buffered before a chunk is handed to the response / file
+CHUNK_BYTES = 64 * 1024
+
+_HEAD = b'{"type":"FeatureCollection","features":['
+_TAIL = b']}'
+
+
+def iter_features(sql, params=None, fetch_size=FETCH_SIZE):
+    """
+    Yield the features (JSON text) of a query returning one feature per row,
+    through a server-side cursor. NULL rows are skipped. A consumer stopping
+    early must close() the generator (contextlib.closing): the cursor and its
+    transaction are then released at once, not by the garbage collector.
+    """
+    # Named cursors live inside a transaction (no WITH HOLD materialisation)
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params or [])
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for (feature,) in rows:
+                if feature:
+                    yield feature
+
+
+def _head(members=None):
+    """Opening bytes of a FeatureCollection, with extra top-level `members`."""
+    if not members:
+        return _HEAD
+    extra = json.dumps(members, ensure_ascii=False, separators=(',', ':'))[1:-1]
+    return b'{"type":"FeatureCollection",' + extra.encode('utf-8') + b',"features":['
+
+
+def feature_collection_chunks(features, counter=None, members=None):
+    """
+    Yield a FeatureCollection as bytes chunks of ~CHUNK_BYTES from an
+    iterable of feature JSON texts. `counter` (a list) receives the
+    number of features once the collection is complete. `members` (a dict)
+    are written before "features" (e.g. the compact dictionaries).
+    `features` is closed on exit, also when the consumer stops early
+    (client gone: the response closes this generator).
+    """
+    head = _head(members)
+    buffer = [head]
+    size = len(head)
+    count = 0
+    try:
+        for feature in features:
+            data = feature.encode('utf-8')
+            buffer.append(b',' + data if count else data)
+            size += len(data) + 1
+            count += 1
+            if size >= CHUNK_BYTES:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+    finally:
+        if hasattr(features, 'close'):
+            features.close()
+    buffer.append(_TAIL)
+    yield b''.join(buffer)
+    if counter is not None:
+        counter.append(count)
+
+
+def write_feature_collection(path, sql, params=None, members=None):
+    """
+    Stream a one-feature-per-row query into a GeoJSON file (temporary name
+    + rename: readers never see a partial file). Returns the feature count.
+    """
+    counter = []
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for chunk in feature_collection_chunks(iter_features(sql, params), counter, members):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return counter[0]
@@ -0,0 +1,117 @@
+"""
+Hexagon-grid aggregation of the occupations (deforestation hotspots).
+
+At overview zoom the occupation layer is megabytes of polygons nobody can
+read. A uniform hexagonal grid over the department (ST_HexagonGrid) gives a
+few thousand light cells; each carries, per year, the area and carbon stock
+of every cover class, their totals and the forest area, plus the change
+between consecutive years — the deforestation pattern becomes a choropleth.
+
+Cells are computed on the subdivided pieces (subdivision.py): each
+hexagon only intersects the small pieces under it. Carbon = area x the
+reference stock of the class. Built per cell size by prebuild_geojson
+(hexagones_<taille>.json, static cache) and served by GET /api/v1/hexagones/
+from that file only: the department-wide overlay is far too slow for a
+request.
+
+Sizes are in EPSG:3857 metres (hexagon edge length): at the latitude of Oumé
+(6.5° N) ground distances are ~0.6% shorter.
+"""
+from .constants import ANNEES_VALIDES
+from .subdivision import pieces_sql
+
+# Edge lengths (m) served by the API and pre-built
+HEX_SIZES = (1000, 2000, 5000)
+DEFAULT_SIZE = 2000
+
+# Classes counted as forest in foret_ha / variations
+FOREST_CLASSES = ['FORET_DENSE', 'FORET_CLAIRE', 'FORET_DEGRADEE']
+
+
+def cache_stem(size):
+    """Stem of the static cache file of a cell size."""
+    return f'hexagones_{size}'
+
+
+def features_sql(size):
+    """(sql, params): one hexagon feature (JSON text) per row, cells with data only (prebuild)."""
+    sql = """
+        WITH bounds AS (
+            SELECT ST_Transform(COALESCE(
+                (SELECT ST_Union(geom) FROM carbone_zoneetude WHERE type_zone = 'DEPARTEMENT'),
+                (SELECT ST_SetSRID(ST_Extent(geom)::geometry, 4326)
+                 FROM carbone_occupationsol)
+            ), 3857) AS geom
+        ),
+        hexes AS (
+            SELECT h.i, h.j, ST_Transform(h.geom, 4326) AS geom
+            FROM bounds b, ST_HexagonGrid(%s, b.geom) h
+            WHERE ST_Intersects(h.geom, b.geom)
+        ),
+        parts AS (
+            SELECT x.i, x.j, o.annee, o.nomenclature_id,
+                   SUM(ST_Area(ST_Intersection(x.geom, s.geom)::geography)) / 10000.0 AS ha
+            FROM hexes x
+            JOIN {pieces} s ON ST_Intersects(x.geom, s.geom)
+            JOIN carbone_occupationsol o ON o.id = s.objet_id
+            GROUP BY x.i, x.j, o.annee, o.nomenclature_id
+        ),
+        years AS (
+            SELECT k.i, k.j, y.annee,
+                   json_object_agg(n.code, ROUND(p.ha::numeric, 2) ORDER BY n.ordre_affichage)
+                       FILTER (WHERE p.ha IS NOT NULL) AS superficie,
+                   json_object_agg(
+                       n.code,
+                       ROUND((p.ha * COALESCE(n.stock_carbone_reference, 0))::numeric, 1)
+                       ORDER BY n.ordre_affichage
+                   ) FILTER (WHERE p.ha IS NOT NULL) AS carbone_types,
+                   COALESCE(SUM(p.ha * COALESCE(n.stock_carbone_reference, 0)), 0) AS carbone,
+                   COALESCE(SUM(p.ha) FILTER (WHERE n.code = ANY(%s)), 0) AS foret_ha
+            FROM (SELECT DISTINCT i, j FROM parts) k
+            CROSS JOIN unnest(%s::smallint[]) AS y(annee)
+            LEFT JOIN parts p ON p.i = k.i AND p.j = k.j AND p.annee = y.annee
+            LEFT JOIN carbone_nomenclaturecouvert n ON n.id = p.nomenclature_id
+            GROUP BY k.i, k.j, y.annee
+        ),
+        changes AS (
+            SELECT years.*,
+                   LAG(annee) OVER w AS annee_prec,
+                   foret_ha - LAG(foret_ha) OVER w AS d_foret,
+                   carbone - LAG(carbone) OVER w AS d_carbone
+            FROM years
+            WINDOW w AS (PARTITION BY i, j ORDER BY annee)
+        ),
+        cells AS (
+            SELECT i, j,
+                   json_object_agg(annee, json_build_object(
+                       'superficie_ha', COALESCE(superficie, '{{}}'::json),
+                       'carbone_tco2_par_type', COALESCE(carbone_types, '{{}}'::json),
+                       'carbone_tco2', ROUND(carbone::numeric, 1),
+                       'foret_ha', ROUND(foret_ha::numeric, 2)
+                   ) ORDER BY annee) AS annees,
+                   json_object_agg(annee_prec::text || '-' || annee::text, json_build_object(
+                       'foret_ha', ROUND(d_foret::numeric, 2),
+                       'carbone_tco2', ROUND(d_carbone::numeric, 1)
+                   ) ORDER BY annee) FILTER (WHERE annee_prec IS NOT NULL) AS variations,
+                   SUM(d_foret) AS variation_foret
+            FROM changes
+            GROUP BY i, j
+        )
+        SELECT json_build_object(
+            'type', 'Feature',
+            'id', c.i || ':' || c.j,
+            'geometry', ST_AsGeoJSON(x.geom, 6)::json,
+            'properties', json_build_object(
+                'i', c.i,
+                'j', c.j,
+                'taille_m', %s,
+                'annees', c.annees,
+                'variations', COALESCE(c.variations, '{{}}'::json),
+                'variation_foret_ha', ROUND(COALESCE(c.variation_foret, 0)::numeric, 2)
+            )
+        )::text AS feat
+        FROM cells c
+        JOIN hexes x ON x.i = c.i AND x.j = c.j
+        ORDER BY c.j, c.i
+    """.format(pieces=pieces_sql('occupation'))
+    return sql, [size, FOREST_CLASSES, sorted(ANNEES_VALIDES), size]
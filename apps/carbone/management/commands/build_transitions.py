@@ -0,0 +1,135 @@
+"""
+Compute the land-cover transition matrices (apps/carbone/transitions.py):
+geometric overlay of the occupations of every forest, for every pair of
+years in ANNEES_VALIDES.
+
+Offline job: run after imports (docker-entrypoint.sh does). Stale pieces are
+re-subdivided first; overlays whose source occupations did not change are
+skipped.
+
+Usage:
+    python manage.py build_transitions                   # Changed overlays only
+    python manage.py build_transitions --all             # Everything
+    python manage.py build_transitions --jobs 4          # 4 overlays concurrently
+    python manage.py build_transitions --foret TENE
+    python manage.py build_transitions --skip-geometries # Matrices only, no change layer
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django import db
+from django.core.management.base import BaseCommand
+
+from apps.carbone import cache, subdivision, transitions
+from apps.carbone.models import ForetClassee
+
+
+def _run_overlay(task, geometries):
+    """One overlay; entry point of the --jobs process pool (own DB connection)."""
+    t0 = time.time()
+    foret_id, annee_debut, annee_fin, signature = task
+    cells = transitions.overlay(foret_id, annee_debut, annee_fin, signature, geometries)
+    return cells, time.time() - t0
+
+
+class Command(BaseCommand):
+    help = 'Compute the land-cover transition matrices between years (spatial overlay)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--foret', help='Only this forest (code)')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Recompute every overlay, not only the changed ones',
+        )
+        parser.add_argument(
+            '--jobs', type=int, default=1,
+            help='Run N overlays concurrently (process pool, one DB connection per worker)',
+        )
+        parser.add_argument(
+            '--skip-geometries', action='store_true',
+            help='Areas only: no change polygons (losses / gains layer)',
+        )
+
+    def handle(self, *args, **options):
+        t0 = time.time()
+
+        # The overlay reads the pieces: bring them up to date first
+        pieces = subdivision.refresh('occupation', stale_only=True)
+        if pieces:
+            self.stdout.write(f'  OK occupation: {pieces} pieces re-subdivided')
+
+        forets = ForetClassee.objects.order_by('code')
+        if options['foret']:
+            forets = forets.filter(code__iexact=options['foret'])
+        forets = list(forets.values_list('id', 'code'))
+        codes = dict(forets)
+
+        signatures = transitions.source_signatures()
+        stored = transitions.stored_signatures()
+        tasks, keys = [], []
+        for foret_id, _ in forets:
+            for annee_debut, annee_fin in transitions.year_pairs():
+                key = (foret_id, annee_debut, annee_fin)
+                keys.append(key)
+                signature = transitions.pair_signature(signatures, *key)
+                if options['all'] or stored.get(key) != signature:
+                    tasks.append((*key, signature))
+        if not options['foret']:
+            removed = transitions.forget_obsolete(keys)
+            if removed:
+                self.stdout.write(f'  Removed {removed} obsolete cells')
+
+        skipped = len(keys) - len(tasks)
+        if skipped:
+            self.stdout.write(f'  {skipped} overlays unchanged, skipped')
+
+        geometries = not options['skip_geometries']
+        jobs = max(1, options['jobs'])
+        if jobs > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING(
+                '  --jobs needs the fork start method (Linux/macOS): running sequentially'
+            ))
+            jobs = 1
+
+        failed = 0
+
+        def report(task, get_result):
+            nonlocal failed
+            foret_id, annee_debut, annee_fin, _ = task
+            label = f'{codes[foret_id]} {annee_debut}->{annee_fin}'
+            try:
+                cells, seconds = get_result()
+            except Exception as e:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f'  FAILED {label}: {e}'))
+                return
+            self.stdout.write(f'  OK {label}: {cells} cells in {seconds:.1f}s')
+
+        if jobs == 1:
+            for task in tasks:
+                report(task, lambda: _run_overlay(task, geometries))
+        elif tasks:
+            # Never share a connection with the children: they reconnect lazily
+            db.connections.close_all()
+            self.stdout.write(f'  Running {len(tasks)} overlays on {jobs} workers...')
+            with ProcessPoolExecutor(
+                max_workers=jobs, mp_context=multiprocessing.get_context('fork'),
+            ) as pool:
+                futures = {pool.submit(_run_overlay, task, geometries): task for task in tasks}
+                for future in as_completed(futures):
+                    report(futures[future], future.result)
+
+        if tasks:
+            # Cached transition / change responses
+            cache.bump_data_version()
+
+        elapsed = round(time.time() - t0, 1)
+        if failed:
+            self.stderr.write(self.style.ERROR(
+                f'\nTransitions: {failed} of {len(tasks)} overlays FAILED ({elapsed}s)'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'\nOK Transitions complete: {len(tasks)} overlays in {elapsed}s'
+        ))
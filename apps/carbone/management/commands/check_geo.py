@@ -98,7 +98,7 @@ class Command(BaseCommand):
                             'properties', json_build_object('id', o.id)
                         )
                     ), '[]'::json)
-                )
+                )::text
                 FROM carbone_occupationsol o
                 WHERE o.annee = 1986;
             """)
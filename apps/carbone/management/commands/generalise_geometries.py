@@ -0,0 +1,55 @@
+"""
+(Re)build the derived geometry tables read by the API SQL tier:
+  - carbone_geometriegeneralisee: one simplified geometry per zoom band
+    (apps/carbone/generalisation.py)
+  - carbone_geometriesubdivisee: ST_Subdivide pieces of occupations and
+    forests, for spatial filters (apps/carbone/subdivision.py)
+
+ORM writes are followed by signals; this command covers everything else:
+first install, raw SQL updates (simplify_geometries, _ensure_department_boundary),
+new zoom bands or tolerances.
+
+Usage:
+    python manage.py generalise_geometries                   # Stale rows only
+    python manage.py generalise_geometries --all             # Everything
+    python manage.py generalise_geometries --layer occupation
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.carbone import cache, generalisation, subdivision
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the generalised (per zoom band) and subdivided geometries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layer', choices=sorted(generalisation.LAYER_TABLES),
+            help='Only this layer',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild every object, not only the stale ones',
+        )
+
+    def handle(self, *args, **options):
+        t0 = time.time()
+        layers = [options['layer']] if options['layer'] else list(generalisation.LAYER_TABLES)
+        total = 0
+        for layer in layers:
+            t1 = time.time()
+            done = generalisation.refresh(layer, stale_only=not options['all'])
+            total += done
+            self.stdout.write(f'  OK {layer}: {done} objects in {time.time() - t1:.1f}s')
+            if layer in subdivision.LAYER_TABLES:
+                t1 = time.time()
+                pieces = subdivision.refresh(layer, stale_only=not options['all'])
+                self.stdout.write(f'  OK {layer}: {pieces} pieces in {time.time() - t1:.1f}s')
+        if total:
+            # Responses of the SQL tier embed these geometries
+            cache.bump_data_version()
+
+        elapsed = round(time.time() - t0, 1)
+        self.stdout.write(self.style.SUCCESS(f'\nOK Generalisation complete: {elapsed}s'))
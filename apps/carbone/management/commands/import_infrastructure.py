@@ -3,6 +3,7 @@ import geopandas as gpd
 from django.core.management.base import BaseCommand
 from django.contrib.gis.geos import GEOSGeometry
 from django.conf import settings
+from apps.carbone import signals
 from apps.carbone.models import Infrastructure
 
 
@@ -41,6 +42,11 @@ class Command(BaseCommand):
         parser.add_argument('--clear', action='store_true')
 
     def handle(self, *args, **options):
+        # Receivers off: one data version bump at the end, not one per row
+        with signals.bulk():
+            self._import(**options)
+
+    def _import(self, **options):
         data_dir = options['data_dir']
 
         if options['clear']:
@@ -5,6 +5,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
 from django.conf import settings
 from django.db.models import Count
+from apps.carbone import signals
 from apps.carbone.models import OccupationSol, ForetClassee, NomenclatureCouvert
 
 
@@ -125,6 +126,12 @@ class Command(BaseCommand):
     # Main handle
     # ------------------------------------------------------------------
     def handle(self, *args, **options):
+        # Receivers off (fast --clear delete, no per-row work): geometries,
+        # statistics and data version caught up once at the end
+        with signals.bulk():
+            self._import(**options)
+
+    def _import(self, **options):
         data_dir = options['data_dir']
         target_year = options.get('year')
 
@@ -139,6 +146,7 @@ class Command(BaseCommand):
         if not forets:
             self.stdout.write(self.style.ERROR('No forests found. Run import_forets first.'))
             return
+        prepared = {code: f.geom.prepared for code, f in forets.items()}
 
         nomenclatures = {n.code: n for n in NomenclatureCouvert.objects.all()}
         if not nomenclatures:
@@ -198,7 +206,9 @@ class Command(BaseCommand):
                             # la géométrie réellement contenue dans cette forêt.
                             matched = False
                             for code, foret in forets.items():
-                                if not foret.geom.intersects(geom):
+                                # Prepared geometry: the forest is indexed once
+                                # and reused for every polygon of the shapefile
+                                if not prepared[code].intersects(geom):
                                     continue
                                 clipped = self._to_multipolygon(
                                     foret.geom.intersection(geom)
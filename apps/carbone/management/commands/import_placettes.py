@@ -3,6 +3,7 @@ import geopandas as gpd
 from django.core.management.base import BaseCommand
 from django.contrib.gis.geos import GEOSGeometry
 from django.conf import settings
+from apps.carbone import signals
 from apps.carbone.models import Placette, ForetClassee
 
 
@@ -16,6 +17,11 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # Receivers off: one data version bump at the end, not one per row
+        with signals.bulk():
+            self._import(**options)
+
+    def _import(self, **options):
         data_dir = options['data_dir']
         shp_path = os.path.join(data_dir, 'Placettes.shp')
 
@@ -2,7 +2,8 @@
 Import carbon stock spatialization shapefile -> static GeoJSON cache.
 
 Reads data_carb.shp (UTM Zone 30N), simplifies in UTM space (fast),
-reprojects to WGS84, and writes media/geocache/stock_carbone.json.
+reprojects to WGS84, and writes media/geocache/stock_carbone.json
+(+ its pre-compressed .br / .gz siblings and manifest entry).
 
 Usage:
     python manage.py import_stock_carbone --shapefile "path/to/data_carb.shp"
@@ -14,7 +15,7 @@ import geopandas as gpd
 from shapely.validation import make_valid
 from shapely.geometry import Polygon, MultiPolygon
 from django.core.management.base import BaseCommand
-from django.conf import settings
+from apps.carbone import geocache
 from apps.carbone.constants import (
     STOCK_CARBONE_CLASS_MAP,
     STOCK_CARBONE_COLORS,
@@ -75,14 +76,14 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             '--output', default=None,
-            help='Output path (default: media/geocache/stock_carbone.json)',
+            help='Output path (default: stock_carbone.json in the live geocache generation)',
         )
 
     def handle(self, *args, **options):
         shapefile_path = options['shapefile']
         tolerance = options['tolerance']
         output_path = options['output'] or os.path.join(
-            settings.MEDIA_ROOT, 'geocache', 'stock_carbone.json'
+            geocache.current_dir(), 'stock_carbone.json'
         )
 
         if not os.path.isfile(shapefile_path):
@@ -169,8 +170,14 @@ class Command(BaseCommand):
         # -- Step 7: Write GeoJSON --
         geojson = {'type': 'FeatureCollection', 'features': features}
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(geojson, f, ensure_ascii=False, separators=(',', ':'))
+        geocache.write_bytes(output_path, json.dumps(
+            geojson, ensure_ascii=False, separators=(',', ':'),
+        ).encode('utf-8'))
+        entry = geocache.finalize(output_path, len(features))
+        # Only files of the live generation are served (and listed in its manifest)
+        cache_dir = os.path.dirname(os.path.abspath(output_path))
+        if cache_dir == os.path.abspath(geocache.current_dir()):
+            geocache.update_manifest({os.path.basename(output_path): entry}, cache_dir=cache_dir)
 
         size_mb = os.path.getsize(output_path) / (1024 * 1024)
         self.stdout.write(self.style.SUCCESS(
@@ -6,30 +6,80 @@ this command pre-generates simplified GeoJSON files ONCE and stores them
 as static cache files. The API then serves these files directly with
 near-instant response times (< 50ms vs 2-5 seconds).
 
-Cache structure:
-  media/geocache/
+Cache structure (one generation, see apps/carbone/geocache.py):
+  media/geocache/CURRENT            → name of the live generation
+  media/geocache/v20260101T120000-1234/
     occupations_1986.json         → all occupation year 1986
+    occupations_1986.json.br/.gz  → pre-compressed siblings (every file)
     occupations_2003.json         → all occupation year 2003
     occupations_2023.json         → all occupation year 2023
     occupations_1986_TENE.json    → occupation year 1986 filtered by TENE
     ...
     forets.json                   → all forest boundaries
     zones.json                    → all admin zones (incl. Oumé fallback)
+    occupations_2023.z11.json     → same layer simplified for zoom band z10-11
+    forets.z14.json, zones.z9.json ... (bands from simplification.ZOOM_BANDS)
+    occupations_2023.attrs.json   → same features, centroid + bbox instead of the
+                                    polygon (fields= / geometry= requests)
+    occupations_2023.compact.json → dictionary-encoded properties (compact=1),
+    occupations_2023.compact.z11.json ...   one per occupation file and band
+    occupations_2023.topo.json    → TopoJSON, shared arcs (format=topojson),
+    forets.topo.z14.json ...        one per occupation / forest / zone file and band
+    occupations_2023.fgb          → FlatGeobuf + packed Hilbert R-tree, one per
+    occupations_2023_TENE.fgb       year / year+forest (byte ranges, /api/v1/fgb/)
+    hexagones_2000.json           → hexagon grid, per-year stats per cell, one per
+                                    size of hexagons.HEX_SIZES (/api/v1/hexagones/)
+    manifest.json                 → sha256 / size / features / fingerprint per file
+
+Incremental: every file is tied to a fingerprint of the rows it is built
+from (row count, max updated_at, id checksum) and of the build parameters.
+A file whose fingerprint matches the manifest is not rebuilt; --force
+rebuilds everything.
+
+Atomic: changed files are built into a NEW generation directory, unchanged
+ones are hard-linked from the live one, and CURRENT is switched only once
+every file is complete (never if a file failed). Old generations are then
+deleted (--keep).
+
+Variants: on top of the base files (occupations per year and year+forest,
+forets.json, zones.json), the zoom bands and the compact files (sent by the
+map on every request) and the hexagon grids (no SQL fallback) are built by
+default (DEFAULT_VARIANTS). Attribute sidecars, TopoJSON / FlatGeobuf files
+are opt-in (--with);
+--without drops a default one. A variant file that is not requested is carried over while its fingerprint
+still matches, and dropped once stale: the API then falls back to the base
+file or the SQL tier, never to outdated data.
 
 Usage:
-    python manage.py prebuild_geojson              # Build all
+    python manage.py prebuild_geojson              # Base files + default variants
     python manage.py prebuild_geojson --year 2023  # Rebuild one year only
-    python manage.py prebuild_geojson --clear      # Clear cache first
+    python manage.py prebuild_geojson --clear      # Fresh generation (stock_carbone kept)
+    python manage.py prebuild_geojson --with attrs,fgb  # + these variants
+    python manage.py prebuild_geojson --without bands   # Minus a default variant
+    python manage.py prebuild_geojson --with all   # Every variant (see VARIANTS)
+    python manage.py prebuild_geojson --jobs 4     # 4 files built concurrently
+    python manage.py prebuild_geojson --force      # Ignore fingerprints, rebuild all
+    python manage.py prebuild_geojson --keep 3     # Keep 3 generations on disk
 """
+import hashlib
+import io
 import os
 import json
 import time
+import multiprocessing
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-from django.core.management.base import BaseCommand
+import geopandas as gpd
+from django import db
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
-from django.conf import settings
 
+from apps.carbone import compact as compact_encoding, geocache, hexagons, topojson
+from apps.carbone.constants import ANNEES_VALIDES
+from apps.carbone.geojson import iter_features, write_feature_collection
 from apps.carbone.models import ForetClassee, ZoneEtude
+from apps.carbone.simplification import ZOOM_BANDS, band_tolerance
 
 
 # ====================================================================
@@ -45,7 +95,40 @@ TOLERANCES = {
 # GeoJSON coordinate precision: 4 decimals ≈ 11m (suffisant à cette échelle)
 GEOJSON_PRECISION = 4
 
-CACHE_DIR = os.path.join(settings.MEDIA_ROOT, 'geocache')
+# Files of other commands, carried over by --clear (import_stock_carbone)
+PRESERVE_PREFIXES = ('stock_carbone',)
+
+# Bump when the SQL of a _build_* method changes: invalidates every fingerprint
+BUILD_VERSION = 2
+
+# Variants, on top of the base files: built by default / opt-in (--with)
+VARIANTS = ('bands', 'attrs', 'compact', 'topojson', 'fgb', 'hexagons')
+DEFAULT_VARIANTS = ('bands', 'compact', 'hexagons')
+
+
+def _run_task(task, cache_dir):
+    """
+    Build ONE cache file into `cache_dir`. Entry point of the --jobs process
+    pool: each worker opens its own database connection (Django connects
+    lazily) and its output is captured, then printed by the parent in one block.
+    Returns (filename, manifest entry, log, seconds).
+    """
+    method, args = task
+    out = io.StringIO()
+    t0 = time.time()
+    command = Command(stdout=out, stderr=out)
+    command.cache_dir = cache_dir
+    filename, entry = getattr(command, method)(*args)
+    return filename, entry, out.getvalue(), time.time() - t0
+
+
+def _fingerprint(data, tolerance, band):
+    """Fingerprint of one cache file: its source rows + how it is built."""
+    payload = json.dumps(
+        [BUILD_VERSION, GEOJSON_PRECISION, tolerance, band, data],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
 
 
 class Command(BaseCommand):
@@ -53,80 +136,394 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--year', type=int, help='Only rebuild this year')
-        parser.add_argument('--clear', action='store_true', help='Clear cache before building')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Build a fresh generation (only stock_carbone is carried over; not with --year)',
+        )
         parser.add_argument(
             '--tolerance', type=float,
             help='Override simplification tolerance for occupation',
         )
+        parser.add_argument(
+            '--with', dest='variants', default='',
+            help=f'Also build these variants, comma-separated: {", ".join(VARIANTS)} (or all)',
+        )
+        parser.add_argument(
+            '--without', dest='exclude', default='',
+            help=f'Do not build these default variants ({", ".join(DEFAULT_VARIANTS)})',
+        )
+        parser.add_argument(
+            '--jobs', type=int, default=1,
+            help='Build N files concurrently (process pool, one DB connection per worker)',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild every file, even those whose data fingerprint is unchanged',
+        )
+        parser.add_argument(
+            '--keep', type=int, default=2,
+            help='Generations kept on disk after a successful build (default: 2)',
+        )
 
     def handle(self, *args, **options):
+        if options['clear'] and options.get('year'):
+            # The fresh generation would hold that year only: CURRENT would
+            # lose the files of every other year
+            raise CommandError('--clear ne se combine pas avec --year')
+        added = {v.strip() for v in options['variants'].split(',') if v.strip()}
+        if 'all' in added:
+            added = set(VARIANTS)
+        excluded = {v.strip() for v in options['exclude'].split(',') if v.strip()}
+        unknown = (added | excluded) - set(VARIANTS)
+        if unknown:
+            raise CommandError(
+                f'--with / --without : variante(s) inconnue(s) {", ".join(sorted(unknown))} '
+                f'(choix : {", ".join(VARIANTS)}, all)'
+            )
+        variants = (set(DEFAULT_VARIANTS) | added) - excluded
         t0 = time.time()
-        os.makedirs(CACHE_DIR, exist_ok=True)
-
-        if options['clear']:
-            # Préserver les fichiers générés par d'AUTRES commandes
-            # (stock_carbone* vient de import_stock_carbone, pas du prebuild)
-            preserve = ('stock_carbone',)
-            for f in os.listdir(CACHE_DIR):
-                if f.endswith('.json') and not f.startswith(preserve):
-                    os.remove(os.path.join(CACHE_DIR, f))
-            self.stdout.write(self.style.WARNING('Cache cleared (stock_carbone préservé)'))
+        os.makedirs(geocache.GEOCACHE_DIR, exist_ok=True)
+        live_dir = geocache.current_dir()
 
         occ_tolerance = options.get('tolerance') or TOLERANCES['occupation']
         target_year = options.get('year')
+        # Every variant is planned (its fingerprint tells whether a carried-over
+        # file is stale); only those in `variants` are built
+        bands = [name for name, _, _ in ZOOM_BANDS]
 
         # 1. Ensure Oumé department boundary exists (fallback)
         self._ensure_department_boundary()
 
-        # 2. Pre-build forest boundaries
-        self._build_forets()
-
-        # 3. Pre-build admin zones
-        self._build_zones()
-
-        # 4. Pre-build occupation data per year (and per year+forest)
+        # 2. List the files to build, heaviest first (better packing with --jobs)
         years = [target_year] if target_year else [1986, 2003, 2023]
         foret_codes = list(ForetClassee.objects.values_list('code', flat=True))
+        data_fp = self._data_fingerprints()
+        planned = []  # (filename, fingerprint, task, variants needed)
+
+        def plan(method, stem, data, tolerance, band=None, extra=(), ext='json', needs=()):
+            filename = geocache.cache_filename(stem, band, ext)
+            fingerprint = _fingerprint(data, tolerance, band)
+            planned.append((
+                filename, fingerprint, (method, (*extra, tolerance, band)), set(needs),
+            ))
+
+        # 2a. Occupation data per year (full year first, then per forest)
+        occ_bands = [(occ_tolerance, None)] + [
+            (band_tolerance('occupation', band), band) for band in bands
+        ]
+        # (+ compact variant: its dictionaries cover every forest and source)
+        def plan_occupation(annee, code, tolerance, band):
+            stem = f'occupations_{annee}' + (f'_{code}' if code else '')
+            data = data_fp.get(('occupation', annee, code), data_fp['empty'])
+            banded = ('bands',) if band else ()
+            plan('_build_occupation', stem, data, tolerance, band, extra=(annee, code),
+                 needs=banded)
+            plan('_build_occupation_compact', f'{stem}.compact',
+                 [data, data_fp['forets'], data_fp['sources']],
+                 tolerance, band, extra=(annee, code), needs=('compact', *banded))
+            plan('_build_occupation_topology', f'{stem}.topo', data,
+                 tolerance, band, extra=(annee, code), needs=('topojson', *banded))
 
         for annee in years:
-            # Full year (no forest filter)
-            self._build_occupation(annee, None, occ_tolerance)
-            # Per forest
+            for tolerance, band in occ_bands:
+                plan_occupation(annee, None, tolerance, band)
+        for annee in years:
             for code in foret_codes:
-                self._build_occupation(annee, code, occ_tolerance)
+                for tolerance, band in occ_bands:
+                    plan_occupation(annee, code, tolerance, band)
+
+        # 2a'. Attribute sidecars (no polygon): one per year / year+forest
+        for annee in years:
+            for code in [None] + foret_codes:
+                stem = f'occupations_{annee}' + (f'_{code}' if code else '')
+                plan('_build_occupation_attrs', stem,
+                     data_fp.get(('occupation', annee, code), data_fp['empty']),
+                     None, 'attrs', extra=(annee, code), needs=('attrs',))
+
+        # 2a''. FlatGeobuf (spatial index: clients read their viewport only)
+        for annee in years:
+            for code in [None] + foret_codes:
+                stem = f'occupations_{annee}' + (f'_{code}' if code else '')
+                plan('_build_occupation_fgb', stem,
+                     data_fp.get(('occupation', annee, code), data_fp['empty']),
+                     occ_tolerance, extra=(annee, code), ext='fgb', needs=('fgb',))
+
+        # 2a'''. Hexagon grids: every year (changes between years), department bounds
+        grid_data = [
+            data_fp.get(('occupation', annee, None), data_fp['empty'])
+            for annee in ANNEES_VALIDES
+        ] + [data_fp['zones'], data_fp['references']]
+        for size in hexagons.HEX_SIZES:
+            plan('_build_hexagons', hexagons.cache_stem(size), grid_data, None,
+                 extra=(size,), needs=('hexagons',))
+
+        # 2b. Forest boundaries and admin zones (base + one file per zoom band)
+        for layer in ('forets', 'zones'):
+            for suffix, stem, needs in [('', layer, ()),
+                                        ('_topology', f'{layer}.topo', ('topojson',))]:
+                plan(f'_build_{layer}{suffix}', stem, data_fp[layer], TOLERANCES[layer],
+                     needs=needs)
+                for band in bands:
+                    plan(f'_build_{layer}{suffix}', stem, data_fp[layer],
+                         band_tolerance(layer, band), band, needs=('bands', *needs))
+
+        # 2c. Skip the files whose data and parameters did not change; drop the
+        # stale files of the variants not requested
+        manifest = geocache.read_manifest(live_dir)
+        tasks, fingerprints, dropped = [], {}, set()
+        requested = 0
+        for filename, fingerprint, task, needs in planned:
+            entry = manifest.get(filename)
+            current = (
+                entry and entry.get('fingerprint') == fingerprint
+                and os.path.exists(os.path.join(live_dir, filename))
+            )
+            if not needs <= variants:
+                if not current:
+                    dropped.add(filename)
+                continue
+            requested += 1
+            if current and not options['force'] and not options['clear']:
+                continue
+            tasks.append(task)
+            fingerprints[filename] = fingerprint
+        self.stdout.write(
+            f'  {requested - len(tasks)}/{requested} files up to date, '
+            f'{len(tasks)} to build'
+        )
+        stale = dropped & set(os.listdir(live_dir))
+        if stale:
+            self.stdout.write(f'  {len(stale)} stale variant files not requested (--with): dropped')
+        if not tasks and not stale:
+            self.stdout.write(self.style.SUCCESS('\nOK GeoCache up to date, nothing to build'))
+            return
+
+        # 3. New generation: carry over every live file that is not rebuilt
+        # (--clear: only the files of other commands, e.g. stock_carbone)
+        gen_dir = geocache.new_generation()
+        keep = [
+            f for f in os.listdir(live_dir)
+            if f.endswith(geocache.CACHE_EXTENSIONS) and f != geocache.MANIFEST_NAME
+            and f not in fingerprints and f not in dropped
+            and (not options['clear'] or f.startswith(PRESERVE_PREFIXES))
+        ]
+        carried = geocache.carry_forward(live_dir, gen_dir, keep)
+        geocache.update_manifest(
+            {f: manifest[f] for f in carried if f in manifest}, cache_dir=gen_dir,
+        )
+        for f in carried:
+            if f not in manifest and f.endswith('.json'):
+                # Legacy file without manifest entry: describe it now
+                with open(os.path.join(gen_dir, f), 'rb') as fh:
+                    features = len(json.loads(fh.read()).get('features', []))
+                geocache.update_manifest(
+                    {f: geocache.finalize(os.path.join(gen_dir, f), features)},
+                    cache_dir=gen_dir,
+                )
+        self.stdout.write(
+            f'  Generation {os.path.basename(gen_dir)}: {len(carried)} files carried over'
+        )
+
+        # 4. Build
+        built, failed, busy = self._run_tasks(
+            tasks, max(1, options['jobs']), fingerprints, gen_dir,
+        )
 
         elapsed = round(time.time() - t0, 1)
-        total_files = len([f for f in os.listdir(CACHE_DIR) if f.endswith('.json')])
-        total_size = sum(
-            os.path.getsize(os.path.join(CACHE_DIR, f))
-            for f in os.listdir(CACHE_DIR) if f.endswith('.json')
+        self.stdout.write(
+            f'\nBuilt {built}/{len(tasks)} files, '
+            f'{round(busy, 1)}s of build work in {elapsed}s wall-clock'
         )
-        total_mb = round(total_size / (1024 * 1024), 2)
+        if failed:
+            # Never publish an incomplete generation: the live one stays served
+            for task, error in failed:
+                self.stderr.write(self.style.ERROR(f'  FAILED {task[0]}{task[1]}: {error}'))
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            self.stderr.write(self.style.ERROR(
+                f'\nPre-build FAILED: {len(failed)} files, live generation unchanged'
+            ))
+            return
 
+        # 5. Switch atomically, then drop old generations
+        geocache.publish(gen_dir)
+        removed = geocache.collect_garbage(keep=options['keep'])
+        if removed:
+            self.stdout.write(f'  Removed old generations: {", ".join(removed)}')
+
+        cache_files = [
+            f for f in os.listdir(gen_dir)
+            if f.endswith(geocache.CACHE_EXTENSIONS) and f != geocache.MANIFEST_NAME
+        ]
+        total_files = len(cache_files)
+        total_size = sum(os.path.getsize(os.path.join(gen_dir, f)) for f in cache_files)
+        total_mb = round(total_size / (1024 * 1024), 2)
         self.stdout.write(self.style.SUCCESS(
-            f'\nOK Pre-build complete: {total_files} files, {total_mb} MB, {elapsed}s'
+            f'\nOK Pre-build complete: {os.path.basename(gen_dir)} live, '
+            f'{total_files} files, {total_mb} MB, {elapsed}s'
         ))
 
-    def _save(self, filename, data):
-        """Save GeoJSON dict to cache file."""
-        path = os.path.join(CACHE_DIR, filename)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    def _run_tasks(self, tasks, jobs, fingerprints, cache_dir):
+        """
+        Run the build tasks into `cache_dir`, sequentially or on a process pool
+        of `jobs` workers. The manifest is only ever written by this (parent) process.
+        Returns (built count, [(task, error)], summed task seconds).
+        """
+        built, failed, busy = 0, [], 0.0
+        if not tasks:
+            return built, failed, busy
+
+        def collect(task, get_result):
+            nonlocal built, busy
+            try:
+                filename, entry, log, seconds = get_result()
+            except Exception as e:
+                failed.append((task, e))
+                return
+            entry['fingerprint'] = fingerprints[filename]
+            geocache.update_manifest({filename: entry}, cache_dir=cache_dir)
+            self.stdout.write(log.rstrip('\n'))
+            built += 1
+            busy += seconds
+
+        if jobs > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            self.stdout.write(self.style.WARNING(
+                '  --jobs needs the fork start method (Linux/macOS): building sequentially'
+            ))
+            jobs = 1
+
+        if jobs == 1:
+            for task in tasks:
+                collect(task, lambda: _run_task(task, cache_dir))
+            return built, failed, busy
+
+        # Never share a connection with the children: they reconnect lazily
+        db.connections.close_all()
+        self.stdout.write(f'  Building {len(tasks)} files on {jobs} workers...')
+        with ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context('fork'),
+        ) as pool:
+            futures = {pool.submit(_run_task, task, cache_dir): task for task in tasks}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+        return built, failed, busy
+
+    def _data_fingerprints(self):
+        """
+        Fingerprint of the rows behind every cache file, in 6 queries:
+            ('occupation', annee, foret_code | None), 'forets', 'zones'
+            'sources' → distinct source_donnee (compact dictionaries)
+            'references' → carbon reference stocks (hexagon grids)
+            'empty' → occupation partition without any row
+        Each is (row count, max updated_at, md5 of the ids): an edit bumps
+        updated_at, an insert/delete changes the count and the id checksum.
+        Occupation files also embed forest names and the nomenclature
+        (labels, colours, order), so these are part of their fingerprint.
+        """
+        fingerprints = {}
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT md5(COALESCE(string_agg(
+                    concat_ws('|', id, code, libelle_fr, couleur_hex, ordre_affichage),
+                    ',' ORDER BY id
+                ), ''))
+                FROM carbone_nomenclaturecouvert;
+            """)
+            nomenclature = cursor.fetchone()[0]
+
+            cursor.execute("""
+                SELECT o.annee, f.code, COUNT(*),
+                       MAX(GREATEST(o.updated_at, f.updated_at))::text,
+                       md5(string_agg(o.id::text, ',' ORDER BY o.id))
+                FROM carbone_occupationsol o
+                JOIN carbone_foretclassee f ON o.foret_id = f.id
+                GROUP BY o.annee, f.code
+                ORDER BY o.annee, f.code;
+            """)
+            by_year = {}
+            for annee, code, count, updated, ids in cursor.fetchall():
+                partition = [count, updated, ids, nomenclature]
+                fingerprints['occupation', annee, code] = partition
+                by_year.setdefault(annee, []).append([code] + partition)
+            for annee, partitions in by_year.items():
+                fingerprints['occupation', annee, None] = partitions
+
+            for layer, table in (('forets', 'carbone_foretclassee'), ('zones', 'carbone_zoneetude')):
+                cursor.execute(f"""
+                    SELECT COUNT(*), MAX(updated_at)::text,
+                           md5(COALESCE(string_agg(id::text, ',' ORDER BY id), ''))
+                    FROM {table};
+                """)
+                fingerprints[layer] = list(cursor.fetchone())
+
+            cursor.execute("""
+                SELECT md5(COALESCE(string_agg(source_donnee, ',' ORDER BY source_donnee), ''))
+                FROM (SELECT DISTINCT source_donnee FROM carbone_occupationsol) s;
+            """)
+            fingerprints['sources'] = cursor.fetchone()[0]
+
+            # Carbon references (hexagon grids: carbon = area x reference)
+            cursor.execute("""
+                SELECT md5(COALESCE(string_agg(
+                    concat_ws('|', id, stock_carbone_reference), ',' ORDER BY id
+                ), ''))
+                FROM carbone_nomenclaturecouvert;
+            """)
+            fingerprints['references'] = cursor.fetchone()[0]
+
+        # Partition without any row (empty file): still depends on the nomenclature
+        fingerprints['empty'] = [0, None, None, nomenclature]
+        return fingerprints
+
+    def _save(self, filename, sql, params=None, members=None):
+        """
+        Stream a one-feature-per-row query into a cache file (+ siblings).
+        `members`: extra top-level members (compact dictionaries).
+        Returns (filename, manifest entry) for the caller to record.
+        """
+        path = os.path.join(self.cache_dir, filename)
+        features = write_feature_collection(path, sql, params, members)
+        entry = geocache.finalize(path, features)
         size_kb = round(os.path.getsize(path) / 1024, 1)
-        features = len(data.get('features', []))
-        self.stdout.write(f'  OK {filename}: {features} features, {size_kb} KB')
+        gz_kb = round(os.path.getsize(path + '.gz') / 1024, 1)
+        self.stdout.write(f'  OK {filename}: {features} features, {size_kb} KB (gzip {gz_kb} KB)')
+        return filename, entry
 
-    def _query_geojson(self, sql, params=None):
-        """Execute SQL and return GeoJSON dict."""
-        with connection.cursor() as cursor:
-            cursor.execute(sql, params or [])
-            row = cursor.fetchone()
-            if row and row[0]:
-                return row[0] if isinstance(row[0], dict) else json.loads(row[0])
-        return {'type': 'FeatureCollection', 'features': []}
-
-    def _build_occupation(self, annee, foret_code, tolerance):
-        """Build occupation GeoJSON for a specific year and optional forest."""
+    def _save_topology(self, filename, sql, params=None, tolerance=0, name='features'):
+        """
+        Encode a one-feature-per-row query (geometries from
+        topojson.geometry_sql) as a TopoJSON cache file (+ siblings).
+        Returns (filename, manifest entry) for the caller to record.
+        """
+        path = os.path.join(self.cache_dir, filename)
+        features = [json.loads(feature) for feature in iter_features(sql, params)]
+        topology = topojson.encode(features, tolerance, name)
+        geocache.write_bytes(path, topojson.dumps(topology))
+        entry = geocache.finalize(path, len(features))
+        size_kb = round(os.path.getsize(path) / 1024, 1)
+        gz_kb = round(os.path.getsize(path + '.gz') / 1024, 1)
+        self.stdout.write(
+            f'  OK {filename}: {len(features)} features, '
+            f'{len(topology["arcs"])} arcs, {size_kb} KB (gzip {gz_kb} KB)'
+        )
+        return filename, entry
+
+    def _build_occupation(self, annee, foret_code, tolerance, band=None, compact=False,
+                          topology=False):
+        """
+        Build occupation GeoJSON for a specific year, optional forest and zoom
+        band. With `compact`, properties are dictionary-encoded (compact.py);
+        with `topology`, the file is TopoJSON (topojson.py).
+        """
+        filename, sql, params, members = self._occupation_sql(
+            annee, foret_code, tolerance, band, compact=compact, topology=topology,
+        )
+        if topology:
+            return self._save_topology(filename, sql, params, tolerance, 'occupations')
+        return self._save(filename, sql, params, members)
+
+    def _occupation_sql(self, annee, foret_code, tolerance, band=None, compact=False,
+                        topology=False, ext='json'):
+        """(filename, sql, params, members) of an occupation cache file."""
         conditions = ["o.annee = %s"]
         params = [annee]
 
@@ -135,110 +532,204 @@ class Command(BaseCommand):
             params.append(foret_code)
 
         where = "WHERE " + " AND ".join(conditions)
-        filename = f'occupations_{annee}' + (f'_{foret_code}' if foret_code else '') + '.json'
+        stem = f'occupations_{annee}' + (f'_{foret_code}' if foret_code else '')
+        members = None
+        properties = """
+                'id', o.id,
+                'foret_code', f.code,
+                'foret_nom', f.nom,
+                'type_couvert', n.code,
+                'libelle', n.libelle_fr,
+                'couleur', n.couleur_hex,
+                'annee', o.annee,
+                'superficie_ha', ROUND(o.superficie_ha::numeric, 2),
+                'stock_carbone_calcule', ROUND(o.stock_carbone_calcule::numeric, 2),
+                'source_donnee', o.source_donnee"""
+        if compact:
+            stem += '.compact'
+            tables = compact_encoding.dictionaries()
+            members = compact_encoding.members(tables)
+            properties, property_params = compact_encoding.properties_sql(tables)
+            params = property_params + params
+        # Topology: raw geometry on the grid, simplified per shared arc
+        geometry = f"""ST_AsGeoJSON(
+                ST_ChaikinSmoothing(
+                    ST_CollectionExtract(
+                        ST_MakeValid(ST_Simplify(o.geom, {tolerance})), 3
+                    ), 2, true
+                ), {GEOJSON_PRECISION}
+            )::json"""
+        if topology:
+            stem += '.topo'
+            geometry = topojson.geometry_sql('o.geom', topojson.quantum_for(tolerance))
+        filename = geocache.cache_filename(stem, band, ext)
 
         sql = f"""
         SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
-            SELECT json_build_object(
-                'type', 'Feature',
-                'id', o.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_ChaikinSmoothing(
-                        ST_CollectionExtract(
-                            ST_MakeValid(ST_Simplify(o.geom, {tolerance})), 3
-                        ), 2, true
-                    ), {GEOJSON_PRECISION}
-                )::json,
-                'properties', json_build_object(
-                    'id', o.id,
-                    'foret_code', f.code,
-                    'foret_nom', f.nom,
-                    'type_couvert', n.code,
-                    'libelle', n.libelle_fr,
-                    'couleur', n.couleur_hex,
-                    'annee', o.annee,
-                    'superficie_ha', ROUND(o.superficie_ha::numeric, 2),
-                    'stock_carbone_calcule', ROUND(o.stock_carbone_calcule::numeric, 2),
-                    'source_donnee', o.source_donnee
-                )
-            ) AS feat
-            FROM carbone_occupationsol o
-            JOIN carbone_foretclassee f ON o.foret_id = f.id
-            JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
-            {where}
-            ORDER BY n.ordre_affichage, o.id
-        ) sub;
+            'type', 'Feature',
+            'id', o.id,
+            'geometry', {geometry},
+            'properties', json_build_object({properties}
+            )
+        )::text AS feat
+        FROM carbone_occupationsol o
+        JOIN carbone_foretclassee f ON o.foret_id = f.id
+        JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
+        {where}
+        ORDER BY n.ordre_affichage, o.id;
+        """
+        return filename, sql, params, members
+
+    def _build_occupation_compact(self, annee, foret_code, tolerance, band=None):
+        """Dictionary-encoded variant of _build_occupation (compact=1)."""
+        return self._build_occupation(annee, foret_code, tolerance, band, compact=True)
+
+    def _build_occupation_topology(self, annee, foret_code, tolerance, band=None):
+        """TopoJSON variant of _build_occupation (format=topojson)."""
+        return self._build_occupation(annee, foret_code, tolerance, band, topology=True)
+
+    def _build_occupation_fgb(self, annee, foret_code, tolerance, band=None):
         """
-        data = self._query_geojson(sql, params)
-        self._save(filename, data)
+        Build the FlatGeobuf file of a year / year+forest: same features as
+        the base GeoJSON, written by GDAL with its packed Hilbert R-tree
+        (SPATIAL_INDEX). No compressed siblings: served by byte ranges.
+        """
+        filename, sql, params, _ = self._occupation_sql(annee, foret_code, tolerance, ext='fgb')
+        features = [json.loads(feature) for feature in iter_features(sql, params)]
+        if features:
+            frame = gpd.GeoDataFrame.from_features(features, crs='EPSG:4326')
+        else:
+            frame = gpd.GeoDataFrame({'id': []}, geometry=[], crs='EPSG:4326')
+
+        path = os.path.join(self.cache_dir, filename)
+        tmp_path = os.path.join(self.cache_dir, f'.tmp-{filename}')
+        frame.to_file(tmp_path, driver='FlatGeobuf', SPATIAL_INDEX='YES')
+        os.replace(tmp_path, path)
+        entry = geocache.finalize(path, len(features), compress=False)
+        size_kb = round(os.path.getsize(path) / 1024, 1)
+        self.stdout.write(f'  OK {filename}: {len(features)} features, {size_kb} KB (indexed)')
+        return filename, entry
+
+    def _build_occupation_attrs(self, annee, foret_code, tolerance=None, band='attrs'):
+        """
+        Build the attribute sidecar of an occupation file: same features and
+        properties, centroid as geometry and a GeoJSON `bbox` member instead
+        of the polygon. Served for fields= / geometry= requests.
+        """
+        conditions = ["o.annee = %s"]
+        params = [annee]
+
+        if foret_code:
+            conditions.append("UPPER(f.code) = UPPER(%s)")
+            params.append(foret_code)
+
+        where = "WHERE " + " AND ".join(conditions)
+        stem = f'occupations_{annee}' + (f'_{foret_code}' if foret_code else '')
 
-    def _build_forets(self):
-        """Build forest boundaries GeoJSON."""
-        tolerance = TOLERANCES['forets']
         sql = f"""
         SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
-            SELECT json_build_object(
-                'type', 'Feature',
+            'type', 'Feature',
+            'id', o.id,
+            'bbox', json_build_array(
+                ROUND(ST_XMin(o.geom)::numeric, 6), ROUND(ST_YMin(o.geom)::numeric, 6),
+                ROUND(ST_XMax(o.geom)::numeric, 6), ROUND(ST_YMax(o.geom)::numeric, 6)
+            ),
+            'geometry', ST_AsGeoJSON(ST_Centroid(o.geom), 6)::json,
+            'properties', json_build_object(
+                'id', o.id,
+                'foret_code', f.code,
+                'foret_nom', f.nom,
+                'type_couvert', n.code,
+                'libelle', n.libelle_fr,
+                'couleur', n.couleur_hex,
+                'annee', o.annee,
+                'superficie_ha', ROUND(o.superficie_ha::numeric, 2),
+                'stock_carbone_calcule', ROUND(o.stock_carbone_calcule::numeric, 2),
+                'source_donnee', o.source_donnee
+            )
+        )::text AS feat
+        FROM carbone_occupationsol o
+        JOIN carbone_foretclassee f ON o.foret_id = f.id
+        JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
+        {where}
+        ORDER BY n.ordre_affichage, o.id;
+        """
+        return self._save(geocache.cache_filename(stem, band), sql, params)
+
+    def _build_hexagons(self, size, tolerance=None, band=None):
+        """Hexagon grid of one cell size (hexagons.py)."""
+        sql, params = hexagons.features_sql(size)
+        return self._save(geocache.cache_filename(hexagons.cache_stem(size)), sql, params)
+
+    def _build_forets(self, tolerance, band=None, topology=False):
+        """Build forest boundaries GeoJSON (TopoJSON with `topology`)."""
+        geometry = f"""ST_AsGeoJSON(
+                ST_SimplifyPreserveTopology(
+                    ST_MakeValid(f.geom), {tolerance}
+                ), {GEOJSON_PRECISION}
+            )::json"""
+        if topology:
+            geometry = topojson.geometry_sql('f.geom', topojson.quantum_for(tolerance))
+        sql = f"""
+        SELECT json_build_object(
+            'type', 'Feature',
+            'id', f.id,
+            'geometry', {geometry},
+            'properties', json_build_object(
                 'id', f.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_SimplifyPreserveTopology(
-                        ST_MakeValid(f.geom), {tolerance}
-                    ), {GEOJSON_PRECISION}
-                )::json,
-                'properties', json_build_object(
-                    'id', f.id,
-                    'code', f.code,
-                    'nom', f.nom,
-                    'superficie_legale_ha', f.superficie_legale_ha,
-                    'statut_juridique', f.statut_juridique,
-                    'autorite_gestion', f.autorite_gestion
-                )
-            ) AS feat
-            FROM carbone_foretclassee f
-            ORDER BY f.code
-        ) sub;
+                'code', f.code,
+                'nom', f.nom,
+                'superficie_legale_ha', f.superficie_legale_ha,
+                'statut_juridique', f.statut_juridique,
+                'autorite_gestion', f.autorite_gestion
+            )
+        )::text AS feat
+        FROM carbone_foretclassee f
+        ORDER BY f.code;
         """
-        data = self._query_geojson(sql)
-        self._save('forets.json', data)
-
-    def _build_zones(self):
-        """Build admin zones GeoJSON."""
-        tolerance = TOLERANCES['zones']
+        if topology:
+            return self._save_topology(
+                geocache.cache_filename('forets.topo', band), sql, tolerance=tolerance, name='forets',
+            )
+        return self._save(geocache.cache_filename('forets', band), sql)
+
+    def _build_forets_topology(self, tolerance, band=None):
+        """TopoJSON variant of _build_forets (format=topojson)."""
+        return self._build_forets(tolerance, band, topology=True)
+
+    def _build_zones(self, tolerance, band=None, topology=False):
+        """Build admin zones GeoJSON (TopoJSON with `topology`)."""
+        geometry = f"""ST_AsGeoJSON(
+                ST_SimplifyPreserveTopology(
+                    ST_MakeValid(z.geom), {tolerance}
+                ), {GEOJSON_PRECISION}
+            )::json"""
+        if topology:
+            geometry = topojson.geometry_sql('z.geom', topojson.quantum_for(tolerance))
         sql = f"""
         SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
-            SELECT json_build_object(
-                'type', 'Feature',
+            'type', 'Feature',
+            'id', z.id,
+            'geometry', {geometry},
+            'properties', json_build_object(
                 'id', z.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_SimplifyPreserveTopology(
-                        ST_MakeValid(z.geom), {tolerance}
-                    ), {GEOJSON_PRECISION}
-                )::json,
-                'properties', json_build_object(
-                    'id', z.id,
-                    'nom', z.nom,
-                    'type_zone', z.type_zone,
-                    'niveau', z.niveau
-                )
-            ) AS feat
-            FROM carbone_zoneetude z
-            ORDER BY z.niveau, z.nom
-        ) sub;
+                'nom', z.nom,
+                'type_zone', z.type_zone,
+                'niveau', z.niveau
+            )
+        )::text AS feat
+        FROM carbone_zoneetude z
+        ORDER BY z.niveau, z.nom;
         """
-        data = self._query_geojson(sql)
-        self._save('zones.json', data)
+        if topology:
+            return self._save_topology(
+                geocache.cache_filename('zones.topo', band), sql, tolerance=tolerance, name='zones',
+            )
+        return self._save(geocache.cache_filename('zones', band), sql)
+
+    def _build_zones_topology(self, tolerance, band=None):
+        """TopoJSON variant of _build_zones (format=topojson)."""
+        return self._build_zones(tolerance, band, topology=True)
 
     def _ensure_department_boundary(self):
         """Auto-generate Oumé department boundary if missing."""
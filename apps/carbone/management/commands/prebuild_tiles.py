@@ -0,0 +1,135 @@
+"""
+Pre-build vector-tile pyramids (MBTiles) for ultra-fast map loading.
+
+Companion of prebuild_geojson: the static GeoJSON cache only covers a few
+year/forest combinations, whereas a tile pyramid gives cache-tier latency
+at EVERY zoom level and viewport. Each tile is rendered ONCE by PostGIS
+(ST_AsMVT, see apps/carbone/tiles.py) and stored gzipped in one archive
+per year; the API then reads tiles straight from SQLite.
+
+Archive structure:
+  media/geocache/tiles/
+    carte_1986.mbtiles   → layers zones + forets + occupation 1986, z7-16
+    carte_2003.mbtiles
+    carte_2023.mbtiles
+
+Served by: /api/v1/tiles/{annee}/{z}/{x}/{y}.pbf
+
+Usage:
+    python manage.py prebuild_tiles                      # All years, z7-16
+    python manage.py prebuild_tiles --year 2023          # One year only
+    python manage.py prebuild_tiles --minzoom 7 --maxzoom 14
+"""
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.carbone import tiles
+from apps.carbone.constants import ANNEES_VALIDES
+
+
+class Command(BaseCommand):
+    help = 'Pre-build MBTiles vector-tile pyramids (one archive per year)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+        parser.add_argument('--minzoom', type=int, default=7)
+        parser.add_argument('--maxzoom', type=int, default=16)
+
+    def handle(self, *args, **options):
+        t0 = time.time()
+        os.makedirs(tiles.TILES_DIR, exist_ok=True)
+
+        minzoom, maxzoom = options['minzoom'], options['maxzoom']
+        if not tiles.MIN_ZOOM <= minzoom <= maxzoom <= tiles.MAX_ZOOM:
+            self.stderr.write(self.style.ERROR(
+                f'Invalid zoom range: {minzoom}-{maxzoom}'
+            ))
+            return
+
+        years = [options['year']] if options.get('year') else ANNEES_VALIDES
+        for annee in years:
+            self._build_year(annee, minzoom, maxzoom)
+
+        elapsed = round(time.time() - t0, 1)
+        self.stdout.write(self.style.SUCCESS(f'\nOK Tile pre-build complete: {elapsed}s'))
+
+    def _extent(self, annee):
+        """Bounding box (west, south, east, north) of everything drawn for a year."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+                FROM (
+                    SELECT ST_Extent(geom) AS e FROM (
+                        SELECT geom FROM carbone_occupationsol WHERE annee = %s
+                        UNION ALL SELECT geom FROM carbone_foretclassee
+                        UNION ALL SELECT geom FROM carbone_zoneetude
+                    ) g
+                ) ext;
+            """, [annee])
+            row = cursor.fetchone()
+        if not row or row[0] is None:
+            return None
+        return tuple(float(v) for v in row)
+
+    def _build_year(self, annee, minzoom, maxzoom):
+        bounds = self._extent(annee)
+        if bounds is None:
+            self.stdout.write(self.style.WARNING(f'  SKIP {annee}: no data'))
+            return
+
+        path = tiles.archive_path(annee)
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        west, south, east, north = bounds
+        metadata = {
+            'name': f'API.GEO.Carbone {annee}',
+            'format': 'pbf',
+            'type': 'overlay',
+            'minzoom': minzoom,
+            'maxzoom': maxzoom,
+            'bounds': f'{west},{south},{east},{north}',
+            'center': f'{(west + east) / 2},{(south + north) / 2},{minzoom + 3}',
+            'json': json.dumps({'vector_layers': [
+                {'id': name, 'minzoom': minzoom, 'maxzoom': maxzoom, 'fields': {}}
+                for name in tiles.ARCHIVE_LAYERS
+            ]}),
+        }
+
+        sql, params = tiles.archive_tile_sql(annee)
+        self.stdout.write(f'  {annee}: z{minzoom}-{maxzoom}, bounds={bounds}')
+
+        db = tiles.create_archive(tmp_path, metadata)
+        written = 0
+        completed = False
+        try:
+            for z in range(minzoom, maxzoom + 1):
+                xmin, ymin, xmax, ymax = tiles.tile_range(bounds, z)
+                count = 0
+                for x in range(xmin, xmax + 1):
+                    for y in range(ymin, ymax + 1):
+                        data = tiles.render_tile(sql, params, z, x, y)
+                        if data:
+                            tiles.write_tile(db, z, x, y, data)
+                            count += 1
+                db.commit()
+                written += count
+                self.stdout.write(f'    z{z}: {count} tiles')
+            completed = True
+        finally:
+            db.close()
+            if not completed:
+                # A render failed: no half-written archive left on disk
+                os.remove(tmp_path)
+
+        # Atomic swap: the API never sees a half-written archive
+        os.replace(tmp_path, path)
+        size_mb = round(os.path.getsize(path) / (1024 * 1024), 2)
+        self.stdout.write(self.style.SUCCESS(
+            f'  OK {os.path.basename(path)}: {written} tiles, {size_mb} MB'
+        ))
@@ -0,0 +1,42 @@
+"""
+Rebuild the land-cover statistics summary (carbone_statistiqueoccupation,
+apps/carbone/statistics.py) from carbone_occupationsol, then the NumPy
+statistics cube file (apps/carbone/cube.py) read by the workers.
+
+ORM writes and the import commands keep it up to date; this command covers
+raw SQL writes and repairs.
+
+Usage:
+    python manage.py refresh_statistics               # Every partition
+    python manage.py refresh_statistics --year 2023   # One year only
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.carbone import cube, statistics
+from apps.carbone.models import OccupationSol
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the land-cover statistics summary table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only this year')
+
+    def handle(self, *args, **options):
+        t0 = time.time()
+        partitions = None
+        if options['year']:
+            partitions = OccupationSol.objects.filter(annee=options['year']).values_list(
+                'annee', 'foret_id',
+            ).distinct()
+            # Also empties the summary of forests without rows left
+            partitions = set(partitions) | {
+                (options['year'], foret_id) for foret_id in
+                statistics.summary_forets(options['year'])
+            }
+        rows = statistics.refresh(partitions)
+        cube.build()
+        elapsed = round(time.time() - t0, 1)
+        self.stdout.write(self.style.SUCCESS(f'OK Statistics: {rows} summary rows in {elapsed}s'))
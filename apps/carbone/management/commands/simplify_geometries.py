@@ -20,6 +20,8 @@ Usage:
 from django.core.management.base import BaseCommand
 from django.db import connection
 
+from apps.carbone import cache, generalisation, subdivision
+
 
 class Command(BaseCommand):
     help = 'Permanently simplify heavy geometries in the database'
@@ -97,7 +99,8 @@ class Command(BaseCommand):
         with connection.cursor() as c:
             c.execute("""
                 UPDATE carbone_occupationsol
-                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3))
+                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3)),
+                    updated_at = NOW()
                 WHERE ST_NPoints(geom) > %s
             """, [tolerance, threshold])
             updated = c.rowcount
@@ -106,7 +109,8 @@ class Command(BaseCommand):
         with connection.cursor() as c:
             c.execute("""
                 UPDATE carbone_foretclassee
-                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3))
+                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3)),
+                    updated_at = NOW()
                 WHERE ST_NPoints(geom) > %s
             """, [tolerance * 0.8, threshold])
             updated_forets = c.rowcount
@@ -115,11 +119,19 @@ class Command(BaseCommand):
         with connection.cursor() as c:
             c.execute("""
                 UPDATE carbone_zoneetude
-                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3))
+                SET geom = ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_Simplify(geom, %s)), 3)),
+                    updated_at = NOW()
                 WHERE ST_NPoints(geom) > %s
             """, [tolerance, threshold])
             updated_zones = c.rowcount
 
+        # 5b. Generalised geometries and cached responses follow the (raw SQL) updates
+        for layer in ('occupation', 'forets', 'zones'):
+            generalisation.refresh(layer, stale_only=True)
+        for layer in ('occupation', 'forets'):
+            subdivision.refresh(layer, stale_only=True)
+        cache.bump_data_version()
+
         # 6. VACUUM ANALYZE to reclaim space
         self.stdout.write('Running VACUUM ANALYZE...')
         old_isolation = connection.isolation_level
@@ -0,0 +1,18 @@
+"""
+HTTP middleware of the carbone app.
+"""
+from django.middleware.gzip import GZipMiddleware
+
+
+class RangeAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware, except for resources served by byte ranges
+    (`Accept-Ranges: bytes`, e.g. the FlatGeobuf files): a 206 body must be
+    the exact bytes of the requested range, and Content-Range offsets refer
+    to the identity encoding.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Accept-Ranges') == 'bytes':
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,63 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0002_spatial_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeometrieGeneralisee",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "couche",
+                    models.CharField(
+                        choices=[
+                            ("occupation", "Occupation du sol"),
+                            ("forets", "Foret classee"),
+                            ("zones", "Zone d'etude"),
+                        ],
+                        max_length=20,
+                        verbose_name="Couche",
+                    ),
+                ),
+                (
+                    "objet_id",
+                    models.BigIntegerField(verbose_name="Identifiant de l'objet"),
+                ),
+                (
+                    "bande",
+                    models.CharField(max_length=10, verbose_name="Bande de zoom"),
+                ),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(
+                        srid=4326, verbose_name="Geometrie generalisee"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Geometrie generalisee",
+                "verbose_name_plural": "Geometries generalisees",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("couche", "objet_id", "bande"),
+                        name="uniq_geometrie_generalisee",
+                    )
+                ],
+            },
+        ),
+    ]
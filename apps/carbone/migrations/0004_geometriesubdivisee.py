@@ -0,0 +1,58 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0003_geometriegeneralisee"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeometrieSubdivisee",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "couche",
+                    models.CharField(
+                        choices=[
+                            ("occupation", "Occupation du sol"),
+                            ("forets", "Foret classee"),
+                        ],
+                        max_length=20,
+                        verbose_name="Couche",
+                    ),
+                ),
+                (
+                    "objet_id",
+                    models.BigIntegerField(verbose_name="Identifiant de l'objet"),
+                ),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.GeometryField(
+                        srid=4326, verbose_name="Morceau"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Geometrie subdivisee",
+                "verbose_name_plural": "Geometries subdivisees",
+                "indexes": [
+                    models.Index(
+                        fields=["couche", "objet_id"],
+                        name="carbone_geo_couche_fe5937_idx",
+                    )
+                ],
+            },
+        ),
+    ]
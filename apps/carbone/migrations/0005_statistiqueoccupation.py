@@ -0,0 +1,93 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0004_geometriesubdivisee"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatistiqueOccupation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "annee",
+                    models.SmallIntegerField(
+                        choices=[(1986, "1986"), (2003, "2003"), (2023, "2023")],
+                        verbose_name="Annee",
+                    ),
+                ),
+                (
+                    "superficie_ha",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="Superficie (ha)"
+                    ),
+                ),
+                (
+                    "stock_carbone",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="Stock carbone (tCO2)"
+                    ),
+                ),
+                (
+                    "nombre_polygones",
+                    models.IntegerField(
+                        default=0, verbose_name="Nombre de polygones"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "foret",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistiques",
+                        to="carbone.foretclassee",
+                        verbose_name="Foret classee",
+                    ),
+                ),
+                (
+                    "nomenclature",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statistiques",
+                        to="carbone.nomenclaturecouvert",
+                        verbose_name="Type de couvert",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistique d'occupation",
+                "verbose_name_plural": "Statistiques d'occupation",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("annee", "foret", "nomenclature"),
+                        name="uniq_statistique_occupation",
+                    )
+                ],
+            },
+        ),
+        # Initial fill (afterwards: apps/carbone/statistics.py)
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO carbone_statistiqueoccupation
+                    (annee, foret_id, nomenclature_id, superficie_ha,
+                     stock_carbone, nombre_polygones, updated_at)
+                SELECT annee, foret_id, nomenclature_id, SUM(superficie_ha),
+                       SUM(stock_carbone_calcule), COUNT(*), NOW()
+                FROM carbone_occupationsol
+                GROUP BY annee, foret_id, nomenclature_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,100 @@
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0005_statistiqueoccupation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransitionOccupation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "annee_debut",
+                    models.SmallIntegerField(
+                        choices=[(1986, "1986"), (2003, "2003"), (2023, "2023")],
+                        verbose_name="Annee de depart",
+                    ),
+                ),
+                (
+                    "annee_fin",
+                    models.SmallIntegerField(
+                        choices=[(1986, "1986"), (2003, "2003"), (2023, "2023")],
+                        verbose_name="Annee d'arrivee",
+                    ),
+                ),
+                ("superficie_ha", models.FloatField(verbose_name="Superficie (ha)")),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(
+                        blank=True, null=True, srid=4326, verbose_name="Zone changee"
+                    ),
+                ),
+                (
+                    "signature",
+                    models.CharField(
+                        help_text="md5 des occupations superposees : recalcul si elles changent",
+                        max_length=32,
+                        verbose_name="Signature des donnees sources",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "classe_debut",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions_depart",
+                        to="carbone.nomenclaturecouvert",
+                        verbose_name="Type de depart",
+                    ),
+                ),
+                (
+                    "classe_fin",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions_arrivee",
+                        to="carbone.nomenclaturecouvert",
+                        verbose_name="Type d'arrivee",
+                    ),
+                ),
+                (
+                    "foret",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions",
+                        to="carbone.foretclassee",
+                        verbose_name="Foret classee",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transition d'occupation",
+                "verbose_name_plural": "Transitions d'occupation",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "foret",
+                            "annee_debut",
+                            "annee_fin",
+                            "classe_debut",
+                            "classe_fin",
+                        ),
+                        name="uniq_transition_occupation",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# Pieces of every object that has none yet (same statement as
+# apps/carbone/subdivision.refresh, frozen here): the spatial filters can
+# rely on the table as soon as the schema is migrated.
+FILL_SQL = """
+    INSERT INTO carbone_geometriesubdivisee (couche, objet_id, geom, updated_at)
+    SELECT '{layer}', t.id,
+           ST_Subdivide(ST_CollectionExtract(ST_MakeValid(t.geom), 3), 256),
+           t.updated_at
+    FROM {table} t
+    WHERE NOT EXISTS (
+        SELECT 1 FROM carbone_geometriesubdivisee s
+        WHERE s.couche = '{layer}' AND s.objet_id = t.id
+    );
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0006_transitionoccupation"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=FILL_SQL.format(layer="occupation", table="carbone_occupationsol"),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql=FILL_SQL.format(layer="forets", table="carbone_foretclassee"),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
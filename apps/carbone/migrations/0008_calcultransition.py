@@ -0,0 +1,83 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("carbone", "0007_fill_geometriesubdivisee"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CalculTransition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "annee_debut",
+                    models.SmallIntegerField(
+                        choices=[(1986, "1986"), (2003, "2003"), (2023, "2023")],
+                        verbose_name="Annee de depart",
+                    ),
+                ),
+                (
+                    "annee_fin",
+                    models.SmallIntegerField(
+                        choices=[(1986, "1986"), (2003, "2003"), (2023, "2023")],
+                        verbose_name="Annee d'arrivee",
+                    ),
+                ),
+                (
+                    "signature",
+                    models.CharField(
+                        help_text="md5 des occupations superposees : recalcul si elles changent",
+                        max_length=32,
+                        verbose_name="Signature des donnees sources",
+                    ),
+                ),
+                (
+                    "cellules",
+                    models.PositiveIntegerField(default=0, verbose_name="Cellules ecrites"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "foret",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="calculs_transition",
+                        to="carbone.foretclassee",
+                        verbose_name="Foret classee",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Calcul de transition",
+                "verbose_name_plural": "Calculs de transition",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("foret", "annee_debut", "annee_fin"),
+                        name="uniq_calcul_transition",
+                    )
+                ],
+            },
+        ),
+        # Overlays already computed keep their signature (no full rebuild)
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO carbone_calcultransition
+                    (foret_id, annee_debut, annee_fin, signature, cellules, updated_at)
+                SELECT foret_id, annee_debut, annee_fin, MIN(signature), COUNT(*), MAX(updated_at)
+                FROM carbone_transitionoccupation
+                GROUP BY foret_id, annee_debut, annee_fin;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -156,6 +156,13 @@ class OccupationSol(models.Model):
         return f"{self.foret.code} - {self.nomenclature.code} ({self.annee})"
 
     def save(self, *args, **kwargs):
+        # Les deux save() ci-dessous : une seule mise a jour des geometries,
+        # des statistiques et de la version des donnees (signals.deferred)
+        from .signals import deferred
+        with deferred():
+            self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
         # 1) Persister d'abord la geometrie (et obtenir un id).
         super().save(*args, **kwargs)
 
@@ -280,3 +287,205 @@ class Infrastructure(models.Model):
 
     def __str__(self):
         return f"{self.get_type_infra_display()} - {self.nom or 'Sans nom'}"
+
+
+class GeometrieGeneralisee(models.Model):
+    """
+    Geometrie pre-simplifiee et pre-validee d'un objet, une par bande de zoom
+    (simplification.ZOOM_BANDS). Lue par le tier SQL de l'API a la place de
+    ST_MakeValid + ST_SimplifyPreserveTopology par ligne et par requete.
+    Tenue a jour par apps/carbone/generalisation.py (signaux + commande
+    generalise_geometries).
+    """
+
+    COUCHE_CHOICES = [
+        ('occupation', 'Occupation du sol'),
+        ('forets', 'Foret classee'),
+        ('zones', "Zone d'etude"),
+    ]
+
+    couche = models.CharField(max_length=20, choices=COUCHE_CHOICES, verbose_name='Couche')
+    objet_id = models.BigIntegerField(verbose_name="Identifiant de l'objet")
+    bande = models.CharField(max_length=10, verbose_name='Bande de zoom')
+    geom = models.MultiPolygonField(srid=4326, verbose_name='Geometrie generalisee')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Geometrie generalisee'
+        verbose_name_plural = 'Geometries generalisees'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['couche', 'objet_id', 'bande'],
+                name='uniq_geometrie_generalisee',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.couche} #{self.objet_id} ({self.bande})"
+
+
+class GeometrieSubdivisee(models.Model):
+    """
+    Morceau (ST_Subdivide, <= 256 sommets) de la geometrie d'une occupation
+    ou d'une foret. Un polygone geant a une bbox qui couvre tout : l'index
+    GiST ne filtre plus rien. Ses morceaux ont de petites bbox : les filtres
+    bbox et les tests d'intersection ne touchent que les morceaux utiles.
+    Tenue a jour par apps/carbone/subdivision.py (signaux + commande
+    generalise_geometries).
+    """
+
+    COUCHE_CHOICES = [
+        ('occupation', 'Occupation du sol'),
+        ('forets', 'Foret classee'),
+    ]
+
+    couche = models.CharField(max_length=20, choices=COUCHE_CHOICES, verbose_name='Couche')
+    objet_id = models.BigIntegerField(verbose_name="Identifiant de l'objet")
+    geom = models.GeometryField(srid=4326, verbose_name='Morceau')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Geometrie subdivisee'
+        verbose_name_plural = 'Geometries subdivisees'
+        indexes = [
+            models.Index(fields=['couche', 'objet_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.couche} #{self.objet_id} (morceau {self.pk})"
+
+
+class StatistiqueOccupation(models.Model):
+    """
+    Agregats de carbone_occupationsol par (annee, foret, type de couvert) :
+    superficie, carbone, nombre de polygones. Lus par les statistiques de
+    l'API et du chat a la place de GROUP BY sur la table des geometries.
+    Tenue a jour par apps/carbone/statistics.py (signaux, commandes d'import,
+    commande refresh_statistics).
+    """
+
+    annee = models.SmallIntegerField(choices=ANNEE_CHOICES, verbose_name='Annee')
+    foret = models.ForeignKey(
+        ForetClassee,
+        on_delete=models.CASCADE,
+        related_name='statistiques',
+        verbose_name='Foret classee',
+    )
+    nomenclature = models.ForeignKey(
+        NomenclatureCouvert,
+        on_delete=models.CASCADE,
+        related_name='statistiques',
+        verbose_name='Type de couvert',
+    )
+    superficie_ha = models.FloatField(null=True, blank=True, verbose_name='Superficie (ha)')
+    stock_carbone = models.FloatField(null=True, blank=True, verbose_name='Stock carbone (tCO2)')
+    nombre_polygones = models.IntegerField(default=0, verbose_name='Nombre de polygones')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Statistique d'occupation"
+        verbose_name_plural = "Statistiques d'occupation"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['annee', 'foret', 'nomenclature'],
+                name='uniq_statistique_occupation',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.annee} #{self.foret_id} #{self.nomenclature_id}"
+
+
+class TransitionOccupation(models.Model):
+    """
+    Cellule de la matrice de transition d'une foret entre deux annees :
+    superficie passee du type `classe_debut` (annee_debut) au type
+    `classe_fin` (annee_fin), mesuree par superposition geometrique des
+    occupations. `geom` : zone changee (pertes / gains), absente sur la
+    diagonale (zone inchangee). Calculee hors ligne par la commande
+    build_transitions (apps/carbone/transitions.py).
+    """
+
+    foret = models.ForeignKey(
+        ForetClassee,
+        on_delete=models.CASCADE,
+        related_name='transitions',
+        verbose_name='Foret classee',
+    )
+    annee_debut = models.SmallIntegerField(choices=ANNEE_CHOICES, verbose_name='Annee de depart')
+    annee_fin = models.SmallIntegerField(choices=ANNEE_CHOICES, verbose_name="Annee d'arrivee")
+    classe_debut = models.ForeignKey(
+        NomenclatureCouvert,
+        on_delete=models.CASCADE,
+        related_name='transitions_depart',
+        verbose_name='Type de depart',
+    )
+    classe_fin = models.ForeignKey(
+        NomenclatureCouvert,
+        on_delete=models.CASCADE,
+        related_name='transitions_arrivee',
+        verbose_name="Type d'arrivee",
+    )
+    superficie_ha = models.FloatField(verbose_name='Superficie (ha)')
+    geom = models.MultiPolygonField(srid=4326, null=True, blank=True, verbose_name='Zone changee')
+    signature = models.CharField(
+        max_length=32,
+        verbose_name='Signature des donnees sources',
+        help_text='md5 des occupations superposees : recalcul si elles changent',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Transition d'occupation"
+        verbose_name_plural = "Transitions d'occupation"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['foret', 'annee_debut', 'annee_fin', 'classe_debut', 'classe_fin'],
+                name='uniq_transition_occupation',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"#{self.foret_id} {self.annee_debut}->{self.annee_fin} "
+            f"#{self.classe_debut_id}->#{self.classe_fin_id}"
+        )
+
+
+class CalculTransition(models.Model):
+    """
+    Superposition calculee d'une foret entre deux annees : signature des
+    occupations sources et nombre de cellules ecrites. Une ligne par calcul,
+    meme quand il ne produit aucune cellule (foret sans occupation une des
+    deux annees) : build_transitions ne le refait pas tant que la signature
+    ne change pas.
+    """
+
+    foret = models.ForeignKey(
+        ForetClassee,
+        on_delete=models.CASCADE,
+        related_name='calculs_transition',
+        verbose_name='Foret classee',
+    )
+    annee_debut = models.SmallIntegerField(choices=ANNEE_CHOICES, verbose_name='Annee de depart')
+    annee_fin = models.SmallIntegerField(choices=ANNEE_CHOICES, verbose_name="Annee d'arrivee")
+    signature = models.CharField(
+        max_length=32,
+        verbose_name='Signature des donnees sources',
+        help_text='md5 des occupations superposees : recalcul si elles changent',
+    )
+    cellules = models.PositiveIntegerField(default=0, verbose_name='Cellules ecrites')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Calcul de transition'
+        verbose_name_plural = 'Calculs de transition'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['foret', 'annee_debut', 'annee_fin'],
+                name='uniq_calcul_transition',
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.foret_id} {self.annee_debut}->{self.annee_fin}"
@@ -0,0 +1,235 @@
+"""
+Model signals of the carbone app.
+
+Generalised geometries (generalisation.py) and subdivided pieces
+(subdivision.py) follow every ORM save / delete of an occupation, forest or
+zone. Raw SQL writes are not seen: run `manage.py generalise_geometries`
+after them.
+
+Statistics summary rows (statistics.py) follow every ORM save / delete of
+an occupation, old and new (annee, foret) partitions alike.
+
+Any change to the data shown by the layers (occupations, forests, zones,
+plots, infrastructures, nomenclature labels / colours) bumps the data
+version of the SQL-tier response cache and of the bulk exports (cache.py).
+
+Grouping the work:
+  - deferred()  → this thread only (OccupationSol.save, shapefile upload
+                  view): the receivers collect the touched ids / partitions
+                  and refresh exactly those once on exit, with one bump.
+  - bulk()      → management commands only: the receivers are disconnected
+                  process-wide (querysets fast-deleted again) and the work
+                  is caught up once on exit (stale rows, every partition).
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, generalisation, statistics, subdivision
+from .models import (
+    ForetClassee, Infrastructure, NomenclatureCouvert, OccupationSol, Placette, ZoneEtude,
+)
+
+LAYER_MODELS = {
+    OccupationSol: 'occupation',
+    ForetClassee: 'forets',
+    ZoneEtude: 'zones',
+}
+
+# Models whose changes bump the data version
+DATA_MODELS = (
+    OccupationSol, ForetClassee, NomenclatureCouvert, ZoneEtude, Placette, Infrastructure,
+)
+
+# Fields of an occupation the statistics summary depends on
+STATISTICS_FIELDS = {
+    'annee', 'foret', 'foret_id', 'nomenclature', 'nomenclature_id',
+    'superficie_ha', 'stock_carbone_calcule',
+}
+
+_deferred = threading.local()
+
+
+def _pending():
+    """Work collected by the enclosing deferred() block of this thread, or None."""
+    return getattr(_deferred, 'pending', None)
+
+
+def _refresh_geometries(layer, ids):
+    generalisation.refresh(layer, ids=ids)
+    if layer in subdivision.LAYER_TABLES:
+        subdivision.refresh(layer, ids=ids)
+
+
+@contextmanager
+def deferred():
+    """
+    Collect the work of the receivers inside the block (this thread only) and
+    do it once on exit: geometries of the touched ids, statistics of the
+    touched partitions, one data version bump. Nested blocks share the outer one.
+    """
+    if _pending() is not None:
+        yield
+        return
+    _deferred.pending = pending = {'ids': {}, 'partitions': set(), 'bump': False}
+    try:
+        yield
+    finally:
+        _deferred.pending = None
+        for layer, ids in pending['ids'].items():
+            _refresh_geometries(layer, sorted(ids))
+        if pending['partitions']:
+            # Bumps the data version
+            statistics.refresh(pending['partitions'])
+        elif pending['bump']:
+            cache.bump_data_version()
+
+
+@receiver(post_save, sender=OccupationSol)
+@receiver(post_save, sender=ForetClassee)
+@receiver(post_save, sender=ZoneEtude)
+def regeneralise_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    # raw : chargement de fixtures ; update_fields sans geom : rien a refaire
+    # (ex. second save() de OccupationSol pour superficie / stock)
+    if raw or (update_fields is not None and 'geom' not in update_fields):
+        return
+    layer = LAYER_MODELS[sender]
+    pending = _pending()
+    if pending is not None:
+        pending['ids'].setdefault(layer, set()).add(instance.pk)
+    else:
+        _refresh_geometries(layer, [instance.pk])
+
+
+@receiver(post_delete, sender=OccupationSol)
+@receiver(post_delete, sender=ForetClassee)
+@receiver(post_delete, sender=ZoneEtude)
+def forget_on_delete(sender, instance, **kwargs):
+    layer = LAYER_MODELS[sender]
+    pending = _pending()
+    if pending is not None:
+        # refresh(ids=...) drops the rows of ids that no longer exist
+        pending['ids'].setdefault(layer, set()).add(instance.pk)
+        return
+    generalisation.forget(layer, instance.pk)
+    if layer in subdivision.LAYER_TABLES:
+        subdivision.forget(layer, instance.pk)
+
+
+@receiver(pre_save, sender=OccupationSol)
+def remember_partition(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Partition avant modification : annee / foret peuvent changer
+    instance._previous_partition = None
+    if update_fields is not None and not {'annee', 'foret', 'foret_id'} & set(update_fields):
+        return
+    if not raw and instance.pk:
+        instance._previous_partition = sender.objects.filter(pk=instance.pk).values_list(
+            'annee', 'foret_id',
+        ).first()
+
+
+@receiver(post_save, sender=OccupationSol)
+def refresh_statistics_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # update_fields sans champ des statistiques : rien a refaire
+    if raw or (update_fields is not None and not STATISTICS_FIELDS & set(update_fields)):
+        return
+    _touch(instance.annee, instance.foret_id)
+    previous = getattr(instance, '_previous_partition', None)
+    if previous and previous != (instance.annee, instance.foret_id):
+        _touch(*previous)
+
+
+@receiver(post_delete, sender=OccupationSol)
+def refresh_statistics_on_delete(sender, instance, **kwargs):
+    _touch(instance.annee, instance.foret_id)
+
+
+def _touch(annee, foret_id):
+    pending = _pending()
+    if pending is not None:
+        pending['partitions'].add((annee, foret_id))
+    else:
+        statistics.touch(annee, foret_id)
+
+
+@receiver(post_save, sender=OccupationSol)
+@receiver(post_save, sender=ForetClassee)
+@receiver(post_save, sender=NomenclatureCouvert)
+@receiver(post_save, sender=ZoneEtude)
+@receiver(post_save, sender=Placette)
+@receiver(post_save, sender=Infrastructure)
+@receiver(post_delete, sender=OccupationSol)
+@receiver(post_delete, sender=ForetClassee)
+@receiver(post_delete, sender=NomenclatureCouvert)
+@receiver(post_delete, sender=ZoneEtude)
+@receiver(post_delete, sender=Placette)
+@receiver(post_delete, sender=Infrastructure)
+def invalidate_responses(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    pending = _pending()
+    if pending is not None:
+        pending['bump'] = True
+    else:
+        cache.bump_data_version()
+
+
+# ----------------------------------------------------------------------
+# Bulk imports
+# ----------------------------------------------------------------------
+# (signal, receiver, senders) of every receiver above
+RECEIVERS = [
+    (post_save, regeneralise_on_save, list(LAYER_MODELS)),
+    (post_delete, forget_on_delete, list(LAYER_MODELS)),
+    (pre_save, remember_partition, [OccupationSol]),
+    (post_save, refresh_statistics_on_save, [OccupationSol]),
+    (post_delete, refresh_statistics_on_delete, [OccupationSol]),
+    (post_save, invalidate_responses, list(DATA_MODELS)),
+    (post_delete, invalidate_responses, list(DATA_MODELS)),
+]
+
+_bulk_lock = threading.Lock()
+_bulk_depth = 0
+
+
+def _connect(connected):
+    for signal, handler, senders in RECEIVERS:
+        for sender in senders:
+            if connected:
+                signal.connect(handler, sender=sender)
+            else:
+                signal.disconnect(handler, sender=sender)
+
+
+@contextmanager
+def bulk():
+    """
+    Import commands only (never in a request: see deferred()): the
+    receivers are disconnected inside the block, then on exit the geometries changed or deleted meanwhile are
+    re-generalised / re-subdivided (stale rows only), the statistics summary
+    is refreshed and the data version bumped, once. Nested blocks share the
+    outer one. Disconnection is process-wide: writes of other threads
+    meanwhile are caught up by the same final pass.
+    """
+    global _bulk_depth
+    with _bulk_lock:
+        _bulk_depth += 1
+        if _bulk_depth == 1:
+            _connect(False)
+    try:
+        yield
+    finally:
+        with _bulk_lock:
+            _bulk_depth -= 1
+            outermost = _bulk_depth == 0
+            if outermost:
+                _connect(True)
+        if outermost:
+            for layer in LAYER_MODELS.values():
+                generalisation.refresh(layer, stale_only=True)
+                if layer in subdivision.LAYER_TABLES:
+                    subdivision.refresh(layer, stale_only=True)
+            # Bumps the data version (once)
+            statistics.refresh()
@@ -0,0 +1,80 @@
+"""
+Adaptive simplification tolerances, shared by the API views (SQL tier) and
+prebuild_geojson (zoom-banded cache files).
+"""
+
+# ================================================================
+# Adaptive simplification tolerance based on zoom level
+# ================================================================
+SIMPLIFY_TOLERANCE = {
+    # zoom_level: tolerance (degrees). Lower zoom = more aggressive simplification
+    # Optimized for heavy polygons (100K-800K vertices from Sentinel 2023 data)
+    'occupation': {
+        7: 0.01, 8: 0.005, 9: 0.003, 10: 0.002,
+        11: 0.001, 12: 0.0008, 13: 0.0005, 14: 0.0003,
+    },
+    'forets': {
+        7: 0.005, 8: 0.003, 9: 0.002, 10: 0.001,
+        11: 0.0005, 12: 0.0003, 13: 0.0002,
+    },
+    'zones': {
+        7: 0.005, 8: 0.003, 9: 0.002, 10: 0.001,
+        11: 0.0008, 12: 0.0005,
+    },
+}
+
+# ================================================================
+# Zoom bands of the static cache: one pre-built file per band.
+# (name, min zoom, max zoom) — None = open-ended. A band is built with the
+# tolerance of its finest zoom (max zoom, or min zoom for the last band),
+# so it is never too coarse anywhere inside the band.
+# ================================================================
+ZOOM_BANDS = [
+    ('z9', None, 9),
+    ('z11', 10, 11),
+    ('z13', 12, 13),
+    ('z14', 14, None),
+]
+
+
+def get_tolerance(layer_type, zoom):
+    """Return simplification tolerance for a given layer and zoom level."""
+    tolerances = SIMPLIFY_TOLERANCE.get(layer_type, {})
+    if zoom is None:
+        # Default fallback
+        defaults = {'occupation': 0.0008, 'forets': 0.0005, 'zones': 0.001}
+        return defaults.get(layer_type, 0.001)
+    zoom = int(zoom)
+    # Find closest zoom level (clamp to available range)
+    levels = sorted(tolerances.keys())
+    if not levels:
+        return 0.001
+    if zoom <= levels[0]:
+        return tolerances[levels[0]]
+    if zoom >= levels[-1]:
+        return tolerances[levels[-1]]
+    # Find nearest
+    for i, lvl in enumerate(levels):
+        if zoom <= lvl:
+            return tolerances[lvl]
+    return tolerances[levels[-1]]
+
+
+def zoom_band(zoom):
+    """Name of the zoom band containing `zoom` ('z9', 'z11'...), or None."""
+    try:
+        zoom = int(zoom)
+    except (TypeError, ValueError):
+        return None
+    for name, zmin, zmax in ZOOM_BANDS:
+        if (zmin is None or zoom >= zmin) and (zmax is None or zoom <= zmax):
+            return name
+    return None
+
+
+def band_tolerance(layer_type, band):
+    """Tolerance used to build a zoom band of a layer."""
+    for name, zmin, zmax in ZOOM_BANDS:
+        if name == band:
+            return get_tolerance(layer_type, zmax if zmax is not None else zmin)
+    raise ValueError(f'Unknown zoom band: {band}')
@@ -0,0 +1,67 @@
+"""
+Land-cover statistics summary (table carbone_statistiqueoccupation).
+
+The statistics of the API (occupations/stats, occupations/evolution) and of
+the chat (NLPEngine.build_*) are sums of area / carbon and polygon counts by
+(annee, foret, nomenclature). They used to be GROUP BY scans of
+carbone_occupationsol, whose rows carry the (huge) geometries. The sums are
+now kept in a small table, one row per (annee, foret, nomenclature), and the
+readers query it with the same ORM paths (foret__code, nomenclature__code...).
+
+Kept up to date per (annee, foret) partition by:
+  - signals.py            → save / delete through the ORM (admin, API)
+  - signals.bulk()        → import commands: one full refresh at the end,
+                            not one per row
+  - refresh_statistics command → raw SQL writes, repairs
+"""
+from django.db import connection, transaction
+
+from . import cache
+
+STATISTICS_TABLE = 'carbone_statistiqueoccupation'
+
+
+def refresh(partitions=None):
+    """
+    Recompute the summary rows of the (annee, foret_id) `partitions`, or of
+    every partition. Returns the number of summary rows written.
+    """
+    if partitions is not None:
+        partitions = sorted({(int(a), int(f)) for a, f in partitions if a and f})
+        if not partitions:
+            return 0
+        where = "WHERE (annee, foret_id) IN (SELECT * FROM unnest(%s::smallint[], %s::bigint[]))"
+        params = [[a for a, _ in partitions], [f for _, f in partitions]]
+    else:
+        where, params = '', []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {STATISTICS_TABLE} {where};", params)
+        cursor.execute(f"""
+            INSERT INTO {STATISTICS_TABLE}
+                (annee, foret_id, nomenclature_id, superficie_ha,
+                 stock_carbone, nombre_polygones, updated_at)
+            SELECT annee, foret_id, nomenclature_id, SUM(superficie_ha),
+                   SUM(stock_carbone_calcule), COUNT(*), NOW()
+            FROM carbone_occupationsol
+            {where}
+            GROUP BY annee, foret_id, nomenclature_id;
+        """, params)
+        rows = cursor.rowcount
+    # Readers of the summary (cube.py, cached responses) follow the data version
+    cache.bump_data_version()
+    return rows
+
+
+def summary_forets(annee):
+    """Forest ids having summary rows for `annee`."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT foret_id FROM {STATISTICS_TABLE} WHERE annee = %s;", [annee],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def touch(annee, foret_id):
+    """A row of partition (annee, foret_id) changed: refresh it."""
+    refresh([(annee, foret_id)])
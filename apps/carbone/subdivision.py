@@ -0,0 +1,170 @@
+"""
+Subdivided geometries (table carbone_geometriesubdivisee).
+
+Occupation polygons of 500k-800k vertices (see simplify_geometries) have a
+bounding box covering most of the department: the GiST index on geom then
+matches them for ANY viewport, and every intersection test walks the whole
+ring. ST_Subdivide cuts each geometry into pieces of at most MAX_VERTICES
+vertices, keyed back to the source object: spatial predicates run on the
+pieces (small boxes, small rings) and only return the object ids.
+
+Used by:
+  - the bbox filter of the occupation SQL tier   → bbox_filter_sql()
+  - forest lookups of shapefile imports           → forets_intersecting()
+  - zonal statistics of user-drawn polygons      → zonal_stats()
+  - transition overlays, hexagon grid            (transitions.py, hexagons.py)
+
+Kept up to date like the generalised geometries (signals.py + the
+generalise_geometries command).
+"""
+from django.db import connection, transaction
+
+from .generalisation import envelope_sql
+
+SUBDIVIDED_TABLE = 'carbone_geometriesubdivisee'
+
+MAX_VERTICES = 256
+
+# layer → source table
+LAYER_TABLES = {
+    'occupation': 'carbone_occupationsol',
+    'forets': 'carbone_foretclassee',
+}
+
+
+def refresh(layer, ids=None, stale_only=False):
+    """
+    (Re)build the pieces of a layer: the rows `ids`, every row changed since
+    it was subdivided (`stale_only`), or all. Pieces of deleted objects are
+    purged. Returns the number of pieces written. Pieces carry the updated_at
+    of their source, as the generalised geometries do.
+    """
+    table = LAYER_TABLES[layer]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if ids is not None:
+            ids = [int(i) for i in ids]
+        elif stale_only:
+            cursor.execute(f"""
+                SELECT t.id FROM {table} t
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {SUBDIVIDED_TABLE} s
+                    WHERE s.couche = %s AND s.objet_id = t.id
+                      AND s.updated_at = t.updated_at
+                );
+            """, [layer])
+            ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f"""
+            DELETE FROM {SUBDIVIDED_TABLE} s
+            WHERE s.couche = %s
+              AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = s.objet_id);
+        """, [layer])
+        if ids == []:
+            return 0
+
+        id_filter, params = '', []
+        if ids is not None:
+            id_filter = 'WHERE t.id = ANY(%s)'
+            params = [ids]
+            cursor.execute(
+                f"DELETE FROM {SUBDIVIDED_TABLE} WHERE couche = %s AND objet_id = ANY(%s);",
+                [layer, ids],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SUBDIVIDED_TABLE} WHERE couche = %s;", [layer])
+
+        cursor.execute(f"""
+            INSERT INTO {SUBDIVIDED_TABLE} (couche, objet_id, geom, updated_at)
+            SELECT %s, t.id,
+                   ST_Subdivide(ST_CollectionExtract(ST_MakeValid(t.geom), 3), {MAX_VERTICES}),
+                   t.updated_at
+            FROM {table} t
+            {id_filter};
+        """, [layer] + params)
+        return cursor.rowcount
+
+
+def forget(layer, object_id):
+    """Drop the pieces of a deleted object."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SUBDIVIDED_TABLE} WHERE couche = %s AND objet_id = %s;",
+            [layer, object_id],
+        )
+
+
+def pieces_sql(layer):
+    """
+    Subquery (objet_id, geom) of the pieces of a layer. Every object has
+    pieces: migration 0007, the signals (signals.py) and the
+    generalise_geometries command keep them complete, so no per-request
+    fallback on the source table.
+    """
+    return f"(SELECT s.objet_id, s.geom FROM {SUBDIVIDED_TABLE} s WHERE s.couche = '{layer}')"
+
+
+def bbox_filter_sql(alias, bbox):
+    """
+    WHERE condition: `alias` (an occupation row) has a piece touching bbox.
+    Replaces `alias.geom && envelope`, which matches every giant polygon.
+    """
+    return (
+        f"{alias}.id IN (SELECT p.objet_id FROM {pieces_sql('occupation')} p "
+        f"WHERE p.geom && {envelope_sql(bbox)})"
+    )
+
+
+def forets_intersecting(geom):
+    """Ids of the forests intersecting a GEOS geometry (EPSG:4326), via their pieces."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT DISTINCT p.objet_id FROM {pieces_sql('forets')} p
+            WHERE ST_Intersects(p.geom, ST_GeomFromEWKB(%s))
+            ORDER BY p.objet_id;
+        """, [bytes(geom.ewkb)])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def zonal_stats(geom, annees=None, per_forest=False):
+    """
+    Area (ha) and carbon (tCO2, area x reference stock of the class) of the
+    occupations inside a GEOS polygon (EPSG:4326), per year and cover class
+    (and forest with `per_forest`). Returns (zone area in ha, rows).
+
+    The zone is subdivided too, and intersected with the pieces: every test
+    pairs two small rings. Pieces lying entirely inside the zone are counted
+    whole, without computing any intersection.
+    """
+    foret = 'f.code' if per_forest else 'NULL::text'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT ST_Area(ST_MakeValid(ST_GeomFromEWKB(%s))::geography) / 10000.0;",
+            [bytes(geom.ewkb)],
+        )
+        zone_ha = cursor.fetchone()[0] or 0
+        cursor.execute(f"""
+            WITH zone AS (
+                SELECT ST_Subdivide(
+                    ST_CollectionExtract(ST_MakeValid(ST_GeomFromEWKB(%s)), 3), {MAX_VERTICES}
+                ) AS geom
+            ),
+            parts AS (
+                SELECT o.annee, o.foret_id, o.nomenclature_id,
+                       ST_Area((CASE WHEN ST_CoveredBy(s.geom, z.geom) THEN s.geom
+                                     ELSE ST_Intersection(s.geom, z.geom) END)::geography
+                       ) / 10000.0 AS ha
+                FROM zone z
+                JOIN {pieces_sql('occupation')} s ON ST_Intersects(s.geom, z.geom)
+                JOIN carbone_occupationsol o ON o.id = s.objet_id
+                WHERE %s::smallint[] IS NULL OR o.annee = ANY(%s::smallint[])
+            )
+            SELECT p.annee, {foret}, n.code, n.libelle_fr, n.couleur_hex,
+                   SUM(p.ha), SUM(p.ha) * COALESCE(n.stock_carbone_reference, 0)
+            FROM parts p
+            JOIN carbone_nomenclaturecouvert n ON n.id = p.nomenclature_id
+            JOIN carbone_foretclassee f ON f.id = p.foret_id
+            GROUP BY p.annee, {foret}, n.id
+            HAVING SUM(p.ha) > 0
+            ORDER BY p.annee, {foret}, n.ordre_affichage;
+        """, [bytes(geom.ewkb), annees, annees])
+        return zone_ha, cursor.fetchall()
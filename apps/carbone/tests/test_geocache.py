@@ -0,0 +1,28 @@
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.carbone import geocache
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+
+    def accepted(self, header=None):
+        extra = {} if header is None else {'HTTP_ACCEPT_ENCODING': header}
+        return geocache.accepted_encodings(RequestFactory().get('/', **extra))
+
+    def test_plain_list(self):
+        self.assertEqual(self.accepted('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+
+    def test_q_zero_is_refused(self):
+        self.assertEqual(self.accepted('gzip;q=0, br'), {'br'})
+        self.assertEqual(self.accepted('br; q=0.0, gzip;q=0.5'), {'gzip'})
+
+    def test_case_and_whitespace(self):
+        self.assertEqual(self.accepted('  GZip ;q=1 ,BR'), {'gzip', 'br'})
+
+    def test_missing_or_empty_header(self):
+        self.assertEqual(self.accepted(), set())
+        self.assertEqual(self.accepted(''), set())
+        self.assertEqual(self.accepted(' , '), set())
+
+    def test_invalid_q_is_refused(self):
+        self.assertEqual(self.accepted('gzip;q=abc, br'), {'br'})
@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from apps.carbone.views import RANGE_UNSATISFIABLE, _parse_range
+
+SIZE = 100
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_first_last(self):
+        self.assertEqual(_parse_range('bytes=0-9', SIZE), (0, 9))
+
+    def test_open_ended(self):
+        self.assertEqual(_parse_range('bytes=90-', SIZE), (90, 99))
+
+    def test_suffix(self):
+        self.assertEqual(_parse_range('bytes=-10', SIZE), (90, 99))
+        # suffix longer than the file: the whole file
+        self.assertEqual(_parse_range('bytes=-500', SIZE), (0, 99))
+
+    def test_last_beyond_the_end_is_truncated(self):
+        self.assertEqual(_parse_range('bytes=95-200', SIZE), (95, 99))
+
+    def test_start_beyond_the_end_is_unsatisfiable(self):
+        self.assertEqual(_parse_range('bytes=100-', SIZE), RANGE_UNSATISFIABLE)
+        self.assertEqual(_parse_range('bytes=150-160', SIZE), RANGE_UNSATISFIABLE)
+        self.assertEqual(_parse_range('bytes=-0', SIZE), RANGE_UNSATISFIABLE)
+
+    def test_invalid_ranges_are_ignored(self):
+        for header in (None, '', 'bytes=5-3', 'bytes=-', 'bytes=0-1,5-6', 'items=0-9', 'bytes=a-b'):
+            with self.subTest(header=header):
+                self.assertIsNone(_parse_range(header, SIZE))
@@ -0,0 +1,56 @@
+from django.test import SimpleTestCase
+
+from apps.carbone import tiles
+
+# Département d'Oumé (approx.)
+OUME = (-5.6, 6.1, -5.2, 6.6)
+
+
+class TileRangeTests(SimpleTestCase):
+
+    def test_whole_world(self):
+        self.assertEqual(tiles.tile_range((-180, -90, 180, 90), 1), (0, 0, 1, 1))
+
+    def test_edge_of_the_grid_is_clamped(self):
+        # east = 180° and north beyond the Mercator limit stay on the last tiles
+        self.assertEqual(tiles.tile_range((170, 80, 180, 89), 3), (7, 0, 7, 0))
+
+    def test_single_tile_at_zoom_0(self):
+        self.assertEqual(tiles.tile_range(OUME, 0), (0, 0, 0, 0))
+
+    def test_round_trip_with_tile_bounds(self):
+        west, south, east, north = tiles.tile_bounds(12, 1985, 1973)
+        inner = (west + 1e-9, south + 1e-9, east - 1e-9, north - 1e-9)
+        self.assertEqual(tiles.tile_range(inner, 12), (1985, 1973, 1985, 1973))
+
+
+class SnapBboxTests(SimpleTestCase):
+
+    def test_snapped_bbox_contains_the_request(self):
+        bbox = (-5.45, 6.35, -5.40, 6.40)
+        z, cells, (west, south, east, north) = tiles.snap_bbox(bbox, 12)
+
+        self.assertEqual(z, 12)
+        self.assertEqual(len(cells), 2)
+        self.assertLessEqual(west, bbox[0])
+        self.assertLessEqual(south, bbox[1])
+        self.assertGreaterEqual(east, bbox[2])
+        self.assertGreaterEqual(north, bbox[3])
+
+    def test_grid_coarsened_to_the_cell_cap(self):
+        z, cells, _ = tiles.snap_bbox(OUME, 16)
+
+        self.assertEqual(z, 12)
+        self.assertLessEqual(len(cells), tiles.MAX_SNAP_CELLS)
+
+    def test_whole_world_stops_under_the_cap(self):
+        z, cells, _ = tiles.snap_bbox((-180, -85, 180, 85), 5)
+
+        self.assertEqual(z, 2)
+        self.assertEqual(len(cells), 16)
+
+    def test_zoom_outside_the_pyramid_is_clamped(self):
+        z, cells, _ = tiles.snap_bbox((-5.45, 6.35, -5.44999, 6.35001), 99)
+
+        self.assertEqual(z, tiles.MAX_ZOOM)
+        self.assertEqual(len(cells), len(set(cells)))
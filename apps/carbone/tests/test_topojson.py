@@ -0,0 +1,103 @@
+from django.test import SimpleTestCase
+
+from apps.carbone import topojson
+
+# tolerance 0.01° → quantisation grid 0.0025° (topojson.QUANTUM_RATIO)
+TOLERANCE = 0.01
+
+
+def square(x, y, size=1.0):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def feature(fid, *rings):
+    return {
+        'type': 'Feature', 'id': fid,
+        'geometry': {'type': 'Polygon', 'coordinates': list(rings)},
+        'properties': {'code': fid},
+    }
+
+
+def decode(topology, arc):
+    """Absolute quantised points of an arc reference (~n: reversed)."""
+    points = []
+    x = y = 0
+    for dx, dy in topology['arcs'][arc if arc >= 0 else ~arc]:
+        x, y = x + dx, y + dy
+        points.append((x, y))
+    return points if arc >= 0 else points[::-1]
+
+
+def geometries(topology, name='features'):
+    return topology['objects'][name]['geometries']
+
+
+class EncodeTests(SimpleTestCase):
+
+    def test_adjacent_squares_share_one_arc(self):
+        topology = topojson.encode(
+            [feature('A', square(0, 0)), feature('B', square(1, 0))], TOLERANCE,
+        )
+        a, b = (g['arcs'][0] for g in geometries(topology))
+        shared = {n if n >= 0 else ~n for n in a} & {n if n >= 0 else ~n for n in b}
+
+        self.assertEqual(len(topology['arcs']), 3)
+        self.assertEqual(len(shared), 1)
+        arc = shared.pop()
+        # Stored once, walked in opposite directions by the two squares
+        self.assertTrue((arc in a and ~arc in b) or (arc in b and ~arc in a))
+        self.assertEqual(sorted(decode(topology, arc)), [(400, 0), (400, 400)])
+
+    def test_ring_arcs_close(self):
+        topology = topojson.encode([feature('A', square(0, 0))], TOLERANCE)
+        points = []
+        for arc in geometries(topology)[0]['arcs'][0]:
+            points.extend(decode(topology, arc)[1 if points else 0:])
+
+        self.assertEqual(points[0], points[-1])
+        self.assertEqual(len(set(points)), 4)
+
+    def test_hole_is_kept(self):
+        topology = topojson.encode(
+            [feature('A', square(0, 0, 10), square(4, 4, 2)[::-1])], TOLERANCE,
+        )
+        geometry = geometries(topology)[0]
+
+        self.assertEqual(geometry['type'], 'Polygon')
+        self.assertEqual(len(geometry['arcs']), 2)
+
+    def test_collapsed_hole_is_dropped(self):
+        topology = topojson.encode(
+            [feature('A', square(0, 0, 10), square(4, 4, 0.0001)[::-1])], TOLERANCE,
+        )
+        geometry = geometries(topology)[0]
+
+        self.assertEqual(geometry['type'], 'Polygon')
+        self.assertEqual(len(geometry['arcs']), 1)
+
+    def test_collapsed_polygon_has_no_geometry(self):
+        topology = topojson.encode(
+            [feature('A', square(0, 0)), feature('tiny', square(5, 5, 0.0001))], TOLERANCE,
+        )
+        tiny = geometries(topology)[1]
+
+        self.assertIsNone(tiny['type'])
+        self.assertEqual(tiny['id'], 'tiny')
+        self.assertEqual(tiny['properties'], {'code': 'tiny'})
+
+    def test_transform_and_bbox(self):
+        topology = topojson.encode([feature('A', square(2, 3))], TOLERANCE, name='forets')
+
+        self.assertEqual(topology['transform']['translate'], [2, 3])
+        self.assertEqual(topology['transform']['scale'], [0.0025, 0.0025])
+        self.assertEqual(topology['bbox'], [2, 3, 3, 4])
+        self.assertIn('forets', topology['objects'])
+
+    def test_vertex_count(self):
+        geometry = {
+            'type': 'MultiPolygon',
+            'coordinates': [[square(0, 0), square(0.2, 0.2, 0.1)], [square(5, 5)]],
+        }
+
+        self.assertEqual(topojson.vertex_count(geometry), 15)
+        self.assertEqual(topojson.vertex_count(None), 0)
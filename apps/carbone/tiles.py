@@ -0,0 +1,325 @@
+"""
+Mapbox Vector Tiles (MVT) built by PostGIS, and MBTiles archives.
+
+Instead of shipping a whole-year FeatureCollection to the browser, the map
+asks for the tiles of its viewport only: /api/v1/tiles/occupation/{z}/{x}/{y}.pbf
+
+  - ST_TileEnvelope gives the tile bounds in Web Mercator (EPSG:3857).
+  - The GiST index on geom is hit with an EPSG:4326 envelope (no transform
+    of the stored geometries in the WHERE clause).
+  - Each polygon is first cut to the tile + buffer (ST_ClipByBox2D), so a
+    800k-vertex polygon only costs the part that is actually visible.
+  - ST_AsMVTGeom quantises to the 4096 tile grid: the zoom level itself
+    decides how much detail is kept, no per-request ST_SimplifyPreserveTopology.
+
+Pre-built pyramids (`manage.py prebuild_tiles`) are stored as one MBTiles
+file per year in media/geocache/tiles/ and served without any SQL:
+/api/v1/tiles/{annee}/{z}/{x}/{y}.pbf (layers: occupation, forets, zones).
+"""
+import gzip
+import math
+import os
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+# MVT parameters (MapLibre defaults)
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Tile pyramid bounds served by the API (Oumé: overview → parcel level)
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+TILES_DIR = os.path.join(settings.MEDIA_ROOT, 'geocache', 'tiles')
+
+# Layers of the yearly basemap archive, in drawing order
+ARCHIVE_LAYERS = ('zones', 'forets', 'occupation')
+
+
+def valid_tile(z, x, y):
+    """True if z/x/y is an existing tile of the XYZ (Google/OSM) scheme."""
+    if not MIN_ZOOM <= z <= MAX_ZOOM:
+        return False
+    n = 1 << z
+    return 0 <= x < n and 0 <= y < n
+
+
+def tile_range(bounds, z):
+    """
+    XYZ tile range covering (west, south, east, north) in degrees at zoom z.
+    Returns (xmin, ymin, xmax, ymax), inclusive.
+    """
+    west, south, east, north = bounds
+    n = 1 << z
+
+    def _x(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def _y(lat):
+        lat = max(-85.0511, min(85.0511, lat))
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int(
+            (1.0 - math.asinh(math.tan(rad)) / math.pi) / 2.0 * n
+        )))
+
+    return _x(west), _y(north), _x(east), _y(south)
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) in degrees of XYZ tile z/x/y."""
+    n = 1 << z
+
+    def _lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, _lat(y + 1), (x + 1) / n * 360.0 - 180.0, _lat(y)
+
+
+# Most grid cells a snapped bbox may span (coarser grid beyond that)
+MAX_SNAP_CELLS = 36
+
+
+def snap_bbox(bbox, zoom):
+    """
+    Snap a (west, south, east, north) bbox OUTWARD to the XYZ tile grid.
+    The grid is the one of `zoom` (a viewport spans a few tiles of its own
+    zoom), coarsened until at most MAX_SNAP_CELLS cells are covered.
+    Returns (grid zoom, [(x, y), ...], snapped bbox).
+    """
+    z = max(MIN_ZOOM, min(MAX_ZOOM, int(zoom)))
+    while True:
+        xmin, ymin, xmax, ymax = tile_range(bbox, z)
+        count = (xmax - xmin + 1) * (ymax - ymin + 1)
+        if count <= MAX_SNAP_CELLS or z == MIN_ZOOM:
+            break
+        z -= 1
+    cells = [(x, y) for x in range(xmin, xmax + 1) for y in range(ymin, ymax + 1)]
+    west, north = tile_bounds(z, xmin, ymin)[0], tile_bounds(z, xmin, ymin)[3]
+    east, south = tile_bounds(z, xmax, ymax)[2], tile_bounds(z, xmax, ymax)[1]
+    return z, cells, (west, south, east, north)
+
+
+# ----------------------------------------------------------------------
+# SQL building blocks
+# ----------------------------------------------------------------------
+# Tile envelope in 3857 (for ST_AsMVTGeom) and the same envelope widened by
+# the tile buffer, in 4326 (for the index filter and the clipping).
+_BOUNDS_CTE = f"""
+bounds AS (
+    SELECT
+        ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+        ST_Transform(
+            ST_Expand(
+                ST_TileEnvelope(%(z)s, %(x)s, %(y)s),
+                (ST_XMax(ST_TileEnvelope(%(z)s, %(x)s, %(y)s))
+                 - ST_XMin(ST_TileEnvelope(%(z)s, %(x)s, %(y)s)))
+                * {TILE_BUFFER} / {TILE_EXTENT}.0
+            ), 4326
+        ) AS clip
+)"""
+
+
+def _mvt_geom(column):
+    """ST_AsMVTGeom expression for a stored EPSG:4326 geometry column."""
+    return (
+        f"ST_AsMVTGeom(ST_Transform(ST_ClipByBox2D({column}, b.clip), 3857), "
+        f"b.env, {TILE_EXTENT}, {TILE_BUFFER}, true)"
+    )
+
+
+def _layer(name, select_sql):
+    """Wrap a per-feature SELECT into a bytea-returning ST_AsMVT sub-query."""
+    return f"""
+    COALESCE((
+        SELECT ST_AsMVT(t.*, '{name}', {TILE_EXTENT}, 'geom', 'fid')
+        FROM ({select_sql}) t
+        WHERE t.geom IS NOT NULL
+    ), ''::bytea)"""
+
+
+def _occupation_select(annee=None, foret_code=None, type_code=None):
+    conditions = ["o.geom && b.clip"]
+    params = {}
+
+    if annee:
+        conditions.append("o.annee = %(annee)s")
+        params['annee'] = int(annee)
+    if foret_code:
+        conditions.append("UPPER(f.code) = UPPER(%(foret_code)s)")
+        params['foret_code'] = foret_code
+    if type_code:
+        conditions.append("UPPER(n.code) = UPPER(%(type_code)s)")
+        params['type_code'] = type_code
+
+    where = "WHERE " + " AND ".join(conditions)
+
+    sql = f"""
+        SELECT
+            {_mvt_geom('o.geom')} AS geom,
+            o.id AS fid,
+            o.id AS id,
+            f.code AS foret_code,
+            f.nom AS foret_nom,
+            n.code AS type_couvert,
+            n.libelle_fr AS libelle,
+            n.couleur_hex AS couleur,
+            o.annee AS annee,
+            ROUND(o.superficie_ha::numeric, 2)::float8 AS superficie_ha,
+            ROUND(o.stock_carbone_calcule::numeric, 2)::float8 AS stock_carbone_calcule,
+            o.source_donnee AS source_donnee
+        FROM carbone_occupationsol o
+        JOIN carbone_foretclassee f ON o.foret_id = f.id
+        JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
+        CROSS JOIN bounds b
+        {where}
+        ORDER BY n.ordre_affichage, o.id
+    """
+    return sql, params
+
+
+_FORETS_SELECT = f"""
+        SELECT
+            {_mvt_geom('f.geom')} AS geom,
+            f.id AS fid,
+            f.id AS id,
+            f.code AS code,
+            f.nom AS nom,
+            f.superficie_legale_ha AS superficie_legale_ha
+        FROM carbone_foretclassee f
+        CROSS JOIN bounds b
+        WHERE f.geom && b.clip
+"""
+
+_ZONES_SELECT = f"""
+        SELECT
+            {_mvt_geom('z.geom')} AS geom,
+            z.id AS fid,
+            z.id AS id,
+            z.nom AS nom,
+            z.type_zone AS type_zone,
+            z.niveau AS niveau
+        FROM carbone_zoneetude z
+        CROSS JOIN bounds b
+        WHERE z.geom && b.clip
+        ORDER BY z.niveau, z.nom
+"""
+
+
+def occupation_layer_sql(annee=None, foret_code=None, type_code=None):
+    """
+    Return (sql, params) for the 'occupation' MVT layer of one tile.
+
+    Filters mirror OccupationSolViewSet.list: annee, foret_code, type.
+    The tile coordinates are bound as %(z)s, %(x)s, %(y)s.
+    """
+    select_sql, params = _occupation_select(annee, foret_code, type_code)
+    sql = f"WITH {_BOUNDS_CTE} SELECT {_layer('occupation', select_sql)};"
+    return sql, params
+
+
+def archive_tile_sql(annee):
+    """
+    Return (sql, params) for one tile of the yearly basemap archive:
+    zones + forets + occupation of `annee`, concatenated into a single MVT
+    (an MVT tile is a plain sequence of layers, so bytea || bytea is valid).
+    """
+    occ_select, params = _occupation_select(annee=annee)
+    layers = {
+        'zones': _layer('zones', _ZONES_SELECT),
+        'forets': _layer('forets', _FORETS_SELECT),
+        'occupation': _layer('occupation', occ_select),
+    }
+    body = ' || '.join(layers[name] for name in ARCHIVE_LAYERS)
+    sql = f"WITH {_BOUNDS_CTE} SELECT {body};"
+    return sql, params
+
+
+def render_tile(sql, params, z, x, y):
+    """Execute a layer query for tile z/x/y and return the MVT bytes."""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {**params, 'z': z, 'x': x, 'y': y})
+        row = cursor.fetchone()
+    if row and row[0]:
+        return bytes(row[0])
+    return b''
+
+
+# ----------------------------------------------------------------------
+# MBTiles archives (https://github.com/mapbox/mbtiles-spec, v1.3)
+# ----------------------------------------------------------------------
+def archive_path(annee):
+    return os.path.join(TILES_DIR, f'carte_{annee}.mbtiles')
+
+
+def create_archive(path, metadata):
+    """Create an empty MBTiles file with the given metadata dict."""
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (
+            zoom_level INTEGER, tile_column INTEGER,
+            tile_row INTEGER, tile_data BLOB
+        );
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    db.executemany(
+        'INSERT INTO metadata (name, value) VALUES (?, ?)',
+        [(k, str(v)) for k, v in metadata.items()],
+    )
+    db.commit()
+    return db
+
+
+def write_tile(db, z, x, y, data):
+    """Store MVT bytes (gzipped, as the spec recommends) — TMS row order."""
+    db.execute(
+        'INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)',
+        (z, x, (1 << z) - 1 - y, gzip.compress(data, compresslevel=9)),
+    )
+
+
+# Read-only connections, one set per request thread (a sqlite3 connection
+# must not be shared between threads), reopened when the archive is replaced
+_readers = threading.local()
+
+
+def read_tile(path, z, x, y):
+    """
+    Return the gzipped MVT bytes of tile z/x/y from an MBTiles archive,
+    b'' for an empty tile of the pyramid, or None if there is no archive or
+    `z` is outside its minzoom-maxzoom (not an empty tile: render it).
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    readers = getattr(_readers, 'archives', None)
+    if readers is None:
+        readers = _readers.archives = {}
+    cached = readers.get(path)
+    if cached is None or cached[0] != mtime:
+        if cached is not None:
+            cached[1].close()
+        db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        metadata = dict(db.execute(
+            "SELECT name, value FROM metadata WHERE name IN ('minzoom', 'maxzoom')"
+        ).fetchall())
+        zooms = (int(metadata.get('minzoom', MIN_ZOOM)), int(metadata.get('maxzoom', MAX_ZOOM)))
+        readers[path] = cached = (mtime, db, zooms)
+
+    minzoom, maxzoom = cached[2]
+    if not minzoom <= z <= maxzoom:
+        return None
+
+    row = cached[1].execute(
+        'SELECT tile_data FROM tiles '
+        'WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+        (z, x, (1 << z) - 1 - y),
+    ).fetchone()
+    return bytes(row[0]) if row else b''
@@ -0,0 +1,273 @@
+"""
+TopoJSON output (format=topojson) for occupation, forest and zone layers.
+
+Land-cover polygons inside a forest share long borders, which GeoJSON stores
+twice — once per polygon — and which ST_Simplify then simplifies twice,
+independently: the two copies no longer match and the map shows slivers and
+gaps. Here every border is stored ONCE, as a shared arc:
+
+  1. PostGIS snaps the raw geometries to a grid (geometry_sql): a vertex
+     shared by two polygons stays identical in both, so integer
+     quantisation is exact.
+  2. Rings are cut into arcs at the junctions (points where two borders
+     meet or part), and identical arcs — in either direction — are merged.
+  3. Each arc is simplified once (Douglas-Peucker, end points kept): both
+     neighbours of a border get the same simplified line, so no slivers.
+  4. Arcs are delta-encoded integers (TopoJSON `transform`).
+
+Pure Python on purpose: runs at prebuild time for the static cache files,
+and on cache misses of the SQL tier (result kept in the response cache).
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+
+# Quantisation grid = simplification tolerance / QUANTUM_RATIO
+QUANTUM_RATIO = 4
+
+# The SQL tier encodes a topology in memory, in pure Python: beyond this many
+# features or vertices the request is refused (whole layers are served by
+# the static cache files)
+SQL_MAX_FEATURES = 2000
+SQL_MAX_VERTICES = 200_000
+
+
+class TopoJSONRenderer(JSONRenderer):
+    """
+    Makes DRF content negotiation accept ?format=topojson (and
+    Accept: application/topo+json). The layer views build the body
+    themselves; this renderer only serialises error payloads.
+    """
+    media_type = 'application/topo+json'
+    format = 'topojson'
+
+
+def wants_topojson(request):
+    """True when content negotiation selected TopoJSON."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'format', None) == TopoJSONRenderer.format
+
+
+def quantum_for(tolerance):
+    """Quantisation grid (degrees) used with a simplification tolerance."""
+    return float(tolerance) / QUANTUM_RATIO
+
+
+def geometry_sql(column, quantum):
+    """GeoJSON expression of `column` snapped to the quantisation grid."""
+    return (
+        f"ST_AsGeoJSON(ST_SnapToGrid("
+        f"ST_CollectionExtract(ST_MakeValid({column}), 3), {float(quantum)!r}"
+        f"), 9)::json"
+    )
+
+
+# ----------------------------------------------------------------------
+# Arcs
+# ----------------------------------------------------------------------
+def _quantise_ring(ring, x0, y0, quantum):
+    """Closed ring of integer points, or None if it collapsed on the grid."""
+    points = []
+    for x, y in ring:
+        point = (round((x - x0) / quantum), round((y - y0) / quantum))
+        if not points or point != points[-1]:
+            points.append(point)
+    if points and points[0] != points[-1]:
+        points.append(points[0])
+    return points if len(points) >= 4 else None
+
+
+def _junctions(rings):
+    """Points where rings meet or part: same point, different neighbours."""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring) - 1
+        for i in range(n):
+            prev, point, nxt = ring[i - 1 if i else n - 1], ring[i], ring[i + 1]
+            pair = (prev, nxt) if prev <= nxt else (nxt, prev)
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _cut(ring, junctions):
+    """Arcs of a closed ring, cut at its junctions."""
+    points = ring[:-1]
+    cuts = [i for i, point in enumerate(points) if point in junctions]
+    # No junction: one closed arc, rotated to a canonical start
+    start = cuts[0] if cuts else points.index(min(points))
+    points = points[start:] + points[:start]
+    points.append(points[0])
+    if not cuts:
+        return [points]
+    arcs, begin = [], 0
+    for i in range(1, len(points)):
+        if points[i] in junctions or i == len(points) - 1:
+            arcs.append(points[begin:i + 1])
+            begin = i
+    return arcs
+
+
+def _douglas_peucker(points, tolerance):
+    """Douglas-Peucker on integer points, end points always kept."""
+    if len(points) <= 2:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    limit = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        a, b = stack.pop()
+        (ax, ay), (bx, by) = points[a], points[b]
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+        best, far = -1, None
+        for i in range(a + 1, b):
+            px, py = points[i]
+            if length:
+                cross = dx * (py - ay) - dy * (px - ax)
+                distance = cross * cross / length
+            else:
+                distance = (px - ax) ** 2 + (py - ay) ** 2
+            if distance > best:
+                best, far = distance, i
+        if far is not None and best > limit:
+            keep[far] = True
+            stack.append((a, far))
+            stack.append((far, b))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _simplify_arc(arc, tolerance):
+    """Simplified arc; closed arcs are split at their farthest point first."""
+    if tolerance <= 0 or len(arc) <= 3:
+        return arc
+    if arc[0] != arc[-1]:
+        return _douglas_peucker(arc, tolerance)
+    x0, y0 = arc[0]
+    far = max(range(len(arc)), key=lambda i: (arc[i][0] - x0) ** 2 + (arc[i][1] - y0) ** 2)
+    simplified = (
+        _douglas_peucker(arc[:far + 1], tolerance)
+        + _douglas_peucker(arc[far:], tolerance)[1:]
+    )
+    # Never collapse a small island / hole into a line
+    return simplified if len(simplified) >= 4 else arc
+
+
+def _delta(arc):
+    """Delta-encoded arc (first point absolute)."""
+    encoded, px, py = [], 0, 0
+    for x, y in arc:
+        encoded.append([x - px, y - py])
+        px, py = x, y
+    return encoded
+
+
+# ----------------------------------------------------------------------
+# Encoder
+# ----------------------------------------------------------------------
+def _polygons(geometry):
+    """Polygons (lists of rings) of a GeoJSON Polygon / MultiPolygon."""
+    if not geometry:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def vertex_count(geometry):
+    """Number of points of a GeoJSON Polygon / MultiPolygon."""
+    return sum(len(ring) for polygon in _polygons(geometry) for ring in polygon)
+
+
+def encode(features, tolerance, name='features'):
+    """
+    Topology dict of GeoJSON features (dicts) whose geometries were snapped
+    with geometry_sql(column, quantum_for(tolerance)). Arcs are simplified
+    with `tolerance` (degrees).
+    """
+    features = list(features)
+    quantum = quantum_for(tolerance)
+
+    xs, ys = [], []
+    for feature in features:
+        for polygon in _polygons(feature.get('geometry')):
+            for ring in polygon:
+                xs.extend(x for x, _ in ring)
+                ys.extend(y for _, y in ring)
+    x0, y0 = (min(xs), min(ys)) if xs else (0.0, 0.0)
+    bbox = [x0, y0, max(xs), max(ys)] if xs else None
+    del xs, ys
+
+    # 1. Quantised rings: feature → polygons → ring numbers (None = collapsed)
+    rings, shapes = [], []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature.get('geometry')):
+            numbers = []
+            for ring in polygon:
+                points = _quantise_ring(ring, x0, y0, quantum)
+                if points is not None:
+                    numbers.append(len(rings))
+                    rings.append(points)
+                elif not numbers:
+                    break  # exterior ring collapsed: the whole polygon goes
+            if numbers:
+                polygons.append(numbers)
+        shapes.append(polygons)
+
+    # 2. Shared arcs
+    junctions = _junctions(rings)
+    arcs, index = [], {}
+
+    def arc_number(arc):
+        key = tuple(arc)
+        if key in index:
+            return index[key]
+        reverse = key[::-1]
+        if reverse in index:
+            return ~index[reverse]
+        index[key] = len(arcs)
+        arcs.append(arc)
+        return len(arcs) - 1
+
+    ring_arcs = [[arc_number(arc) for arc in _cut(ring, junctions)] for ring in rings]
+    del rings, index, junctions
+
+    # 3. Each shared arc simplified once
+    step = float(tolerance) / quantum if tolerance else 0
+    arcs = [_delta(_simplify_arc(arc, step)) for arc in arcs]
+
+    geometries = []
+    for feature, polygons in zip(features, shapes):
+        geometry = {'type': None}
+        if len(polygons) == 1:
+            geometry = {'type': 'Polygon', 'arcs': [ring_arcs[n] for n in polygons[0]]}
+        elif polygons:
+            geometry = {
+                'type': 'MultiPolygon',
+                'arcs': [[ring_arcs[n] for n in polygon] for polygon in polygons],
+            }
+        if feature.get('id') is not None:
+            geometry['id'] = feature['id']
+        geometry['properties'] = feature.get('properties') or {}
+        geometries.append(geometry)
+
+    topology = {
+        'type': 'Topology',
+        'transform': {'scale': [quantum, quantum], 'translate': [x0, y0]},
+        'objects': {name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+    if bbox:
+        topology['bbox'] = bbox
+    return topology
+
+
+def dumps(topology):
+    """Compact UTF-8 bytes of a topology."""
+    return json.dumps(topology, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,233 @@
+"""
+Land-cover transition matrices (table carbone_transitionoccupation).
+
+Comparing total areas per year (NLPEngine.build_deforestation) says how much
+forest disappeared, not what it became. The real answer is a geometric
+overlay: intersect the occupations of year A with those of year B and sum
+the intersection areas per (class in A, class in B) — the "from → to"
+matrix of each forest, for every pair of years in ANNEES_VALIDES.
+
+The raw polygons reach 800k vertices, so:
+  - the overlay runs on the subdivided pieces (subdivision.py, <= 256
+    vertices, GiST-indexed): each intersection test touches two small rings;
+  - it runs offline (`manage.py build_transitions`), one (forest, pair of
+    years) per task, on a process pool;
+  - a task is skipped when the md5 signature of the occupations it overlays
+    (ids + updated_at) did not change since it last ran. Signatures live in
+    carbone_calcultransition, one row per overlay: those that write no cell
+    (forest without occupations one of the years) are skipped too.
+
+Off-diagonal cells also keep the changed area as a MultiPolygon (optional):
+the losses / gains layer of GET /api/v1/occupations/changes/.
+"""
+import hashlib
+from itertools import combinations
+
+from django.db import connection, transaction
+
+from .constants import ANNEES_VALIDES
+from .subdivision import SUBDIVIDED_TABLE
+
+TRANSITIONS_TABLE = 'carbone_transitionoccupation'
+CALCULS_TABLE = 'carbone_calcultransition'
+
+# Direction of a change, from the carbon reference of the two classes
+# (cd: class of departure, cf: class of arrival)
+SENS_SQL = {
+    'perte': 'cf.stock_carbone_reference < cd.stock_carbone_reference',
+    'gain': 'cf.stock_carbone_reference > cd.stock_carbone_reference',
+}
+
+
+def year_pairs():
+    """Every (annee_debut, annee_fin) of ANNEES_VALIDES, earlier year first."""
+    return list(combinations(sorted(ANNEES_VALIDES), 2))
+
+
+# ----------------------------------------------------------------------
+# Signatures (skip unchanged overlays)
+# ----------------------------------------------------------------------
+def source_signatures():
+    """md5 of the (id, updated_at) of the occupations, per (foret_id, annee)."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT foret_id, annee,
+                   md5(string_agg(id::text || ':' || updated_at::text, ',' ORDER BY id))
+            FROM carbone_occupationsol
+            GROUP BY foret_id, annee;
+        """)
+        return {(foret_id, annee): sign for foret_id, annee, sign in cursor.fetchall()}
+
+
+def pair_signature(signatures, foret_id, annee_debut, annee_fin):
+    """Signature of the overlay of a forest between two years."""
+    payload = '|'.join([
+        signatures.get((foret_id, annee_debut), ''),
+        signatures.get((foret_id, annee_fin), ''),
+    ])
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def stored_signatures():
+    """Signature of the last overlay run, per (foret_id, annee_debut, annee_fin)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT foret_id, annee_debut, annee_fin, signature
+            FROM {CALCULS_TABLE};
+        """)
+        return {(f, a, b): sign for f, a, b, sign in cursor.fetchall()}
+
+
+# ----------------------------------------------------------------------
+# Overlay
+# ----------------------------------------------------------------------
+def overlay(foret_id, annee_debut, annee_fin, signature, geometries=True):
+    """
+    (Re)compute the transition rows of a forest between two years.
+    Returns the number of matrix cells written.
+    """
+    pieces = f"""
+        SELECT o.nomenclature_id AS classe, s.geom
+        FROM {SUBDIVIDED_TABLE} s
+        JOIN carbone_occupationsol o ON s.couche = 'occupation' AND s.objet_id = o.id
+        WHERE o.foret_id = %s AND o.annee = %s
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TRANSITIONS_TABLE} "
+            f"WHERE foret_id = %s AND annee_debut = %s AND annee_fin = %s;",
+            [foret_id, annee_debut, annee_fin],
+        )
+        cursor.execute(f"""
+            INSERT INTO {TRANSITIONS_TABLE}
+                (foret_id, annee_debut, annee_fin, classe_debut_id, classe_fin_id,
+                 superficie_ha, geom, signature, updated_at)
+            WITH debut AS ({pieces}), fin AS ({pieces}),
+            intersections AS (
+                SELECT d.classe AS classe_debut, f.classe AS classe_fin,
+                       ST_CollectionExtract(ST_Intersection(d.geom, f.geom), 3) AS geom
+                FROM debut d
+                JOIN fin f ON ST_Intersects(d.geom, f.geom)
+            )
+            SELECT %s, %s, %s, classe_debut, classe_fin,
+                   SUM(ST_Area(geom::geography)) / 10000.0,
+                   ST_Multi(ST_CollectionExtract(ST_Union(geom) FILTER (
+                       WHERE %s AND classe_debut <> classe_fin
+                   ), 3)),
+                   %s, NOW()
+            FROM intersections
+            WHERE NOT ST_IsEmpty(geom)
+            GROUP BY classe_debut, classe_fin;
+        """, [
+            foret_id, annee_debut, foret_id, annee_fin,
+            foret_id, annee_debut, annee_fin, bool(geometries), signature,
+        ])
+        cells = cursor.rowcount
+        # Recorded even when empty: the next run skips it while unchanged
+        cursor.execute(f"""
+            INSERT INTO {CALCULS_TABLE}
+                (foret_id, annee_debut, annee_fin, signature, cellules, updated_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (foret_id, annee_debut, annee_fin) DO UPDATE
+            SET signature = EXCLUDED.signature, cellules = EXCLUDED.cellules,
+                updated_at = EXCLUDED.updated_at;
+        """, [foret_id, annee_debut, annee_fin, signature, cells])
+        return cells
+
+
+def forget_obsolete(keys):
+    """Drop the rows (and signatures) of (foret_id, annee_debut, annee_fin) not in `keys`."""
+    keys = list(keys)
+    params = [[k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys]]
+    removed = 0
+    with connection.cursor() as cursor:
+        for table in (TRANSITIONS_TABLE, CALCULS_TABLE):
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE (foret_id, annee_debut, annee_fin) NOT IN (
+                    SELECT * FROM unnest(%s::bigint[], %s::smallint[], %s::smallint[])
+                );
+            """, params)
+            if table == TRANSITIONS_TABLE:
+                removed = cursor.rowcount
+    return removed
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+def matrix(annee_debut, annee_fin, forets=None):
+    """
+    "From → to" area matrix (ha) between two years, summed over `forets`
+    (codes; None: all). Rows: class in annee_debut, columns: class in
+    annee_fin, both in display order. None when never computed.
+    """
+    from django.db.models import Sum
+
+    from .models import NomenclatureCouvert, TransitionOccupation
+
+    cells = TransitionOccupation.objects.filter(annee_debut=annee_debut, annee_fin=annee_fin)
+    if forets:
+        cells = cells.filter(foret__code__in=[code.upper() for code in forets])
+    cells = list(cells.values('classe_debut_id', 'classe_fin_id').annotate(
+        total=Sum('superficie_ha'),
+    ))
+    if not cells:
+        return None
+
+    classes = list(NomenclatureCouvert.objects.order_by('ordre_affichage', 'code').values(
+        'id', 'code', 'libelle_fr', 'couleur_hex',
+    ))
+    position = {c['id']: i for i, c in enumerate(classes)}
+    values = [[0.0] * len(classes) for _ in classes]
+    for cell in cells:
+        values[position[cell['classe_debut_id']]][position[cell['classe_fin_id']]] = cell['total']
+
+    return {
+        'annee_debut': annee_debut,
+        'annee_fin': annee_fin,
+        'forets': forets,
+        'classes': [
+            {'code': c['code'], 'libelle': c['libelle_fr'], 'couleur': c['couleur_hex']}
+            for c in classes
+        ],
+        'superficie_ha': values,
+    }
+
+
+def changes_sql(geom_expression, sens=None):
+    """
+    One GeoJSON feature per changed cell (alias t). Parameters: annee_debut,
+    annee_fin, forest code (or None) twice. `sens`: 'perte' | 'gain' | None.
+    """
+    sens_filter = f"AND {SENS_SQL[sens]}" if sens else ''
+    return f"""
+        SELECT json_build_object(
+            'type', 'Feature',
+            'id', t.id,
+            'geometry', {geom_expression},
+            'properties', json_build_object(
+                'foret_code', fo.code,
+                'annee_debut', t.annee_debut,
+                'annee_fin', t.annee_fin,
+                'classe_debut', cd.code,
+                'classe_fin', cf.code,
+                'libelle_debut', cd.libelle_fr,
+                'libelle_fin', cf.libelle_fr,
+                'couleur', cf.couleur_hex,
+                'sens', CASE WHEN {SENS_SQL['perte']} THEN 'perte'
+                             WHEN {SENS_SQL['gain']} THEN 'gain'
+                             ELSE 'neutre' END,
+                'superficie_ha', ROUND(t.superficie_ha::numeric, 2)
+            )
+        )::text AS feat
+        FROM {TRANSITIONS_TABLE} t
+        JOIN carbone_foretclassee fo ON t.foret_id = fo.id
+        JOIN carbone_nomenclaturecouvert cd ON t.classe_debut_id = cd.id
+        JOIN carbone_nomenclaturecouvert cf ON t.classe_fin_id = cf.id
+        WHERE t.geom IS NOT NULL
+          AND t.annee_debut = %s AND t.annee_fin = %s
+          AND (%s::text IS NULL OR UPPER(fo.code) = UPPER(%s::text))
+          {sens_filter}
+        ORDER BY t.superficie_ha DESC
+    """
@@ -1,7 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
-from .views import stock_carbone_geojson
+from .views import (
+    stock_carbone_geojson, occupation_fgb, bulk_export, hexagon_grid, occupation_tile,
+    basemap_tile,
+)
 
 router = DefaultRouter()
 router.register(r'forets', views.ForetClasseeViewSet, basename='foretclassee')
@@ -13,4 +16,15 @@ router.register(r'nomenclatures', views.NomenclatureCouvertViewSet)
 
 urlpatterns = [
     path('stock-carbone/', stock_carbone_geojson, name='stock-carbone'),
+    path('fgb/<str:name>.fgb', occupation_fgb, name='occupation-fgb'),
+    path('exports/<str:layer>.parquet', bulk_export, name='bulk-export'),
+    path('hexagones/', hexagon_grid, name='hexagon-grid'),
+    path(
+        'tiles/occupation/<int:z>/<int:x>/<int:y>.pbf',
+        occupation_tile, name='occupation-tile',
+    ),
+    path(
+        'tiles/<int:annee>/<int:z>/<int:x>/<int:y>.pbf',
+        basemap_tile, name='basemap-tile',
+    ),
 ] + router.urls
@@ -6,27 +6,37 @@ Performance architecture (2 tiers):
   TIER 1 — Static GeoJSON cache (< 50ms response)
   Pre-generated files in media/geocache/ built by `manage.py prebuild_geojson`.
   Served as FileResponse with proper Content-Type and cache headers.
-  Used for standard year/forest combinations.
+  Used for standard year/forest combinations, one file per zoom band.
 
   TIER 2 — Dynamic SQL fallback (200-3000ms response)
   Raw PostGIS query with adaptive simplification.
-  Used when no cached file exists or for dynamic filters (bbox, zoom, type).
+  Used when no cached file exists or for dynamic filters (bbox, type).
   Features ST_MakeValid, adaptive tolerance, viewport bbox filtering.
+  With `zoom`, geometries pre-generalised for the zoom band are read from
+  carbone_geometriegeneralisee (no per-row simplification at request time).
+  Occupation responses are cached (gzip) per parameter set + data version
+  (apps/carbone/cache.py): an identical request skips PostGIS.
+  The occupation layer is streamed feature by feature (apps/carbone/geojson.py).
 """
 import os
+import gzip
 import json
+import re
+from contextlib import closing
 from django.db import connection
-from django.http import JsonResponse, FileResponse
-from django.conf import settings
-from django.utils.http import http_date
+from django.http import (
+    JsonResponse, FileResponse, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry
+from django.utils.http import http_date, parse_etags
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 
-GEOCACHE_DIR = os.path.join(settings.MEDIA_ROOT, 'geocache')
-
 from .models import (
     ZoneEtude, ForetClassee, NomenclatureCouvert,
     OccupationSol, Placette, Infrastructure,
@@ -38,61 +48,33 @@ from .serializers import (
     InfrastructureSerializer,
 )
 from .filters import OccupationSolFilter, PlacetteFilter, InfrastructureFilter, ZoneEtudeFilter
-
-
-# ================================================================
-# Adaptive simplification tolerance based on zoom level
-# ================================================================
-SIMPLIFY_TOLERANCE = {
-    # zoom_level: tolerance (degrees). Lower zoom = more aggressive simplification
-    # Optimized for heavy polygons (100K-800K vertices from Sentinel 2023 data)
-    'occupation': {
-        7: 0.01, 8: 0.005, 9: 0.003, 10: 0.002,
-        11: 0.001, 12: 0.0008, 13: 0.0005, 14: 0.0003,
-    },
-    'forets': {
-        7: 0.005, 8: 0.003, 9: 0.002, 10: 0.001,
-        11: 0.0005, 12: 0.0003, 13: 0.0002,
-    },
-    'zones': {
-        7: 0.005, 8: 0.003, 9: 0.002, 10: 0.001,
-        11: 0.0008, 12: 0.0005,
-    },
-}
-
-
-def _get_tolerance(layer_type, zoom):
-    """Return simplification tolerance for a given layer and zoom level."""
-    tolerances = SIMPLIFY_TOLERANCE.get(layer_type, {})
-    if zoom is None:
-        # Default fallback
-        defaults = {'occupation': 0.0008, 'forets': 0.0005, 'zones': 0.001}
-        return defaults.get(layer_type, 0.001)
-    zoom = int(zoom)
-    # Find closest zoom level (clamp to available range)
-    levels = sorted(tolerances.keys())
-    if not levels:
-        return 0.001
-    if zoom <= levels[0]:
-        return tolerances[levels[0]]
-    if zoom >= levels[-1]:
-        return tolerances[levels[-1]]
-    # Find nearest
-    for i, lvl in enumerate(levels):
-        if zoom <= lvl:
-            return tolerances[lvl]
-    return tolerances[levels[-1]]
+from . import (
+    cache as response_cache, compact as compact_encoding, cube, exports, geocache, hexagons,
+    subdivision, tiles, topojson, transitions,
+)
+from .generalisation import envelope_sql, geometry_sql
+from .subdivision import bbox_filter_sql
+from .geojson import feature_collection_chunks, iter_features
+from .simplification import get_tolerance, zoom_band
 
 
 # ================================================================
 # Helper: Execute raw SQL and return GeoJSON FeatureCollection
 # ================================================================
 def _raw_geojson(sql, params=None):
-    """Execute SQL that returns a single JSON column → return as JsonResponse."""
+    """
+    Execute SQL that returns a single JSON column → return it as the response.
+
+    Passthrough: the query casts its result to ::text, so the document built
+    by PostGIS is sent as-is — no decoding into Python dicts by psycopg2 and
+    no re-encoding by JsonResponse (two full passes over megabytes).
+    """
     with connection.cursor() as cursor:
         cursor.execute(sql, params or [])
         row = cursor.fetchone()
         if row and row[0]:
+            if isinstance(row[0], str):
+                return HttpResponse(row[0], content_type='application/json')
             return JsonResponse(row[0], safe=False, json_dumps_params={'ensure_ascii': False})
     # Empty result
     return JsonResponse({
@@ -101,6 +83,105 @@ def _raw_geojson(sql, params=None):
     })
 
 
+def _stream_geojson(sql, params=None, cache_key=None, members=None):
+    """
+    Execute SQL that returns ONE feature (JSON text) per row → stream the
+    FeatureCollection through a server-side cursor (StreamingHttpResponse).
+    With `cache_key`, the response is also stored in the response cache.
+    `members`: extra top-level members (compact dictionaries).
+    """
+    chunks = feature_collection_chunks(iter_features(sql, params), members=members)
+    if cache_key:
+        return response_cache.caching_stream(cache_key, chunks)
+    return StreamingHttpResponse(chunks, content_type='application/json')
+
+
+def _topology_response(request, key, sql, params, tolerance, name):
+    """
+    TopoJSON response of a one-feature-per-row query whose geometries come
+    from topojson.geometry_sql (shared arcs, see topojson.py). Encoding
+    needs every feature in memory: 400 beyond topojson.SQL_MAX_FEATURES
+    features or SQL_MAX_VERTICES vertices (checked while reading, before any
+    encoding), otherwise the result is kept in the response cache under `key`.
+    """
+    response = response_cache.cached_response(request, key)
+    if response is None:
+        features, vertices = [], 0
+        # Stops at the first row over a limit: close the cursor now, not at GC time
+        with closing(iter_features(sql, params)) as rows:
+            for row in rows:
+                feature = json.loads(row)
+                vertices += topojson.vertex_count(feature.get('geometry'))
+                features.append(feature)
+                if len(features) > topojson.SQL_MAX_FEATURES or (
+                    vertices > topojson.SQL_MAX_VERTICES
+                ):
+                    return Response(
+                        {'error': f'format=topojson : plus de {topojson.SQL_MAX_FEATURES} '
+                                  f'entites ou {topojson.SQL_MAX_VERTICES} sommets, restreindre '
+                                  f'avec bbox= ou foret_code= (ou utiliser GeoJSON)'},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+        body = topojson.dumps(topojson.encode(features, tolerance, name))
+        response_cache.put(key, gzip.compress(body, compresslevel=6), 'application/json')
+        response = response_cache.cached_response(request, key)
+        response['X-GeoCache'] = 'SQL'
+    return response
+
+
+# Layer viewsets also accept ?format=topojson (content negotiation)
+LAYER_RENDERERS = [*api_settings.DEFAULT_RENDERER_CLASSES, topojson.TopoJSONRenderer]
+
+
+# clip=1: polygons are cut to the bbox widened by this fraction of its size
+# (no visible seam when the map pans slightly)
+CLIP_MARGIN = 0.05
+
+
+# fields= : properties of an occupation feature, in output order → SQL
+OCCUPATION_PROPERTIES = {
+    'id': 'o.id',
+    'foret_code': 'f.code',
+    'foret_nom': 'f.nom',
+    'type_couvert': 'n.code',
+    'libelle': 'n.libelle_fr',
+    'couleur': 'n.couleur_hex',
+    'annee': 'o.annee',
+    'superficie_ha': 'ROUND(o.superficie_ha::numeric, 2)',
+    'stock_carbone_calcule': 'ROUND(o.stock_carbone_calcule::numeric, 2)',
+    'source_donnee': 'o.source_donnee',
+}
+
+# geometry= : what is sent in place of the full polygon
+GEOMETRY_MODES = ('full', 'none', 'centroid', 'bbox')
+
+
+def _parse_projection(request):
+    """
+    (fields, geometry) from ?fields=a,b&geometry=none|centroid|bbox.
+    fields is None for all properties. Raises ValueError on unknown names.
+    """
+    fields = None
+    raw = request.query_params.get('fields')
+    if raw:
+        fields = [f.strip() for f in raw.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in OCCUPATION_PROPERTIES]
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+    geometry = request.query_params.get('geometry') or 'full'
+    if geometry not in GEOMETRY_MODES:
+        raise ValueError(f"geometry doit valoir {'|'.join(GEOMETRY_MODES)}")
+    return fields, geometry
+
+
+def _clip_bbox(bbox):
+    """bbox widened by CLIP_MARGIN on every side."""
+    west, south, east, north = bbox
+    dx = (east - west) * CLIP_MARGIN
+    dy = (north - south) * CLIP_MARGIN
+    return west - dx, south - dy, east + dx, north + dy
+
+
 def _parse_bbox(bbox_str):
     """Parse 'west,south,east,north' string → tuple of 4 floats, or None."""
     if not bbox_str:
@@ -114,25 +195,68 @@ def _parse_bbox(bbox_str):
     return None
 
 
-def _serve_cached(filename):
+def _serve_cached(request, filename):
     """
-    Serve a pre-built GeoJSON file from media/geocache/ as FileResponse.
+    Serve a pre-built GeoJSON file of the live geocache generation
+    (media/geocache/CURRENT) as FileResponse.
     Returns None if file doesn't exist (caller should fall back to SQL).
 
     Caching strategy — freshness WITHOUT losing speed:
-      - Last-Modified is set from the file's mtime.
+      - ETag is the content hash recorded in geocache/manifest.json.
       - Cache-Control: no-cache forces the browser to revalidate each time.
-      - Combined with ConditionalGetMiddleware, an unchanged file returns a
-        tiny 304 (~10-30ms); a rebuilt file (new mtime) returns fresh 200 data.
-      This avoids the classic "stale data for 1h after a rebuild" trap while
-      keeping repeat loads fast.
+      - If-None-Match matching the manifest is answered with a 304 straight
+        away: the file is neither opened nor stat-ed. A rebuild producing
+        identical bytes keeps its ETag, so browser caches stay valid.
+      Files without a manifest entry (legacy cache) fall back to mtime
+      Last-Modified + ConditionalGetMiddleware.
+
+    Compression: the .br / .gz sibling written at build time is sent as-is
+    with Content-Encoding (GZipMiddleware then leaves the response alone).
     """
-    path = os.path.join(GEOCACHE_DIR, filename)
+    # File and manifest entry are read from the same generation
+    cache_dir = geocache.current_dir()
+    path = os.path.join(cache_dir, filename)
+
+    entry = geocache.manifest_entry(filename, cache_dir)
+    if entry:
+        encoding, suffix = geocache.entry_encoding(request, entry)
+        tag = geocache.etag(entry, encoding)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            tags = parse_etags(if_none_match)
+            if '*' in tags or tag in tags or f'W/{tag}' in tags:
+                response = HttpResponseNotModified()
+                response['ETag'] = tag
+                response['Vary'] = 'Accept-Encoding'
+                response['Cache-Control'] = 'no-cache'
+                response['X-GeoCache'] = 'HIT'
+                return response
+        try:
+            response = FileResponse(
+                open(path + suffix, 'rb'),
+                content_type='application/json',
+                filename=filename,
+            )
+        except OSError:
+            return None
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['ETag'] = tag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = 'no-cache'
+        response['X-GeoCache'] = 'HIT'
+        return response
+
     if os.path.isfile(path):
+        encoding, served_path = geocache.pick_encoding(request, path)
         response = FileResponse(
-            open(path, 'rb'),
+            open(served_path, 'rb'),
             content_type='application/json',
+            filename=filename,
         )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
         response['Last-Modified'] = http_date(os.path.getmtime(path))
         response['Cache-Control'] = 'no-cache'
         response['X-GeoCache'] = 'HIT'
@@ -140,6 +264,70 @@ def _serve_cached(filename):
     return None
 
 
+def _serve_cached_layer(request, stem, zoom=None):
+    """
+    Serve the cache file of a layer: the zoom-band variant matching `zoom`
+    (e.g. occupations_2023.z11.json) if it exists, else the base file.
+    """
+    band = zoom_band(zoom) if zoom else None
+    if band:
+        cached = _serve_cached(request, geocache.cache_filename(stem, band))
+        if cached:
+            return cached
+    return _serve_cached(request, geocache.cache_filename(stem))
+
+
+def _serve_projected_attrs(request, stem, fields, geometry):
+    """
+    TIER 1 of a projected request (fields= / geometry=none|centroid|bbox):
+    the `.attrs.json` sidecar of the cache file (properties + centroid +
+    bbox per feature, no polygon), projected in Python and kept in the
+    response cache. Returns None if the sidecar was not built.
+    """
+    filename = geocache.cache_filename(stem, 'attrs')
+    cache_dir = geocache.current_dir()
+    entry = geocache.manifest_entry(filename, cache_dir)
+    if not entry:
+        return None
+
+    key = response_cache.cache_key('occupations-attrs', {
+        'file': filename, 'sha256': entry['sha256'],
+        'fields': fields, 'geometry': geometry,
+    }, version=response_cache.request_version(request))
+    response = response_cache.cached_response(request, key)
+    if response is None:
+        try:
+            with open(os.path.join(cache_dir, filename), 'rb') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        features = []
+        for feat in sidecar.get('features', []):
+            props = feat['properties']
+            if fields:
+                props = {name: props.get(name) for name in fields}
+            geom = None
+            if geometry == 'centroid':
+                geom = feat['geometry']
+            elif geometry == 'bbox' and feat.get('bbox'):
+                # Same ring as ST_Envelope (SQL tier)
+                w, s, e, n = feat['bbox']
+                geom = {'type': 'Polygon', 'coordinates': [[[w, s], [w, n], [e, n], [e, s], [w, s]]]}
+            features.append({
+                'type': 'Feature', 'id': feat.get('id'),
+                'geometry': geom, 'properties': props,
+            })
+        body = json.dumps(
+            {'type': 'FeatureCollection', 'features': features},
+            ensure_ascii=False, separators=(',', ':'),
+        ).encode('utf-8')
+        response_cache.put(key, gzip.compress(body, compresslevel=6), 'application/json')
+        response = response_cache.cached_response(request, key)
+    response['X-GeoCache'] = 'HIT'
+    return response
+
+
 # ================================================================
 # Occupation du sol — THE heavy endpoint (thousands of polygons)
 # ================================================================
@@ -148,6 +336,7 @@ class OccupationSolViewSet(viewsets.ModelViewSet):
     filterset_class = OccupationSolFilter
     filter_backends = [DjangoFilterBackend]
     pagination_class = None
+    renderer_classes = LAYER_RENDERERS
 
     def get_queryset(self):
         return OccupationSol.objects.select_related('foret', 'nomenclature')
@@ -167,9 +356,28 @@ class OccupationSolViewSet(viewsets.ModelViewSet):
         Ultra-fast layer loading: static cache → SQL fallback.
 
         TIER 1: If a pre-built GeoJSON file exists for this year+forest,
-        serve it as a static file (< 50ms, gzipped by middleware).
-
-        TIER 2: Otherwise, run PostGIS query with adaptive simplification.
+        serve it as a static file (< 50ms, pre-compressed). With `zoom`,
+        the file simplified for that zoom band is preferred.
+
+        TIER 2: Otherwise, run PostGIS query with adaptive simplification,
+        streamed feature by feature. With bbox + snap=1, the bbox is snapped
+        to the tile grid of `zoom` and answered from per-cell caches. With
+        bbox + clip=1, polygons are cut to the bbox (+ margin) and flagged
+        `clipped` (not combined with snap: cells are shared by viewports).
+
+        Projection (both tiers): fields=a,b,c keeps only these properties,
+        geometry=none|centroid|bbox replaces the polygon (attributes-only
+        clients). TIER 1 answers them from the `.attrs.json` sidecar.
+
+        compact=1 (both tiers, not with fields= / geometry=): forest / cover
+        strings sent once in collection-level dictionaries, features carry
+        integer keys (see compact.py). TIER 1 serves the `.compact` files,
+        or the plain ones when no compact variant was built.
+
+        format=topojson (both tiers): TopoJSON with shared, once-simplified
+        arcs (see topojson.py). TIER 1 serves the `.topo` files; TIER 2
+        needs bbox= or a forest filter, is capped at topojson.SQL_MAX_FEATURES
+        and ignores snap= and clip= (a topology is encoded as a whole).
         """
         annee = request.query_params.get('annee')
         foret_code = request.query_params.get('foret_code')
@@ -177,76 +385,249 @@ class OccupationSolViewSet(viewsets.ModelViewSet):
         type_code = request.query_params.get('type')
         zoom = request.query_params.get('zoom')
         bbox = _parse_bbox(request.query_params.get('bbox'))
+        try:
+            fields, geometry = _parse_projection(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        projected = fields is not None or geometry != 'full'
+        compact = request.query_params.get('compact') in ('1', 'true')
+        if compact and projected:
+            # Attribute sidecars (TIER 1) are not dictionary-encoded: one URL,
+            # one payload shape whatever the cache state
+            return Response(
+                {'error': 'compact=1 ne se combine ni avec fields= ni avec geometry='},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        topo = topojson.wants_topojson(request)
+        if topo and (compact or geometry != 'full'):
+            return Response(
+                {'error': 'format=topojson ne se combine ni avec compact=1 ni avec geometry='},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # ── TIER 1: Try static cache (only for simple year/forest queries) ──
         if annee and not type_code and not bbox and not foret_id:
-            cache_name = f'occupations_{annee}'
+            stem = f'occupations_{annee}'
             if foret_code:
-                cache_name += f'_{foret_code.upper()}'
-            cache_name += '.json'
-            cached = _serve_cached(cache_name)
+                stem += f'_{foret_code.upper()}'
+            if projected:
+                # Sidecar has no polygons: fields= with full geometry → TIER 2
+                cached = None
+                if geometry != 'full':
+                    cached = _serve_projected_attrs(request, stem, fields, geometry)
+            elif topo:
+                cached = _serve_cached_layer(request, f'{stem}.topo', zoom)
+            else:
+                cached = None
+                if compact:
+                    cached = _serve_cached_layer(request, f'{stem}.compact', zoom)
+                if not cached:
+                    # No compact variant (e.g. committed cache): the plain file,
+                    # which clients read as-is (no dictionaries member)
+                    cached = _serve_cached_layer(request, stem, zoom)
             if cached:
                 return cached
 
         # ── TIER 2: Dynamic SQL fallback ──
-        tolerance = _get_tolerance('occupation', zoom)
+        tolerance = get_tolerance('occupation', zoom)
+        filters = {
+            'annee': int(annee) if annee else None,
+            'foret_code': foret_code.upper() if foret_code else None,
+            'foret': int(foret_id) if foret_id else None,
+            'type': type_code.upper() if type_code else None,
+        }
+        projection = {'fields': fields, 'geometry': geometry, 'compact': compact}
+        key_params = {
+            **filters,
+            **projection,
+            'tolerance': tolerance,
+            'band': zoom_band(zoom) if zoom else None,
+        }
+
+        if topo:
+            if not bbox and not filters['foret_code'] and not filters['foret']:
+                # A whole year is only served pre-built (TIER 1)
+                return Response(
+                    {'error': 'format=topojson hors cache statique : bbox= ou foret_code= requis'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            key = response_cache.cache_key('occupations-topo', {
+                **key_params,
+                'bbox': [round(v, 6) for v in bbox] if bbox else None,
+            }, version=response_cache.request_version(request))
+            sql, params, _ = self._features_sql(
+                filters, zoom, tolerance, bbox, projection=projection,
+                quantum=topojson.quantum_for(tolerance),
+                version=response_cache.request_version(request),
+            )
+            return _topology_response(request, key, sql, params, tolerance, 'occupations')
 
+        # snap=1: bbox snapped to the tile grid, answered from per-cell caches
+        if bbox and request.query_params.get('snap') in ('1', 'true'):
+            return self._snapped_list(
+                request, filters, key_params, zoom, tolerance, bbox, projection,
+            )
+
+        clip = None
+        if bbox and geometry == 'full' and request.query_params.get('clip') in ('1', 'true'):
+            clip = _clip_bbox(bbox)
+
+        # Same normalised parameters + same data version → cached response
+        key = response_cache.cache_key('occupations', {
+            **key_params,
+            'bbox': [round(v, 6) for v in bbox] if bbox else None,
+            'clip': bool(clip),
+        }, version=response_cache.request_version(request))
+        cached = response_cache.cached_response(request, key)
+        if cached:
+            return cached
+
+        sql, params, members = self._features_sql(
+            filters, zoom, tolerance, bbox, clip=clip, projection=projection,
+            version=response_cache.request_version(request),
+        )
+        return _stream_geojson(sql, params, cache_key=key, members=members)
+
+    def _features_sql(self, filters, zoom, tolerance, bbox=None, sort_keys=False,
+                      clip=None, projection=None, quantum=None, version=None):
+        """
+        (sql, params, members) returning one occupation feature (JSON text)
+        per row; `members` are the collection-level members (None, or the
+        dictionaries in compact mode).
+        `filters`: normalised annee / foret_code / foret / type.
+        With `sort_keys`, each row starts with (ordre_affichage, id).
+        With `clip` (a bbox), geometries are cut to it and the property
+        `clipped` tells whether a polygon extends beyond it.
+        `projection`: {'fields': [...] | None, 'geometry': GEOMETRY_MODES,
+        'compact': bool}.
+        With `quantum`, full geometries are the raw ones snapped to that grid
+        (TopoJSON input: simplified later, per shared arc).
+        `version`: data version read for the request (compact dictionaries).
+        """
+        fields = (projection or {}).get('fields') or list(OCCUPATION_PROPERTIES)
+        geometry = (projection or {}).get('geometry') or 'full'
+        compact = bool((projection or {}).get('compact'))
         conditions = []
         params = []
 
-        if annee:
+        if filters['annee']:
             conditions.append("o.annee = %s")
-            params.append(int(annee))
-        if foret_code:
+            params.append(filters['annee'])
+        if filters['foret_code']:
             conditions.append("UPPER(f.code) = UPPER(%s)")
-            params.append(foret_code)
-        if foret_id:
+            params.append(filters['foret_code'])
+        if filters['foret']:
             conditions.append("o.foret_id = %s")
-            params.append(int(foret_id))
-        if type_code:
+            params.append(filters['foret'])
+        if filters['type']:
             conditions.append("UPPER(n.code) = UPPER(%s)")
-            params.append(type_code)
+            params.append(filters['type'])
         if bbox:
-            conditions.append(
-                "o.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)"
-            )
-            params.extend(bbox)
+            # Small ST_Subdivide pieces, not the (huge) boxes of whole polygons
+            conditions.append(bbox_filter_sql('o', bbox))
 
         where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        if geometry == 'full' and quantum:
+            join, join_params = '', []
+            geom_json = topojson.geometry_sql('o.geom', quantum)
+        elif geometry == 'full':
+            join, geom, join_params = geometry_sql('occupation', 'o', zoom, tolerance, clip=clip)
+            geom_json = f"ST_AsGeoJSON({geom}, 4)::json"
+        else:
+            # No polygon at all: no join, no simplification
+            join, join_params = '', []
+            geom_json = {
+                'none': "NULL::json",
+                'centroid': "ST_AsGeoJSON(ST_Centroid(o.geom), 6)::json",
+                'bbox': "ST_AsGeoJSON(ST_Envelope(o.geom), 6)::json",
+            }[geometry]
+        keys = "n.ordre_affichage, o.id," if sort_keys else ""
+        members, property_params = None, []
+        if compact:
+            tables = compact_encoding.cached_dictionaries(version or response_cache.data_version())
+            members = compact_encoding.members(tables)
+            properties, property_params = compact_encoding.properties_sql(tables)
+        else:
+            properties = ",\n                ".join(
+                f"'{name}', {OCCUPATION_PROPERTIES[name]}" for name in fields
+            )
+        if clip:
+            # Bounding box not inside the clip box ⇔ the polygon was cut
+            properties += f",\n                'clipped', NOT (o.geom @ {envelope_sql(clip)})"
 
         sql = f"""
-        SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
-            SELECT json_build_object(
-                'type', 'Feature',
-                'id', o.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_SimplifyPreserveTopology(ST_MakeValid(o.geom), {tolerance}), 4
-                )::json,
-                'properties', json_build_object(
-                    'id', o.id,
-                    'foret_code', f.code,
-                    'foret_nom', f.nom,
-                    'type_couvert', n.code,
-                    'libelle', n.libelle_fr,
-                    'couleur', n.couleur_hex,
-                    'annee', o.annee,
-                    'superficie_ha', ROUND(o.superficie_ha::numeric, 2),
-                    'stock_carbone_calcule', ROUND(o.stock_carbone_calcule::numeric, 2),
-                    'source_donnee', o.source_donnee
-                )
-            ) AS feat
-            FROM carbone_occupationsol o
-            JOIN carbone_foretclassee f ON o.foret_id = f.id
-            JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
-            {where}
-            ORDER BY n.ordre_affichage, o.id
-        ) sub;
+        SELECT {keys} json_build_object(
+            'type', 'Feature',
+            'id', o.id,
+            'geometry', {geom_json},
+            'properties', json_build_object(
+                {properties}
+            )
+        )::text AS feat
+        FROM carbone_occupationsol o
+        JOIN carbone_foretclassee f ON o.foret_id = f.id
+        JOIN carbone_nomenclaturecouvert n ON o.nomenclature_id = n.id
+        {join}
+        {where}
+        ORDER BY n.ordre_affichage, o.id;
         """
-        return _raw_geojson(sql, params)
+        return sql, property_params + join_params + params, members
+
+    def _snapped_list(self, request, filters, key_params, zoom, tolerance, bbox, projection):
+        """
+        bbox snapped OUTWARD to the XYZ tile grid of `zoom` (tiles.snap_bbox).
+        Each grid cell is queried once and cached on its own; the response
+        merges the cells and de-duplicates features spanning several cells
+        by id. Two users looking at roughly the same area share every cell.
+        """
+        grid_z, cells, snapped = tiles.snap_bbox(bbox, zoom or 12)
+        key = response_cache.cache_key('occupations', {
+            **key_params, 'cells': [grid_z, cells[0], cells[-1]],
+        }, version=response_cache.request_version(request))
+        response = response_cache.cached_response(request, key)
+
+        if response is None:
+            members = None
+            features = {}
+            for x, y in cells:
+                cell_key = response_cache.cache_key('occupations-cell', {
+                    **key_params, 'cell': [grid_z, x, y],
+                }, version=response_cache.request_version(request))
+                cell = response_cache.get(cell_key)
+                if cell is not None:
+                    rows = json.loads(gzip.decompress(cell[0]))
+                else:
+                    sql, params, members = self._features_sql(
+                        filters, zoom, tolerance, tiles.tile_bounds(grid_z, x, y),
+                        sort_keys=True, projection=projection,
+                        version=response_cache.request_version(request),
+                    )
+                    with connection.cursor() as cursor:
+                        cursor.execute(sql, params)
+                        rows = cursor.fetchall()
+                    response_cache.put(
+                        cell_key,
+                        gzip.compress(json.dumps(rows).encode('utf-8'), compresslevel=6),
+                        'application/json',
+                    )
+                for ordre, fid, feature in rows:
+                    features[fid] = (ordre, fid, feature)
+
+            if members is None and projection.get('compact'):
+                # Every cell came from the cache: same keys, current tables
+                members = compact_encoding.members(
+                    compact_encoding.cached_dictionaries(response_cache.request_version(request))
+                )
+            body = b''.join(feature_collection_chunks(
+                (feature for _, _, feature in sorted(features.values())),
+                members=members,
+            ))
+            response_cache.put(key, gzip.compress(body, compresslevel=6), 'application/json')
+            response = response_cache.cached_response(request, key)
+            response['X-GeoCache'] = 'SQL-SNAP'
+
+        response['X-Snapped-Bbox'] = ','.join(f'{v:.6f}' for v in snapped)
+        return response
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -254,34 +635,21 @@ class OccupationSolViewSet(viewsets.ModelViewSet):
         annee = request.query_params.get('annee')
         foret_code = request.query_params.get('foret')
 
-        qs = OccupationSol.objects.all()
-        if annee:
-            qs = qs.filter(annee=int(annee))
-        if foret_code:
-            qs = qs.filter(foret__code__iexact=foret_code)
-
-        stats = qs.values(
-            'nomenclature__code',
-            'nomenclature__libelle_fr',
-            'nomenclature__couleur_hex',
-        ).annotate(
-            total_superficie_ha=Sum('superficie_ha'),
-            total_carbone=Sum('stock_carbone_calcule'),
-            nombre_polygones=Count('id'),
-        ).order_by('nomenclature__ordre_affichage')
-
-        totaux = qs.aggregate(
-            superficie_totale=Sum('superficie_ha'),
-            carbone_total=Sum('stock_carbone_calcule'),
+        # Statistics cube (cube.py): slices in memory, no database round-trip
+        stats_cube = cube.get()
+        selection = stats_cube.select(
+            years=[annee] if annee else None,
+            forets=[foret_code] if foret_code else None,
         )
+        totaux = stats_cube.totals(selection)
 
         return Response({
             'annee': annee,
             'foret': foret_code,
-            'resultats': list(stats),
+            'resultats': stats_cube.by_class(selection),
             'totaux': {
-                'superficie_ha': totaux['superficie_totale'] or 0,
-                'carbone_tco2': totaux['carbone_total'] or 0,
+                'superficie_ha': totaux['superficie'],
+                'carbone_tco2': totaux['carbone'],
             },
         })
 
@@ -298,25 +666,179 @@ class OccupationSolViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        stats_cube = cube.get()
+        fields = {'superficie_ha': 'superficie', 'carbone': 'carbone'}
+
         def get_stats(annee):
-            return OccupationSol.objects.filter(
-                foret__code__iexact=foret_code,
-                annee=int(annee),
-            ).values(
-                'nomenclature__code',
-                'nomenclature__libelle_fr',
-                'nomenclature__couleur_hex',
-            ).annotate(
-                superficie_ha=Sum('superficie_ha'),
-                carbone=Sum('stock_carbone_calcule'),
-            ).order_by('nomenclature__ordre_affichage')
+            selection = stats_cube.select(years=[annee], forets=[foret_code])
+            return stats_cube.by_class(selection, fields=fields)
 
         return Response({
             'foret': foret_code,
-            'annee1': {'annee': annee1, 'data': list(get_stats(annee1))},
-            'annee2': {'annee': annee2, 'data': list(get_stats(annee2))},
+            'annee1': {'annee': annee1, 'data': get_stats(annee1)},
+            'annee2': {'annee': annee2, 'data': get_stats(annee2)},
         })
 
+    @action(detail=False, methods=['get'])
+    def matrix(self, request):
+        """
+        Matrice de la mesure `measure` (superficie | carbone | polygones),
+        lignes `rows` × colonnes `cols` parmi annee / foret / type.
+        Filtres optionnels, listes separees par des virgules :
+        annee=2000,2023  foret=TENE,DOKA  type=FORET_DENSE,...
+        """
+        params = request.query_params
+        measure = params.get('measure', 'superficie')
+        rows = params.get('rows', 'annee')
+        cols = params.get('cols', 'type')
+        if measure not in cube.MEASURES or rows not in cube.AXES or cols not in cube.AXES or rows == cols:
+            return Response(
+                {'error': (
+                    f"measure parmi {', '.join(cube.MEASURES)} ; rows et cols "
+                    f"differents parmi {', '.join(cube.AXES)}"
+                )},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def listed(name):
+            value = params.get(name)
+            return [v for v in value.split(',') if v.strip()] if value else None
+
+        try:
+            years = listed('annee')
+            years = [int(v) for v in years] if years else None
+        except ValueError:
+            return Response({'error': 'annee invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats_cube = cube.get()
+        selection = stats_cube.select(years=years, forets=listed('foret'), types=listed('type'))
+        return Response(stats_cube.matrix(measure, rows, cols, selection))
+
+    @action(detail=False, methods=['post'], url_path='zonal-stats')
+    def zonal_stats(self, request):
+        """
+        Statistiques d'un polygone dessine par l'utilisateur (concession...) :
+        superficie et stock de carbone intersectes, par annee et type de
+        couvert (et par foret avec par_foret=true).
+        Corps JSON : une geometrie GeoJSON Polygon / MultiPolygon, une
+        Feature, ou {"geometry": ..., "annees": [2003, 2023], "par_foret": true}.
+        """
+        body = request.data if isinstance(request.data, dict) else {}
+        geometry = body.get('geometry', body)
+        if isinstance(geometry, dict) and geometry.get('type') == 'Feature':
+            geometry = geometry.get('geometry')
+        try:
+            geom = GEOSGeometry(json.dumps(geometry), srid=4326)
+        except (TypeError, ValueError, GEOSException, GDALException):
+            geom = None
+        if geom is None or geom.geom_type not in ('Polygon', 'MultiPolygon') or geom.empty:
+            return Response(
+                {'error': 'Corps attendu : geometrie GeoJSON Polygon ou MultiPolygon (EPSG:4326)'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        annees = body.get('annees')
+        if annees is not None:
+            try:
+                annees = [int(a) for a in (annees if isinstance(annees, list) else [annees])]
+            except (TypeError, ValueError):
+                return Response({'error': 'annees invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        par_foret = body.get('par_foret') in (True, 1, '1', 'true')
+
+        zone_ha, rows = subdivision.zonal_stats(geom, annees=annees, per_forest=par_foret)
+
+        resultats, totaux = [], {}
+        for annee, foret_code, code, libelle, couleur, superficie, carbone in rows:
+            row = {'annee': annee}
+            if par_foret:
+                row['foret'] = foret_code
+            row.update({
+                'nomenclature__code': code,
+                'nomenclature__libelle_fr': libelle,
+                'nomenclature__couleur_hex': couleur,
+                'superficie_ha': round(superficie, 4),
+                'carbone_tco2': round(carbone, 2),
+            })
+            resultats.append(row)
+            total = totaux.setdefault(str(annee), {'superficie_ha': 0.0, 'carbone_tco2': 0.0})
+            total['superficie_ha'] += superficie
+            total['carbone_tco2'] += carbone
+        for total in totaux.values():
+            total['superficie_ha'] = round(total['superficie_ha'], 4)
+            total['carbone_tco2'] = round(total['carbone_tco2'], 2)
+
+        return Response({
+            'superficie_zone_ha': round(zone_ha, 4),
+            'resultats': resultats,
+            'totaux': totaux,
+        })
+
+    def _year_pair(self, request):
+        """(annee1, annee2) of the query, or an error Response."""
+        try:
+            annee1 = int(request.query_params.get('annee1', ''))
+            annee2 = int(request.query_params.get('annee2', ''))
+        except ValueError:
+            annee1 = annee2 = None
+        if (annee1, annee2) not in transitions.year_pairs():
+            pairs = ', '.join(f'{a}/{b}' for a, b in transitions.year_pairs())
+            return None, Response(
+                {'error': f'Parametres requis: annee1, annee2 parmi {pairs}'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return (annee1, annee2), None
+
+    @action(detail=False, methods=['get'])
+    def transitions(self, request):
+        """
+        Matrice de transition "type en annee1 → type en annee2" (ha), issue de
+        la superposition des polygones (commande build_transitions).
+        Parametres : annee1, annee2, foret (optionnel, codes separes par des virgules).
+        """
+        pair, error = self._year_pair(request)
+        if error:
+            return error
+        foret = request.query_params.get('foret')
+        forets = [code for code in foret.split(',') if code.strip()] if foret else None
+        result = transitions.matrix(*pair, forets=forets)
+        if result is None:
+            return Response(
+                {'error': 'Matrice non calculee. Lancer : manage.py build_transitions'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(result)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Couche des changements (GeoJSON) entre annee1 et annee2 : une entite
+        par transition d'un type vers un autre et par foret.
+        Parametres : annee1, annee2, foret, sens=perte|gain, zoom.
+        """
+        pair, error = self._year_pair(request)
+        if error:
+            return error
+        foret = request.query_params.get('foret') or None
+        sens = request.query_params.get('sens') or None
+        if sens and sens not in transitions.SENS_SQL:
+            return Response(
+                {'error': f"sens parmi {', '.join(transitions.SENS_SQL)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tolerance = get_tolerance('occupation', request.query_params.get('zoom'))
+
+        key = response_cache.cache_key('occupations-changes', {
+            'annees': pair, 'foret': foret.upper() if foret else None,
+            'sens': sens, 'tolerance': tolerance,
+        }, version=response_cache.request_version(request))
+        cached = response_cache.cached_response(request, key)
+        if cached:
+            return cached
+
+        geom = f"ST_AsGeoJSON(ST_SimplifyPreserveTopology(t.geom, {float(tolerance)!r}), 6)::json"
+        sql = transitions.changes_sql(geom, sens)
+        return _stream_geojson(sql, [*pair, foret, foret], cache_key=key)
+
 
 # ================================================================
 # Forêts classées — 6 records only, but geometries can be complex
@@ -325,30 +847,32 @@ class ForetClasseeViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ForetClassee.objects.all()
     serializer_class = ForetClasseeSerializer
     pagination_class = None
+    renderer_classes = LAYER_RENDERERS
 
     def list(self, request, *args, **kwargs):
-        """Forest boundaries: static cache → SQL fallback."""
-        # TIER 1: Try cache
-        cached = _serve_cached('forets.json')
+        """Forest boundaries: static cache → SQL fallback (format=topojson: TopoJSON)."""
+        zoom = request.query_params.get('zoom')
+        topo = topojson.wants_topojson(request)
+
+        # TIER 1: Try cache (zoom band first)
+        cached = _serve_cached_layer(request, 'forets.topo' if topo else 'forets', zoom)
         if cached:
             return cached
 
         # TIER 2: Dynamic SQL
-        zoom = request.query_params.get('zoom')
-        tolerance = _get_tolerance('forets', zoom)
-
-        sql = f"""
-        SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
+        tolerance = get_tolerance('forets', zoom)
+        if topo:
+            join, join_params = '', []
+            geom_json = topojson.geometry_sql('f.geom', topojson.quantum_for(tolerance))
+        else:
+            join, geom, join_params = geometry_sql('forets', 'f', zoom, tolerance)
+            geom_json = f"ST_AsGeoJSON({geom}, 4)::json"
+
+        features_sql = f"""
             SELECT json_build_object(
                 'type', 'Feature',
                 'id', f.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_SimplifyPreserveTopology(ST_MakeValid(f.geom), {tolerance}), 4
-                )::json,
+                'geometry', {geom_json},
                 'properties', json_build_object(
                     'id', f.id,
                     'code', f.code,
@@ -359,10 +883,27 @@ class ForetClasseeViewSet(viewsets.ReadOnlyModelViewSet):
                 )
             ) AS feat
             FROM carbone_foretclassee f
+            {join}
             ORDER BY f.code
-        ) sub;
         """
-        return _raw_geojson(sql)
+        if topo:
+            key = response_cache.cache_key(
+                'forets-topo', {'tolerance': tolerance},
+                version=response_cache.request_version(request),
+            )
+            return _topology_response(
+                request, key, f"SELECT feat::text FROM ({features_sql}) sub;", join_params,
+                tolerance, 'forets',
+            )
+
+        sql = f"""
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(feat), '[]'::json)
+        )::text
+        FROM ({features_sql}) sub;
+        """
+        return _raw_geojson(sql, join_params)
 
     @action(detail=False, methods=['get'])
     def liste(self, request):
@@ -380,23 +921,25 @@ class ZoneEtudeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ZoneEtudeSerializer
     filterset_class = ZoneEtudeFilter
     pagination_class = None
+    renderer_classes = LAYER_RENDERERS
 
     def list(self, request, *args, **kwargs):
         """
-        Admin boundaries: static cache → SQL fallback.
+        Admin boundaries: static cache → SQL fallback (format=topojson: TopoJSON).
         Auto-generates Oumé department boundary if missing.
         """
         type_zone = request.query_params.get('type')
         niveau = request.query_params.get('niveau')
         zoom = request.query_params.get('zoom')
-        tolerance = _get_tolerance('zones', zoom)
+        tolerance = get_tolerance('zones', zoom)
+        topo = topojson.wants_topojson(request)
 
         # Auto-generate Oumé department boundary if missing
         self._ensure_department_boundary()
 
         # TIER 1: Try cache (only for unfiltered requests)
         if not type_zone and not niveau:
-            cached = _serve_cached('zones.json')
+            cached = _serve_cached_layer(request, 'zones.topo' if topo else 'zones', zoom)
             if cached:
                 return cached
 
@@ -411,19 +954,18 @@ class ZoneEtudeViewSet(viewsets.ReadOnlyModelViewSet):
             params.append(int(niveau))
 
         where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
-
-        sql = f"""
-        SELECT json_build_object(
-            'type', 'FeatureCollection',
-            'features', COALESCE(json_agg(feat), '[]'::json)
-        )
-        FROM (
+        if topo:
+            join, join_params = '', []
+            geom_json = topojson.geometry_sql('z.geom', topojson.quantum_for(tolerance))
+        else:
+            join, geom, join_params = geometry_sql('zones', 'z', zoom, tolerance)
+            geom_json = f"ST_AsGeoJSON({geom}, 4)::json"
+
+        features_sql = f"""
             SELECT json_build_object(
                 'type', 'Feature',
                 'id', z.id,
-                'geometry', ST_AsGeoJSON(
-                    ST_SimplifyPreserveTopology(ST_MakeValid(z.geom), {tolerance}), 4
-                )::json,
+                'geometry', {geom_json},
                 'properties', json_build_object(
                     'id', z.id,
                     'nom', z.nom,
@@ -432,11 +974,27 @@ class ZoneEtudeViewSet(viewsets.ReadOnlyModelViewSet):
                 )
             ) AS feat
             FROM carbone_zoneetude z
+            {join}
             {where}
             ORDER BY z.niveau, z.nom
-        ) sub;
         """
-        return _raw_geojson(sql, params)
+        if topo:
+            key = response_cache.cache_key('zones-topo', {
+                'tolerance': tolerance, 'type': type_zone, 'niveau': niveau,
+            }, version=response_cache.request_version(request))
+            return _topology_response(
+                request, key, f"SELECT feat::text FROM ({features_sql}) sub;",
+                join_params + params, tolerance, 'zones',
+            )
+
+        sql = f"""
+        SELECT json_build_object(
+            'type', 'FeatureCollection',
+            'features', COALESCE(json_agg(feat), '[]'::json)
+        )::text
+        FROM ({features_sql}) sub;
+        """
+        return _raw_geojson(sql, join_params + params)
 
     def _ensure_department_boundary(self):
         """
@@ -473,6 +1031,9 @@ class ZoneEtudeViewSet(viewsets.ReadOnlyModelViewSet):
                         WHERE type_zone = 'DEPARTEMENT'
                     );
                 """)
+                if cursor.rowcount:
+                    # Raw insert: signals do not see it
+                    response_cache.bump_data_version()
         except Exception:
             pass
 
@@ -502,7 +1063,7 @@ class InfrastructureViewSet(viewsets.ReadOnlyModelViewSet):
         SELECT json_build_object(
             'type', 'FeatureCollection',
             'features', COALESCE(json_agg(feat), '[]'::json)
-        )
+        )::text
         FROM (
             SELECT json_build_object(
                 'type', 'Feature',
@@ -542,7 +1103,7 @@ def stock_carbone_geojson(request):
     TIER 1 only: static file from geocache (no SQL fallback needed,
     since data comes from external shapefile, not the database).
     """
-    cached = _serve_cached('stock_carbone.json')
+    cached = _serve_cached(request, 'stock_carbone.json')
     if cached:
         return cached
     return JsonResponse(
@@ -551,6 +1112,245 @@ def stock_carbone_geojson(request):
     )
 
 
+# ================================================================
+# Hexagon grid — per-cell stats for overview zooms
+# ================================================================
+def hexagon_grid(request):
+    """
+    GET /api/v1/hexagones/?taille=2000
+
+    Hexagonal grid over the department (hexagons.py): per year, area by
+    cover class, carbon and forest area of each cell, plus the change
+    between years. TIER 1 only (404 until built by prebuild_geojson).
+    """
+    try:
+        size = int(request.GET.get('taille', hexagons.DEFAULT_SIZE))
+    except ValueError:
+        size = None
+    if size not in hexagons.HEX_SIZES:
+        return JsonResponse(
+            {'error': f"taille parmi {', '.join(map(str, hexagons.HEX_SIZES))} (m)"},
+            status=400,
+        )
+
+    filename = geocache.cache_filename(hexagons.cache_stem(size))
+    cached = _serve_cached(request, filename)
+    if cached:
+        return cached
+    return JsonResponse(
+        {'error': f'{filename} absent. Run: manage.py prebuild_geojson'},
+        status=404,
+    )
+
+
+# ================================================================
+# FlatGeobuf — spatially indexed files read by byte ranges
+# ================================================================
+FGB_CONTENT_TYPE = 'application/vnd.flatgeobuf'
+
+# occupations_2023, occupations_2023_TENE, occupations_2023_ZOUEKE_1 (files of prebuild_geojson)
+FGB_NAME_RE = re.compile(r'^occupations_\d{4}(_[A-Za-z0-9_-]+)?$')
+
+# Single byte range: bytes=a-b, bytes=a-, bytes=-n
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_UNSATISFIABLE = 'unsatisfiable'
+
+
+def _parse_range(header, size):
+    """
+    (start, end) of a single `bytes=first-last` / `bytes=-suffix` range over
+    a file of `size` bytes. None when the header is absent, malformed,
+    multi-range or invalid (last < first): ignored, whole file (RFC 9110
+    §14.2). RANGE_UNSATISFIABLE when valid but starting beyond the end (416).
+    """
+    match = RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            return RANGE_UNSATISFIABLE
+        return start, min(int(last), size - 1) if last else size - 1
+    suffix = int(last)
+    if suffix == 0 or size == 0:
+        return RANGE_UNSATISFIABLE
+    return max(0, size - suffix), size - 1
+
+
+def _range_response(request, path, content_type, tag=None):
+    """
+    File response honouring a single `Range: bytes=...` (206 / 416, see
+    _parse_range) and If-Range; other requests get the whole file. Sent
+    with Accept-Ranges, which also keeps GZipMiddleware away
+    (RangeAwareGZipMiddleware): offsets address the identity bytes.
+    """
+    size = os.path.getsize(path)
+    byte_range = _parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range naming another version → whole file (RFC 9110 §13.1.5)
+    if if_range and if_range != tag:
+        byte_range = None
+    if byte_range == RANGE_UNSATISFIABLE:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range:
+        start, end = byte_range
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start + 1)
+        response = HttpResponse(data, status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    if tag:
+        response['ETag'] = tag
+    return response
+
+
+def occupation_fgb(request, name):
+    """
+    GET /api/v1/fgb/{name}.fgb   (occupations_2023, occupations_2023_TENE)
+
+    FlatGeobuf file of the live geocache generation, with its packed Hilbert
+    R-tree, built by `manage.py prebuild_geojson`. A single `Range` is
+    answered with 206: a FlatGeobuf client reads the header and the index,
+    then only the features of its viewport — spatial filtering without any
+    query. TIER 1 only (404 until built).
+    """
+    if not FGB_NAME_RE.match(name):
+        return JsonResponse({'error': f'Fichier inconnu: {name}.fgb'}, status=404)
+
+    filename = geocache.cache_filename(name, ext='fgb')
+    cache_dir = geocache.current_dir()
+    path = os.path.join(cache_dir, filename)
+    if not os.path.isfile(path):
+        return JsonResponse(
+            {'error': f'{filename} absent. Run: manage.py prebuild_geojson --with fgb'},
+            status=404,
+        )
+    entry = geocache.manifest_entry(filename, cache_dir)
+    response = _range_response(
+        request, path, FGB_CONTENT_TYPE, tag=geocache.etag(entry) if entry else None,
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-GeoCache'] = 'HIT'
+    return response
+
+
+# ================================================================
+# Bulk exports — GeoParquet for analysts (apps/carbone/exports.py)
+# ================================================================
+def bulk_export(request, layer):
+    """
+    GET /api/v1/exports/{occupations|placettes|infrastructures}.parquet
+
+    GeoParquet export (typed columns, WKB geometry) with the filters of the
+    layer's FilterSet (annee, foret, foret_code, type...). Built in the
+    background and cached per data version: 202 + Retry-After while it is
+    being built, then the file (byte ranges supported, for remote readers).
+    """
+    if layer not in exports.LAYERS:
+        return JsonResponse({'error': f'Export inconnu: {layer}'}, status=404)
+    filters = exports.filterset(layer, request.GET)
+    if not filters.is_valid():
+        return JsonResponse({'error': filters.errors}, status=400)
+
+    state, path = exports.request_export(layer, request.GET)
+    if state == 'pending':
+        response = JsonResponse({'status': 'pending', 'layer': layer}, status=202)
+        response['Retry-After'] = '5'
+        return response
+
+    response = _range_response(
+        request, path, exports.CONTENT_TYPE,
+        tag=f'"{os.path.splitext(os.path.basename(path))[0]}"',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{layer}.parquet"'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# ================================================================
+# Vector tiles — occupation layer clipped to the viewport
+# ================================================================
+def occupation_tile(request, z, x, y):
+    """
+    GET /api/v1/tiles/occupation/{z}/{x}/{y}.pbf
+
+    Mapbox Vector Tile of the occupation layer (source-layer 'occupation').
+    Accepts the same filters as OccupationSolViewSet.list: annee, foret_code, type.
+    Only the polygons touching the tile are read, clipped and quantised.
+    """
+    if not tiles.valid_tile(z, x, y):
+        return JsonResponse({'error': f'Tuile invalide: {z}/{x}/{y}'}, status=400)
+
+    annee = request.GET.get('annee')
+    if annee and not annee.isdigit():
+        return JsonResponse({'error': 'Parametre annee invalide'}, status=400)
+
+    sql, params = tiles.occupation_layer_sql(
+        annee=annee,
+        foret_code=request.GET.get('foret_code'),
+        type_code=request.GET.get('type'),
+    )
+    data = tiles.render_tile(sql, params, z, x, y)
+
+    # Empty tile: 204 lets MapLibre skip it without a decode error
+    if not data:
+        response = HttpResponse(status=204)
+    else:
+        response = HttpResponse(data, content_type=tiles.MVT_CONTENT_TYPE)
+    response['Cache-Control'] = 'public, max-age=300'
+    response['X-GeoCache'] = 'SQL'
+    return response
+
+
+def basemap_tile(request, annee, z, x, y):
+    """
+    GET /api/v1/tiles/{annee}/{z}/{x}/{y}.pbf
+
+    Yearly basemap tile (source-layers: zones, forets, occupation).
+
+    TIER 1: read from media/geocache/tiles/carte_{annee}.mbtiles, built by
+    `manage.py prebuild_tiles` — no database hit.
+    TIER 2: no archive yet, or a zoom outside its pyramid → the same tile
+    rendered by PostGIS.
+    """
+    if not tiles.valid_tile(z, x, y):
+        return JsonResponse({'error': f'Tuile invalide: {z}/{x}/{y}'}, status=400)
+
+    data = tiles.read_tile(tiles.archive_path(annee), z, x, y)
+    if data is not None:
+        if not data:
+            response = HttpResponse(status=204)
+        else:
+            accepts_gzip = 'gzip' in geocache.accepted_encodings(request)
+            response = HttpResponse(
+                data if accepts_gzip else gzip.decompress(data),
+                content_type=tiles.MVT_CONTENT_TYPE,
+            )
+            if accepts_gzip:
+                response['Content-Encoding'] = 'gzip'
+            response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = 'public, max-age=3600'
+        response['X-GeoCache'] = 'HIT'
+        return response
+
+    sql, params = tiles.archive_tile_sql(annee)
+    data = tiles.render_tile(sql, params, z, x, y)
+    response = HttpResponse(data, content_type=tiles.MVT_CONTENT_TYPE) if data \
+        else HttpResponse(status=204)
+    response['Cache-Control'] = 'public, max-age=300'
+    response['X-GeoCache'] = 'SQL'
+    return response
+
+
 class NomenclatureCouvertViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = NomenclatureCouvert.objects.all()
     serializer_class = NomenclatureCouvertSerializer
@@ -10,6 +10,8 @@ from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
 
 from .models import ImportSession
 from apps.carbone.models import OccupationSol, ForetClassee, NomenclatureCouvert
+from apps.carbone import signals
+from apps.carbone.subdivision import forets_intersecting
 
 
 class ImportUploadView(APIView):
@@ -134,40 +136,44 @@ class ImportExecuteView(APIView):
                 imported = 0
                 errors = 0
 
-                for _, row in gdf.iterrows():
-                    try:
-                        geom = GEOSGeometry(row.geometry.wkt, srid=4326)
-                        if geom.geom_type == 'Polygon':
-                            geom = MultiPolygon(geom)
-
-                        # Determine foret from spatial intersection if not specified
-                        target_foret = foret
-                        if not target_foret:
-                            target_foret = ForetClassee.objects.filter(
-                                geom__intersects=geom
-                            ).first()
-
-                        if not target_foret:
+                # Geometries / statistics of the imported rows and data version
+                # refreshed once at the end (this request only)
+                with signals.deferred():
+                    for _, row in gdf.iterrows():
+                        try:
+                            geom = GEOSGeometry(row.geometry.wkt, srid=4326)
+                            if geom.geom_type == 'Polygon':
+                                geom = MultiPolygon(geom)
+
+                            # Determine foret from spatial intersection if not specified
+                            # (on the ST_Subdivide pieces, not the whole forest polygons)
+                            target_foret = foret
+                            if not target_foret:
+                                target_foret = ForetClassee.objects.filter(
+                                    id__in=forets_intersecting(geom)
+                                ).first()
+
+                            if not target_foret:
+                                errors += 1
+                                continue
+
+                            occ = OccupationSol(
+                                foret=target_foret,
+                                nomenclature=nomenclature,
+                                annee=int(annee) if annee else 2023,
+                                geom=geom,
+                            )
+
+                            # Map columns from shapefile
+                            for shp_col, model_field in mapping.items():
+                                if hasattr(occ, model_field) and shp_col in row.index:
+                                    setattr(occ, model_field, row[shp_col])
+
+                            occ.save()
+                            imported += 1
+
+                        except Exception as e:
                             errors += 1
-                            continue
-
-                        occ = OccupationSol(
-                            foret=target_foret,
-                            nomenclature=nomenclature,
-                            annee=int(annee) if annee else 2023,
-                            geom=geom,
-                        )
-
-                        # Map columns from shapefile
-                        for shp_col, model_field in mapping.items():
-                            if hasattr(occ, model_field) and shp_col in row.index:
-                                setattr(occ, model_field, row[shp_col])
-
-                        occ.save()
-                        imported += 1
-
-                    except Exception as e:
-                        errors += 1
 
                 session.nombre_importees = imported
                 session.nombre_erreurs = errors
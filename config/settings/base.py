@@ -87,7 +87,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.gzip.GZipMiddleware',
+    'apps.carbone.middleware.RangeAwareGZipMiddleware',
     'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -135,6 +135,35 @@ DATABASES = {
 }
 
 
+# ──────────────────────────────────────────────
+# Cache
+# 'default' : per-process memory (LRU-like, culled at MAX_ENTRIES): small
+#             values read on every request, keyed by the data version
+#             (compact dictionaries, apps/carbone/compact.py).
+# 'geo'     : SHARED by all gunicorn workers — responses of the SQL tier
+#             (apps/carbone/cache.py) and the data version that invalidates
+#             them. Redis when REDIS_URL is set (pip install redis), else files.
+# ──────────────────────────────────────────────
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-geo-carbone',
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+    'geo': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'TIMEOUT': 24 * 3600,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('GEO_CACHE_DIR', str(BASE_DIR / '.cache' / 'geo')),
+        'TIMEOUT': 24 * 3600,
+        # x cache.MAX_CACHED_BYTES (2 MB gzip) → 1 GB of disk at most
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -191,6 +220,8 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:8000',
 ]
 CORS_ALLOW_ALL_ORIGINS = True  # Dev only — overridden in production.py
+# FlatGeobuf clients read Content-Range of byte-range responses (/api/v1/fgb/)
+CORS_EXPOSE_HEADERS = ['Content-Range', 'Accept-Ranges', 'ETag', 'X-GeoCache']
 
 # Leaflet configuration
 LEAFLET_CONFIG = {
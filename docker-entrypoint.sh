@@ -28,11 +28,23 @@ echo "======================================="
 echo ">> Migrations..."
 python manage.py migrate --no-input
 
+echo ">> Géométries généralisées / subdivisées (objets modifiés seulement)..."
+python manage.py generalise_geometries || echo "   (généralisation ignorée)"
+
+echo ">> Table de synthèse des statistiques..."
+python manage.py refresh_statistics || echo "   (statistiques ignorées)"
+
+echo ">> Matrices de transition (superpositions modifiées seulement)..."
+python manage.py build_transitions || echo "   (transitions ignorées)"
+
 echo ">> Seed nomenclature (idempotent)..."
 python manage.py seed_nomenclature || echo "   (nomenclature déjà présente)"
 
 # Reconstruire le cache GeoJSON UNIQUEMENT si la base contient des occupations.
 # Sinon on garde les fichiers media/geocache/*.json commités (sinon carte vide).
+# Incrémental : seuls les fichiers dont les données ont changé sont reconstruits.
+# Fichiers de base + bandes de zoom + compact (envoyé par la carte) + hexagones ; autres
+# variantes (attrs, topojson, fgb...) à la demande : PREBUILD_VARIANTS=attrs,fgb (ou all).
 echo ">> Vérification des données pour le cache GeoJSON..."
 python - <<'PY' || echo "   (prebuild ignoré)"
 import os, sys, subprocess, django
@@ -42,7 +54,12 @@ from apps.carbone.models import OccupationSol
 n = OccupationSol.objects.count()
 if n > 0:
     print(f"   {n} occupations en base -> reconstruction du cache")
-    subprocess.run([sys.executable, 'manage.py', 'prebuild_geojson'], check=False)
+    jobs = os.environ.get('PREBUILD_JOBS', '2')
+    args = [sys.executable, 'manage.py', 'prebuild_geojson', '--jobs', jobs]
+    variants = os.environ.get('PREBUILD_VARIANTS', '').strip()
+    if variants:
+        args += ['--with', variants]
+    subprocess.run(args, check=False)
 else:
     print("   base vide -> cache commité conservé")
 PY
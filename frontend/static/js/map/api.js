@@ -110,15 +110,67 @@ const API = {
         }
     },
 
+    /**
+     * Expand a compact=1 FeatureCollection in place: dictionary entries are
+     * merged back into each feature's properties (same shape as the full
+     * payload). Idempotent: the memory cache keeps the expanded object.
+     */
+    _expandCompact(data) {
+        if (!data || !data.dictionaries) return data;
+        const { forets, couverts, sources } = data.dictionaries;
+        for (const f of data.features) {
+            const { foret, couvert, source, ...props } = f.properties;
+            f.properties = {
+                ...props,
+                ...forets[foret],
+                ...couverts[couvert],
+                source_donnee: source != null ? sources[source] : null,
+            };
+        }
+        delete data.dictionaries;
+        delete data.encoding;
+        return data;
+    },
+
     // ===== ENDPOINTS =====
     // Occupation: cache enabled (backend serves static files when available)
     // Simple params only (annee, foret_code) → cache hits on backend
     // Complex params (bbox, zoom, type) → SQL fallback
+    // bbox + snap=1 → bbox snapped to the tile grid, per-cell server cache
 
     getForets()                { return this.get('/forets/'); },
-    getOccupations(params)     { return this.get('/occupations/', params, { useCache: true, abortKey: 'occ' }); },
+    // compact=1: forest / cover strings come once in dictionaries → smaller payload, faster parse
+    async getOccupations(params) {
+        const data = await this.get('/occupations/', { ...params, compact: 1 }, { useCache: true, abortKey: 'occ' });
+        return this._expandCompact(data);
+    },
+    /**
+     * Occupation attributes without polygons (popups, AI panel, tables):
+     * fields = ['id', 'type_couvert', ...], geometry = 'none' | 'centroid' | 'bbox'.
+     */
+    getOccupationAttributes(params, fields, geometry = 'none') {
+        const p = { ...params, geometry };
+        if (fields && fields.length) p.fields = fields.join(',');
+        return this.get('/occupations/', p, { useCache: true });
+    },
+    // FlatGeobuf (static, spatially indexed): read by Range requests, e.g.
+    // flatgeobuf.deserialize(API.occupationFgbUrl(2023), { minX, minY, maxX, maxY })
+    occupationFgbUrl(annee, foretCode) {
+        const name = `occupations_${annee}` + (foretCode ? `_${foretCode}` : '');
+        return `${window.location.origin}${this.BASE_URL}/fgb/${name}.fgb`;
+    },
     getOccupationStats(params) { return this.get('/occupations/stats/', params, { useCache: false }); },
     getEvolution(foret, a1, a2){ return this.get('/occupations/evolution/', { foret, annee1: a1, annee2: a2 }); },
+    // Matrice measure × (rows, cols) parmi annee / foret / type, ex. { measure: 'carbone', rows: 'annee', cols: 'foret' }
+    getOccupationMatrix(params) { return this.get('/occupations/matrix/', params); },
+    // Matrice de transition entre deux annees (superposition des polygones)
+    getTransitions(a1, a2, foret) { return this.get('/occupations/transitions/', { annee1: a1, annee2: a2, foret }); },
+    // Couche des changements (pertes / gains) entre deux annees
+    getChanges(params) { return this.get('/occupations/changes/', params); },
+    // Grille hexagonale (taille d'arete en m : 1000 | 2000 | 5000), vue d'ensemble
+    getHexagons(taille) { return this.get('/hexagones/', { taille }); },
+    // Superficie / carbone a l'interieur d'un polygone dessine (GeoJSON), par annee et type
+    getZonalStats(geometry, opts) { return this.post('/occupations/zonal-stats/', { geometry, ...(opts || {}) }); },
     getPlacettes(params)       { return this.get('/placettes/', params); },
     getInfrastructures(params) { return this.get('/infrastructures/', params); },
     getZonesEtude(params)      { return this.get('/zones-etude/', params); },
@@ -126,6 +178,22 @@ const API = {
     queryAI(query)             { return this.post('/ai/query/', { query }); },
     getStockCarbone()          { return this.get('/stock-carbone/', null, { useCache: true, abortKey: 'carbone' }); },
 
+    /**
+     * URL template of the occupation vector tiles, for a MapLibre
+     * `{ type: 'vector', tiles: [...] }` source (source-layer 'occupation').
+     * Same filters as getOccupations: annee, foret_code, type.
+     */
+    occupationTilesUrl(params) {
+        const url = new URL(this.BASE_URL + '/tiles/occupation/{z}/{x}/{y}.pbf', window.location.origin);
+        if (params) {
+            Object.entries(params).forEach(([k, v]) => {
+                if (v !== null && v !== undefined && v !== '') url.searchParams.append(k, v);
+            });
+        }
+        // URL() encode les accolades : MapLibre attend {z}/{x}/{y} en clair
+        return decodeURI(url.toString());
+    },
+
     /**
      * Preload occupation data for all years into browser memory.
      * Since backend serves static cache files, this is very fast.
@@ -136,7 +204,9 @@ const API = {
         const promises = years.map(annee => {
             const params = { annee };
             if (foretCode) params.foret_code = foretCode;
-            return this.get('/occupations/', params, { useCache: true });
+            // Same URL as getOccupations (compact=1) → memory cache hit later
+            return this.get('/occupations/', { ...params, compact: 1 }, { useCache: true })
+                .then(data => this._expandCompact(data));
         });
         await Promise.all(promises);
         console.log('[API] ✓ Preloaded all years (instant switching ready)');